@@ -1,8 +1,20 @@
+import os
+import sys
+
 from modules.notes import NotesManager
 from modules.contact import ContactManager
-from modules.notes import NotesManager
+from modules.finance import FinanceManager
 from modules.tasks import TasksManager
 from modules.calculator import Calculator
+from modules.commands import main as run_command
+from modules.session import env_flag, managers
+from modules.tracing import TRACE_ENV, tracer
+
+# Путь к базе SQLite (например, data/assistant.db). Если задан, все разделы
+# работают с базой, а данные из data/*.json один раз переносятся в неё.
+DATABASE_PATH = os.environ.get("ASSISTANT_DB")
+# ASSISTANT_COLUMNAR=1 хранит финансовые записи по колонкам (без базы SQLite)
+FINANCE_COLUMNAR = env_flag("ASSISTANT_COLUMNAR")
 
 
 def main_menu():
@@ -14,7 +26,8 @@ def main_menu():
         print("3. Управление контактами")
         print("4. Управление финансовыми записями")
         print("5. Калькулятор")
-        print("6. Выход")
+        print("6. Трассировка операций")
+        print("7. Выход")
 
         choice = input("Введите номер действия: ")
 
@@ -29,36 +42,101 @@ def main_menu():
         elif choice == "5":
             calculator()
         elif choice == "6":
+            tracing_menu()
+        elif choice == "7":
+            managers.flush()
+            managers.close()
             print("Спасибо за использование Персонального помощника. До свидания!")
             break
         else:
-            print("Неверный ввод. Пожалуйста, выберите действие от 1 до 6.")
+            print("Неверный ввод. Пожалуйста, выберите действие от 1 до 7.")
+
+
+def open_manager(factory, json_path, **options):
+    return managers.open(factory, json_path, DATABASE_PATH, **options)
 
 
 def manage_notes():
-    notes_manager = NotesManager("data/notes.json")
+    notes_manager = open_manager(NotesManager, "data/notes.json")
     notes_manager.menu()
 
 
 def manage_tasks():
-    task_manager = TasksManager("data/tasks.json")
+    task_manager = open_manager(TasksManager, "data/tasks.json")
     task_manager.menu()
 
 
 def manage_contacts():
-    contact_manager = ContactManager("data/contacts.json")
+    contact_manager = open_manager(ContactManager, "data/contacts.json")
     contact_manager.menu()
 
 
 def manage_financial_records():
-    notes_manager = NotesManager("data/finances.json")
-    notes_manager.menu()
+    finance_manager = open_manager(
+        FinanceManager, "data/finances.json", columnar=FINANCE_COLUMNAR
+    )
+    finance_manager.menu()
 
 
 def calculator():
-    calculator = Calculator()
+    calculator = Calculator("data/calculator_history.jsonl")
     calculator.calculate()
 
 
+def tracing_menu():
+    while True:
+        state = "включена" if tracer.enabled else "выключена"
+        print(f"\nТрассировка операций ({state}):")
+        print("1. Показать отчёт")
+        print("2. Сохранить отчёт в файл")
+        print("3. Профилировать следующую операцию")
+        print("4. Показать последний профиль")
+        print("5. Сбросить статистику")
+        print("6. Выключить" if tracer.enabled else "6. Включить")
+        print("7. Назад")
+
+        choice = input("Введите номер действия: ")
+
+        if choice == "1":
+            print(tracer.format_report())
+        elif choice == "2":
+            path = input("Путь к файлу отчёта (JSON): ").strip()
+            try:
+                tracer.dump(path)
+                print(f"Отчёт сохранён в {path}")
+            except OSError as e:
+                print(f"Ошибка при сохранении: {e}")
+        elif choice == "3":
+            path = input("Путь к файлу профиля (по умолчанию data/profile.prof): ")
+            operation = input("Операция, например finance.report (Enter - любая): ")
+            tracer.profile_next(path.strip() or "data/profile.prof", operation or None)
+            print("Профиль снимется со следующей операции.")
+        elif choice == "4":
+            if tracer.last_profile is None:
+                print("Профиль ещё не снимался.")
+            else:
+                name, path, text = tracer.last_profile
+                print(f"Операция {name}, профиль в {path}:")
+                print(text)
+        elif choice == "5":
+            tracer.reset()
+            print("Статистика сброшена.")
+        elif choice == "6":
+            if tracer.enabled:
+                tracer.disable()
+            else:
+                tracer.enable()
+        elif choice == "7":
+            break
+        else:
+            print("Неверный ввод. Пожалуйста, выберите действие от 1 до 7.")
+
+
 if __name__ == "__main__":
+    # Трассировка включается заранее, чтобы учесть и загрузку разделов
+    if env_flag(TRACE_ENV):
+        tracer.enable()
+    # С аргументами (python app.py add tasks title=...) работает без диалога
+    if len(sys.argv) > 1:
+        sys.exit(run_command(sys.argv[1:]))
     main_menu()
@@ -0,0 +1,97 @@
+"""
+Замер холодного старта: загрузка снимка из JSON против бинарного кэша
+(marshal) для финансовых записей.
+
+    python benchmarks/cold_start.py --counts 100000 1000000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.finance import FinanceRecord  # noqa: E402
+from modules.records import RecordStore  # noqa: E402
+from modules.storage import JournalStorage  # noqa: E402
+
+CATEGORIES = ["Продукты", "Транспорт", "Жильё", "Зарплата", "Развлечения"]
+
+
+def generate_records(count, seed=42):
+    rng = random.Random(seed)
+    for record_id in range(1, count + 1):
+        yield {
+            "id": record_id,
+            "amount": round(rng.uniform(-5000, 5000), 2),
+            "category": rng.choice(CATEGORIES),
+            "date": "{:02d}-{:02d}-{}".format(
+                rng.randint(1, 28), rng.randint(1, 12), rng.randint(2015, 2024)
+            ),
+            "description": f"Операция {record_id}",
+        }
+
+
+def drop_cache(data_path):
+    cache_path = os.path.splitext(data_path)[0] + ".cache"
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+
+
+def read_snapshot(data_path):
+    """
+    Только чтение снимка (словари записей), без создания объектов.
+    """
+    start = time.perf_counter()
+    JournalStorage(data_path, None).load()
+    return time.perf_counter() - start
+
+
+def load_store(data_path):
+    """
+    Полный холодный старт: снимок плюс объекты FinanceRecord.
+    """
+    start = time.perf_counter()
+    store = RecordStore(data_path, FinanceRecord.from_dict).load()
+    elapsed = time.perf_counter() - start
+    store.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="cold_start_")
+    try:
+        print(
+            f"{'записей':>10}{'снимок JSON':>14}{'снимок кэш':>14}"
+            f"{'старт JSON':>14}{'старт кэш':>14}"
+        )
+        for count in args.counts:
+            data_path = os.path.join(directory, f"finances_{count}.json")
+            records = list(generate_records(count))
+            JournalStorage(data_path, None)._write_snapshot(records)
+            del records
+            drop_cache(data_path)
+            # Загрузка без кэша заодно пересоздаёт его для следующей
+            json_read = read_snapshot(data_path)
+            cache_read = read_snapshot(data_path)
+            drop_cache(data_path)
+            json_start = load_store(data_path)
+            cache_start = load_store(data_path)
+            print(
+                f"{count:>10}{json_read:>14.2f}{cache_read:>14.2f}"
+                f"{json_start:>14.2f}{cache_start:>14.2f}"
+            )
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Замер скорости поиска контактов: полный перебор (как раньше делал
+search_contact) против индекса триграмм и префиксного дерева телефонов.
+
+    python benchmarks/contacts_search.py --count 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.contact import Contact  # noqa: E402
+from modules.ngram import (  # noqa: E402
+    NgramIndex,
+    PhoneTrie,
+    normalize_phone,
+    normalize_text,
+)
+
+FIRST_NAMES = [
+    "Александр", "Алексей", "Анна", "Дмитрий", "Екатерина", "Елена", "Иван",
+    "Мария", "Михаил", "Наталья", "Ольга", "Павел", "Сергей", "Татьяна",
+]
+LAST_NAMES = [
+    "Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов",
+    "Михайлов", "Новиков", "Фёдоров", "Морозов", "Волков", "Алексеев", "Лебедев",
+]
+
+
+def generate_contacts(count, seed=42):
+    rng = random.Random(seed)
+    for contact_id in range(1, count + 1):
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        phone = "+7 9{:02d} {:03d}-{:04d}".format(
+            rng.randrange(100), rng.randrange(1000), rng.randrange(10000)
+        )
+        yield Contact(contact_id, name, phone, f"user{contact_id}@example.com")
+
+
+def linear_search(contacts, query):
+    query = query.lower()
+    return [
+        contact
+        for contact in contacts
+        if query in contact.name.lower() or query in contact.phone
+    ]
+
+
+def timed(function, repeat):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    contacts = list(generate_contacts(args.count))
+    name_index = NgramIndex(lambda contact: normalize_text(contact.name))
+    phone_index = NgramIndex(lambda contact: normalize_phone(contact.phone))
+    phone_trie = PhoneTrie()
+    start = time.perf_counter()
+    for contact in contacts:
+        name_index.add(contact)
+        phone_index.add(contact)
+        phone_trie.add(contact)
+    elapsed = time.perf_counter() - start
+    print(f"Контактов: {args.count}, индексы построены за {elapsed:.2f} с")
+
+    queries = [
+        ("имя, подстрока", "ольга фёд", name_index.search),
+        ("имя, редкая подстрока", "ья лебе", name_index.search),
+        (
+            "имя, префикс",
+            "татьяна в",
+            lambda query: name_index.search(query, prefix=True),
+        ),
+        (
+            "телефон, подстрока",
+            "123-45",
+            lambda query: phone_index.search(normalize_phone(query)),
+        ),
+        (
+            "телефон, префикс",
+            "+7 912 34",
+            lambda query: phone_trie.search(normalize_phone(query)),
+        ),
+    ]
+    print(f"{'запрос':<24}{'перебор, мс':>14}{'индекс, мс':>14}{'найдено':>10}")
+    for label, query, search in queries:
+        linear, _ = timed(lambda: linear_search(contacts, query), 1)
+        indexed, found = timed(lambda: search(query), args.repeat)
+        print(
+            f"{label:<24}{linear * 1000:>14.2f}{indexed * 1000:>14.3f}{len(found):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Замер вычисления выражения по колонкам: построчный вызов evaluate с
+разбором из кэша, плотный цикл без NumPy и векторизованный расчёт NumPy.
+
+    python benchmarks/expressions.py --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from modules.expressions import compile_expression, numpy  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument(
+        "--expression", default="(price * quantity - discount) ^ 2 / (quantity + 1)"
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    expression = compile_expression(args.expression)
+    columns = {
+        name: [rng.uniform(1, 100) for _ in range(args.rows)]
+        for name in expression.variables
+    }
+
+    def per_row():
+        for row in zip(*(columns[name] for name in expression.variables)):
+            compile_expression(args.expression).evaluate(
+                dict(zip(expression.variables, row))
+            )
+
+    runs = [
+        ("построчно, evaluate", per_row),
+        ("колонки, цикл", lambda: expression.evaluate_columns(columns, False)),
+    ]
+    if numpy is not None:
+        runs.append(("колонки, NumPy", lambda: expression.evaluate_columns(columns)))
+
+    print(f"Выражение: {args.expression}, строк: {args.rows}")
+    print(f"{'режим':<24}{'время, с':>10}{'строк/с':>14}")
+    for label, run in runs:
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        print(f"{label:<24}{elapsed:>10.3f}{args.rows / elapsed:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main()
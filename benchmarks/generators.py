@@ -0,0 +1,122 @@
+"""
+Генераторы синтетических данных для замеров: заметки, задачи, контакты и
+финансовые записи с русским текстом и датами ДД-ММ-ГГГГ. При одинаковом
+seed данные одинаковы, поэтому замеры разных коммитов сравнимы.
+"""
+
+import csv
+import json
+import random
+
+FIRST_NAMES = [
+    "Александр", "Алексей", "Анна", "Дмитрий", "Екатерина", "Елена", "Иван",
+    "Мария", "Михаил", "Наталья", "Ольга", "Павел", "Сергей", "Татьяна",
+]
+LAST_NAMES = [
+    "Иванов", "Смирнов", "Кузнецов", "Попов", "Васильев", "Петров", "Соколов",
+    "Михайлов", "Новиков", "Фёдоров", "Морозов", "Волков", "Алексеев", "Лебедев",
+]
+WORDS = [
+    "встреча", "проект", "отчёт", "покупки", "звонок", "договор", "счёт",
+    "ремонт", "поездка", "врач", "подарок", "книга", "бюджет", "план",
+    "презентация", "письмо", "задача", "итоги", "идея", "список", "квартал",
+    "банк", "доставка", "семья", "тренировка", "курс", "отпуск", "аренда",
+]
+CATEGORIES = [
+    "Продукты", "Транспорт", "Жильё", "Зарплата", "Развлечения", "Здоровье",
+    "Связь", "Одежда", "Образование", "Подарки",
+]
+PRIORITIES = ["Высокий", "Средний", "Низкий"]
+KINDS = ("notes", "tasks", "contacts", "finance")
+
+# Колонки CSV для импорта, как в CSV_FIELDS менеджеров
+CSV_COLUMNS = {
+    "notes": ["title", "content", "timestamp"],
+    "tasks": ["title", "description", "done", "priority", "due_date"],
+    "contacts": ["name", "phone", "email"],
+    "finance": ["amount", "category", "date", "description"],
+}
+
+
+def random_date(rng, first_year=2015, last_year=2026):
+    return "{:02d}-{:02d}-{}".format(
+        rng.randint(1, 28), rng.randint(1, 12), rng.randint(first_year, last_year)
+    )
+
+
+def sentence(rng, low, high):
+    words = rng.choices(WORDS, k=rng.randint(low, high))
+    return " ".join(words).capitalize()
+
+
+def generate(kind, count, seed=42, first_id=1):
+    """
+    Отдаёт count словарей записей раздела kind в виде to_dict().
+    """
+    rng = random.Random(seed)
+    for record_id in range(first_id, first_id + count):
+        if kind == "notes":
+            yield {
+                "id": record_id,
+                "title": sentence(rng, 1, 4),
+                "content": sentence(rng, 8, 40) + ".",
+                "timestamp": "{} {:02d}:{:02d}:{:02d}".format(
+                    random_date(rng),
+                    rng.randrange(24),
+                    rng.randrange(60),
+                    rng.randrange(60),
+                ),
+            }
+        elif kind == "tasks":
+            yield {
+                "id": record_id,
+                "title": sentence(rng, 2, 5),
+                "description": sentence(rng, 0, 12),
+                "done": rng.random() < 0.3,
+                "priority": rng.choice(PRIORITIES),
+                "due_date": random_date(rng, 2024, 2027),
+            }
+        elif kind == "contacts":
+            yield {
+                "id": record_id,
+                "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                "phone": "+7 9{:02d} {:03d}-{:04d}".format(
+                    rng.randrange(100), rng.randrange(1000), rng.randrange(10000)
+                ),
+                "email": f"user{record_id}@example.com",
+            }
+        elif kind == "finance":
+            category = rng.choice(CATEGORIES)
+            amount = round(rng.uniform(10, 5000), 2)
+            yield {
+                "id": record_id,
+                "amount": amount if category == "Зарплата" else -amount,
+                "category": category,
+                "date": random_date(rng),
+                "description": sentence(rng, 1, 6),
+            }
+        else:
+            raise ValueError(f"Неизвестный раздел: {kind}")
+
+
+def write_snapshot(path, kind, count, seed=42):
+    """
+    Пишет снимок в формате JournalStorage (JSON-массив по записи на строку),
+    не держа записи в памяти.
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("[\n")
+        for number, data in enumerate(generate(kind, count, seed)):
+            if number:
+                file.write(",\n")
+            file.write(json.dumps(data, ensure_ascii=False))
+        file.write("\n]\n")
+
+
+def write_csv(path, kind, count, seed=42):
+    columns = CSV_COLUMNS[kind]
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        for data in generate(kind, count, seed):
+            writer.writerow([data[column] for column in columns])
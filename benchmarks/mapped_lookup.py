@@ -0,0 +1,101 @@
+"""
+Замер открытия большого файла заметок и показа одной заметки: полная
+загрузка RecordStore против MappedRecordStore (mmap и индекс смещений).
+Каждый замер идёт в отдельном процессе, чтобы пиковый RSS не смешивался.
+
+    python benchmarks/mapped_lookup.py --count 1000000
+"""
+
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from modules.mapped import MappedRecordStore  # noqa: E402
+from modules.notes import Note  # noqa: E402
+from modules.records import RecordStore  # noqa: E402
+
+
+def write_notes(path, count):
+    """
+    Пишет снимок построчно, не держа заметки в памяти.
+    """
+    with open(path, "w", encoding="utf-8") as file:
+        file.write("[\n")
+        for note_id in range(1, count + 1):
+            note = {
+                "id": note_id,
+                "title": f"Заметка {note_id}",
+                "content": f"Содержимое заметки номер {note_id}. " * 4,
+                "timestamp": "01-01-2024 12:00:00",
+            }
+            separator = ",\n" if note_id < count else "\n"
+            file.write(json.dumps(note, ensure_ascii=False) + separator)
+        file.write("]\n")
+
+
+def lookup(mode, path, note_id):
+    start = time.perf_counter()
+    if mode == "full":
+        store = RecordStore(path, Note.from_dict).load()
+    else:
+        store = MappedRecordStore(path, Note.from_dict).open()
+    note = store.get(note_id)
+    elapsed = time.perf_counter() - start
+    store.close()
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"elapsed": elapsed, "rss_kb": rss, "title": note.title}))
+
+
+def run(mode, path, note_id):
+    output = subprocess.run(
+        [sys.executable, __file__, "--lookup", mode, path, str(note_id)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--lookup", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.lookup:
+        mode, path, note_id = args.lookup
+        lookup(mode, path, int(note_id))
+        return
+
+    directory = tempfile.mkdtemp(prefix="mapped_lookup_")
+    try:
+        path = os.path.join(directory, "notes.json")
+        write_notes(path, args.count)
+        size = os.path.getsize(path) / 2**20
+        print(f"Заметок: {args.count}, файл {size:.0f} МБ")
+        print(f"{'режим':<28}{'время, мс':>12}{'пиковый RSS, МБ':>18}")
+        note_id = args.count // 2
+        for label, mode in [
+            ("полная загрузка", "full"),
+            ("mmap, первое открытие", "mapped"),
+            ("mmap, готовый индекс", "mapped"),
+        ]:
+            result = run(mode, path, note_id)
+            print(
+                f"{label:<28}{result['elapsed'] * 1000:>12.1f}"
+                f"{result['rss_kb'] / 1024:>18.1f}"
+            )
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
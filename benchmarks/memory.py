@@ -0,0 +1,150 @@
+"""
+Замер памяти на запись (tracemalloc): объекты записей со __slots__ и
+интернированными полями против обычных объектов со словарём атрибутов, как
+было раньше.
+
+Выигрыш - от 1.7 до 2.7 раза, а не в разы: __slots__ убирает только
+словарь атрибутов, интернирование - повторяющиеся строки. Остальное -
+уникальные строки самих записей (имена, телефоны, тексты заметок), их
+размер колонка "поля" показывает отдельно от самого объекта записи.
+
+    python benchmarks/memory.py --count 1000000
+"""
+
+import argparse
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.contact import Contact  # noqa: E402
+from modules.dates import parse_date  # noqa: E402
+from modules.finance import FinanceRecord  # noqa: E402
+from modules.notes import Note  # noqa: E402
+from modules.tasks import Task  # noqa: E402
+
+CATEGORIES = ["Продукты", "Транспорт", "Жильё", "Зарплата", "Развлечения"]
+PRIORITIES = ["Высокий", "Средний", "Низкий"]
+
+
+def random_date(rng):
+    return "{:02d}-{:02d}-{}".format(
+        rng.randint(1, 28), rng.randint(1, 12), rng.randint(2015, 2024)
+    )
+
+
+def generate(kind, count, seed=42):
+    """
+    Словари записей в том виде, в каком они приходят из снимка: каждая строка
+    - отдельный объект, как после json.loads (отсюда "".join).
+    """
+    rng = random.Random(seed)
+    for record_id in range(1, count + 1):
+        if kind == "finance":
+            yield {
+                "id": record_id,
+                "amount": round(rng.uniform(-5000, 5000), 2),
+                "category": "".join(rng.choice(CATEGORIES)),
+                "date": random_date(rng),
+                "description": f"Операция {record_id}",
+            }
+        elif kind == "tasks":
+            yield {
+                "id": record_id,
+                "title": f"Задача {record_id}",
+                "description": "",
+                "done": rng.random() < 0.5,
+                "priority": "".join(rng.choice(PRIORITIES)),
+                "due_date": random_date(rng),
+            }
+        elif kind == "contacts":
+            yield {
+                "id": record_id,
+                "name": f"Контакт {record_id}",
+                "phone": f"+7 900 {record_id:07d}",
+                "email": f"user{record_id}@example.com",
+            }
+        else:
+            yield {
+                "id": record_id,
+                "title": f"Заметка {record_id}",
+                "content": f"Текст заметки {record_id}",
+                "timestamp": f"01-01-2024 12:00:{record_id % 60:02d}",
+            }
+
+
+class PlainRecord:
+    """
+    Прежнее представление: объект со словарём атрибутов и неинтернированными
+    строками; для финансов - ещё и разобранная дата.
+    """
+
+    def __init__(self, data):
+        for name, value in data.items():
+            setattr(self, name, value)
+        if "amount" in data:
+            self.ordinal = date_ordinal(data["date"])
+
+
+def date_ordinal(text):
+    # Без кэша parse_date, чтобы каждая запись получала свой объект int
+    return parse_date.__wrapped__(text)
+
+
+FACTORIES = {
+    "finance": FinanceRecord.from_dict,
+    "tasks": Task.from_dict,
+    "contacts": Contact.from_dict,
+    "notes": Note.from_dict,
+}
+
+
+def object_size(factory, kind):
+    """
+    Размер самого объекта записи и ссылки на него в списке, без значений
+    полей.
+    """
+    return sys.getsizeof(factory(next(generate(kind, 1)))) + 8
+
+
+def measure(build, kind, count):
+    gc.collect()
+    tracemalloc.start()
+    # Словари создаются по одному и сразу освобождаются, поэтому в замер
+    # попадают только записи и строки, на которые они ссылаются
+    records = [build(data) for data in generate(kind, count)]
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del records
+    return current / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    print(
+        f"{'тип':<10}{'было, Б/запись':>16}{'стало, Б/запись':>17}"
+        f"{'объект':>8}{'поля':>6}{'выигрыш':>9}"
+    )
+    for kind, factory in FACTORIES.items():
+        before = measure(PlainRecord, kind, args.count)
+        after = measure(factory, kind, args.count)
+        record = object_size(factory, kind)
+        print(
+            f"{kind:<10}{before:>16.0f}{after:>17.0f}{record:>8}"
+            f"{after - record:>6.0f}{before / after:>8.1f}x"
+        )
+    print(
+        "Поля - в основном уникальные строки записей: __slots__ и интернирование "
+        "их не сокращают."
+    )
+
+
+if __name__ == "__main__":
+    main()
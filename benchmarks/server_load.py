@@ -0,0 +1,163 @@
+"""
+Нагрузочный клиент для сервера (python app.py serve): много одновременных
+соединений шлют смесь чтений и записей и замеряют задержку каждого запроса.
+По умолчанию сам запускает сервер на временном каталоге данных.
+
+    python benchmarks/server_load.py --clients 50 --requests 200
+    python benchmarks/server_load.py --connect 127.0.0.1:8765
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from modules.server import percentile  # noqa: E402
+
+
+def make_request(rng, write_ratio):
+    if rng.random() < write_ratio:
+        if rng.random() < 0.5:
+            data = {
+                "title": f"Задача {rng.randrange(10**6)}",
+                "priority": rng.choice(["Высокий", "Средний", "Низкий"]),
+                "due_date": f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-2026",
+            }
+            return {"op": "add", "section": "tasks", "data": data}
+        data = {
+            "amount": round(rng.uniform(-500, 500), 2),
+            "category": rng.choice(["Еда", "Транспорт", "Зарплата"]),
+            "date": f"{rng.randint(1, 28):02d}-{rng.randint(1, 12):02d}-2026",
+        }
+        return {"op": "add", "section": "finance", "data": data}
+    return rng.choice(
+        [
+            {"op": "report", "section": "tasks"},
+            {"op": "report", "section": "finance", "start": "01-03-2026"},
+            {"op": "search", "section": "tasks", "query": "задача 1", "limit": 5},
+        ]
+    )
+
+
+async def client(number, args, latencies, errors):
+    rng = random.Random(number)
+    if args.socket:
+        reader, writer = await asyncio.open_unix_connection(args.socket)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    try:
+        for rid in range(args.requests):
+            request = make_request(rng, args.write_ratio)
+            request["rid"] = rid
+            start = time.perf_counter()
+            writer.write((json.dumps(request, ensure_ascii=False) + "\n").encode())
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            latencies.setdefault(request["op"], []).append(
+                time.perf_counter() - start
+            )
+            if not response.get("ok"):
+                errors.append(response)
+    finally:
+        writer.close()
+
+
+async def server_stats(args):
+    if args.socket:
+        reader, writer = await asyncio.open_unix_connection(args.socket)
+    else:
+        reader, writer = await asyncio.open_connection(args.host, args.port)
+    writer.write(b'{"op": "stats"}\n')
+    await writer.drain()
+    stats = json.loads(await reader.readline())
+    writer.close()
+    return stats
+
+
+async def run(args):
+    latencies = {}
+    errors = []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(client(number, args, latencies, errors) for number in range(args.clients))
+    )
+    elapsed = time.perf_counter() - start
+    total = sum(len(values) for values in latencies.values())
+    print(f"Клиентов: {args.clients}, запросов: {total}, ошибок: {len(errors)}")
+    print(f"Время: {elapsed:.2f} с, {total / elapsed:,.0f} запросов/с")
+    print(f"{'операция':<10}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}")
+    for op, values in sorted(latencies.items()):
+        values.sort()
+        print(
+            f"{op:<10}{percentile(values, 0.5) * 1000:>10.2f}"
+            f"{percentile(values, 0.95) * 1000:>10.2f}"
+            f"{percentile(values, 0.99) * 1000:>10.2f}"
+        )
+    stats = await server_stats(args)
+    print(
+        f"Сервер: пакетов записи {stats['write_batches']}, "
+        f"записей {stats['writes']}"
+    )
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def start_server(args, directory):
+    os.makedirs(os.path.join(directory, "data"))
+    args.host, args.port = "127.0.0.1", free_port()
+    command = [sys.executable, os.path.join(ROOT, "app.py"), "serve"]
+    process = subprocess.Popen(
+        [*command, "--port", str(args.port)],
+        cwd=directory,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    # Сервер печатает строку, когда начинает слушать порт
+    process.stdout.readline()
+    return process
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--connect", help="адрес запущенного сервера host:port")
+    parser.add_argument("--socket", help="Unix-сокет запущенного сервера")
+    args = parser.parse_args()
+
+    process = directory = None
+    if args.connect:
+        args.host, port = args.connect.rsplit(":", 1)
+        args.port = int(port)
+    elif not args.socket:
+        directory = tempfile.mkdtemp(prefix="server_load_")
+        process = start_server(args, directory)
+    try:
+        asyncio.run(run(args))
+    finally:
+        if process is not None:
+            # Как Ctrl+C: сервер допишет журналы и закроет менеджеры
+            process.send_signal(signal.SIGINT)
+            process.wait()
+        if directory is not None:
+            shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    main()
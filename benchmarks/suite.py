@@ -0,0 +1,330 @@
+"""
+Сводный замер разделов на синтетических данных: загрузка, сохранение,
+добавление, поиск по ID, поиск, фильтр, отчёт, импорт и экспорт CSV с
+пиковой памятью процесса. Каждый раздел и размер замеряется в отдельном
+процессе, результаты пишутся в JSON для сравнения прогонов разных коммитов.
+
+    python benchmarks/suite.py --sizes 1000,100000,1000000
+    python benchmarks/suite.py --compare before.json after.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.generators import (  # noqa: E402
+    CATEGORIES,
+    CSV_COLUMNS,
+    KINDS,
+    LAST_NAMES,
+    WORDS,
+    generate,
+    write_csv,
+    write_snapshot,
+)
+from modules.commands import SECTIONS  # noqa: E402
+
+DEFAULT_SIZES = "1000,100000,1000000"
+ADD_COUNT = 1000
+LOOKUPS = 10000
+QUERIES = 100
+SAVE = {
+    "notes": "save_notes",
+    "tasks": "save_tasks",
+    "contacts": "save_contacts",
+    "finance": "save_records",
+}
+# Фиксированная "сегодняшняя" дата, чтобы сроки задач не зависели от дня прогона
+TODAY = date(2026, 1, 1).toordinal()
+
+
+def peak_rss_mb():
+    # ru_maxrss в Linux - в килобайтах
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Timer:
+    def __init__(self):
+        self.results = []
+
+    def measure(self, op, function, ops=1):
+        start = time.perf_counter()
+        function()
+        seconds = time.perf_counter() - start
+        self.results.append(
+            {"op": op, "seconds": seconds, "ops": ops, "peak_rss_mb": peak_rss_mb()}
+        )
+
+
+def month_ranges(rng, count):
+    ranges = []
+    for _ in range(count):
+        year, month = rng.randint(2015, 2026), rng.randint(1, 12)
+        start = date(year, month, 1).toordinal()
+        ranges.append((start, start + 27))
+    return ranges
+
+
+def search_queries(kind, manager, rng):
+    """
+    Возвращает функцию поиска раздела так же, как его ищет командный режим.
+    """
+    if kind == "notes":
+        words = rng.choices(WORDS, k=QUERIES)
+        return lambda: [manager.search(word) for word in words]
+    if kind == "contacts":
+        names = rng.choices(LAST_NAMES, k=QUERIES)
+        names = [name[:4].lower() + "*" for name in names]
+        return lambda: [manager.find(name) for name in names]
+    if kind == "finance":
+        categories = rng.choices(CATEGORIES, k=QUERIES)
+        return lambda: [manager.records_by_category(name) for name in categories]
+
+    words = rng.choices(WORDS, k=QUERIES)
+
+    def find_tasks():
+        for word in words:
+            found = []
+            for task in manager.tasks:
+                if word in task.title.lower():
+                    found.append(task)
+                    if len(found) == 10:
+                        break
+
+    return find_tasks
+
+
+def run_section(kind, size, seed, directory, sqlite):
+    """
+    Замеряет операции одного раздела на size записях; возвращает список
+    результатов.
+    """
+    section = SECTIONS[kind]
+    rng = random.Random(seed)
+    timer = Timer()
+    suffix = ".db" if sqlite else ".json"
+    snapshot_path = os.path.join(directory, f"{kind}.json")
+    data_path = os.path.join(directory, kind + suffix)
+    write_snapshot(snapshot_path, kind, size, seed)
+    if sqlite:
+        section.factory(data_path).migrate_from_json(snapshot_path)
+
+    opened = []
+    timer.measure("load", lambda: opened.append(section.factory(data_path)), size)
+    if not sqlite:
+        # Повторное открытие читает бинарный кэш снимка и сохранённые индексы
+        opened.pop().close()
+        timer.measure(
+            "load_cached", lambda: opened.append(section.factory(data_path)), size
+        )
+    manager = opened.pop()
+    store = getattr(manager, section.store)
+
+    columns = CSV_COLUMNS[kind]
+    added = [
+        section.record.from_row(**{name: data[name] for name in columns})
+        for data in generate(kind, ADD_COUNT, seed + 2)
+    ]
+
+    def add_records():
+        for record in added:
+            store.add(record)
+        if not sqlite:
+            store.storage.flush()
+
+    timer.measure("add", add_records, ADD_COUNT)
+    timer.measure("save", getattr(manager, SAVE[kind]), len(store))
+
+    ids = [record.id for record in added]
+    ids += rng.choices(range(1, size + 1), k=LOOKUPS - len(ids))
+    timer.measure("lookup", lambda: [store.get(key) for key in ids], LOOKUPS)
+    timer.measure("search", search_queries(kind, manager, rng), QUERIES)
+
+    if kind == "finance":
+        ranges = month_ranges(rng, QUERIES)
+        timer.measure(
+            "filter",
+            lambda: [manager.records_between(start, end) for start, end in ranges],
+            QUERIES,
+        )
+
+        def report():
+            for start, end in ranges:
+                manager.report(start, end)
+                manager.category_totals(start, end)
+
+        timer.measure("report", report, QUERIES)
+    elif kind == "tasks":
+        days = rng.choices(range(1, 91), k=QUERIES)
+        timer.measure(
+            "filter",
+            lambda: [manager.deadlines.due_within(count, TODAY) for count in days],
+            QUERIES,
+        )
+        timer.measure(
+            "report",
+            lambda: [manager.stats.summary(TODAY) for _ in range(QUERIES)],
+            QUERIES,
+        )
+
+    export_path = os.path.join(directory, f"{kind}.export.csv")
+    timer.measure("export_csv", lambda: manager.export_csv(export_path), len(store))
+    manager.close()
+
+    csv_path = os.path.join(directory, f"{kind}.import.csv")
+    write_csv(csv_path, kind, size, seed + 1)
+    target = section.factory(os.path.join(directory, f"{kind}.import{suffix}"))
+    timer.measure("import_csv", lambda: target.import_csv(csv_path), size)
+    target.close()
+    return timer.results
+
+
+def run_worker(kind, size, seed, sqlite):
+    directory = tempfile.mkdtemp(prefix=f"suite_{kind}_")
+    try:
+        results = run_section(kind, size, seed, directory, sqlite)
+    finally:
+        shutil.rmtree(directory)
+    json.dump(results, sys.stdout)
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + "-dirty" if dirty else commit
+
+
+def run_suite(args):
+    sizes = [int(size) for size in args.sizes.split(",")]
+    kinds = args.sections.split(",") if args.sections else list(KINDS)
+    commit = git_commit()
+    report = {
+        "commit": commit,
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": "sqlite" if args.sqlite else "json",
+        "seed": args.seed,
+        "results": [],
+    }
+    print(
+        f"{'раздел':<10}{'записей':>10}  {'операция':<12}"
+        f"{'всего, с':>10}{'мкс/оп':>12}{'RSS, МБ':>10}"
+    )
+    for size in sizes:
+        for kind in kinds:
+            command = [
+                sys.executable,
+                os.path.abspath(__file__),
+                "--worker",
+                kind,
+                str(size),
+                "--seed",
+                str(args.seed),
+            ]
+            if args.sqlite:
+                command.append("--sqlite")
+            output = subprocess.run(
+                command, capture_output=True, text=True, check=True
+            ).stdout
+            for result in json.loads(output):
+                result = dict(
+                    result,
+                    section=kind,
+                    size=size,
+                    per_op_us=result["seconds"] / result["ops"] * 1e6,
+                )
+                report["results"].append(result)
+                print(
+                    f"{kind:<10}{size:>10}  {result['op']:<12}"
+                    f"{result['seconds']:>10.3f}{result['per_op_us']:>12.1f}"
+                    f"{result['peak_rss_mb']:>10.0f}"
+                )
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(ROOT, "benchmarks", "results", f"{commit}-{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"Результаты: {output}")
+
+
+def compare(old_path, new_path):
+    """
+    Печатает время операций двух прогонов и их отношение (новое / старое).
+    """
+    with open(old_path, encoding="utf-8") as file:
+        old = json.load(file)
+    with open(new_path, encoding="utf-8") as file:
+        new = json.load(file)
+    before = {(r["section"], r["size"], r["op"]): r for r in old["results"]}
+    print(f"{old['commit']} -> {new['commit']}")
+    print(
+        f"{'раздел':<10}{'записей':>10}  {'операция':<12}"
+        f"{'было, с':>10}{'стало, с':>10}{'x':>8}{'RSS, МБ':>14}"
+    )
+    for result in new["results"]:
+        key = (result["section"], result["size"], result["op"])
+        previous = before.get(key)
+        if previous is None:
+            continue
+        ratio = result["seconds"] / previous["seconds"] if previous["seconds"] else 0
+        memory = f"{previous['peak_rss_mb']:.0f}->{result['peak_rss_mb']:.0f}"
+        print(
+            f"{key[0]:<10}{key[1]:>10}  {key[2]:<12}"
+            f"{previous['seconds']:>10.3f}{result['seconds']:>10.3f}"
+            f"{ratio:>8.2f}{memory:>14}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="через запятую")
+    parser.add_argument("--sections", help="разделы через запятую: " + ",".join(KINDS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sqlite", action="store_true", help="хранить данные в SQLite")
+    parser.add_argument("--output", help="файл JSON с результатами")
+    parser.add_argument("--compare", nargs=2, metavar=("СТАРЫЙ", "НОВЫЙ"))
+    parser.add_argument("--worker", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+    elif args.worker:
+        kind, size = args.worker
+        run_worker(kind, int(size), args.seed, args.sqlite)
+    else:
+        run_suite(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,17 @@
+import sys
+
+from modules.expressions import compile_expression, evaluate_stream
+from modules.history import Operation, OperationHistory, OperationMemo, format_operation
+
+# Кэш результатов общий для всех экземпляров: app.py создаёт калькулятор
+# заново при каждом входе в раздел
+memo = OperationMemo()
+
+
 class Calculator:
-    def __init__(self):
-        self.history = []
+    def __init__(self, history_path=None, history_limit=1000):
+        self.history = OperationHistory(history_path, history_limit)
+        self.memo = memo
 
     def add(self, a, b):
         return a + b
@@ -25,8 +36,11 @@ class Calculator:
             print("2. Вычитание (-)")
             print("3. Умножение (*)")
             print("4. Деление (/)")
-            print("5. История операций")
-            print("6. Выход")
+            print("5. Вычислить выражение")
+            print("6. Пакетное вычисление из файла")
+            print("7. История операций")
+            print("8. Поиск по истории")
+            print("9. Выход")
 
             choice = input("Выберите операцию: ")
 
@@ -39,8 +53,15 @@ class Calculator:
             elif choice == "4":
                 self.perform_operation(self.divide, "/")
             elif choice == "5":
-                self.show_history()
+                self.evaluate_expression()
             elif choice == "6":
+                self.evaluate_batch()
+            elif choice == "7":
+                self.show_history()
+            elif choice == "8":
+                self.search_history()
+            elif choice == "9":
+                self.history.close()
                 break
             else:
                 print("Неверный ввод. Попробуйте снова.")
@@ -50,17 +71,78 @@ class Calculator:
             num1 = float(input("Введите первое число: "))
             num2 = float(input("Введите второе число: "))
 
-            result = operation(num1, num2)
+            result = self.memo.get(symbol, num1, num2, operation)
             if result is not None:
                 print(f"Результат: {num1} {symbol} {num2} = {result}")
-                self.history.append(f"{num1} {symbol} {num2} = {result}")
+                self.history.append(Operation(num1, symbol, num2, result))
         except ValueError:
             print("Ошибка: Введите корректные числа.")
 
-    def show_history(self):
+    def evaluate_expression(self):
+        text = input("Введите выражение (например, (a + b) * 2): ").strip()
+        try:
+            expression = compile_expression(text)
+            values = {}
+            for name in expression.variables:
+                values[name] = float(input(f"Введите значение {name}: "))
+            result = expression.evaluate(values)
+        except ZeroDivisionError:
+            print("Ошибка: Деление на ноль!")
+            return
+        except (ArithmeticError, ValueError) as e:
+            print(f"Ошибка: {e}")
+            return
+        print(f"Результат: {text} = {result}")
+        self.history.append(Operation(text, "expr", values, result))
+
+    def evaluate_batch(self):
+        """
+        Считает выражение для каждой строки CSV-файла (первая строка - имена
+        переменных) и пишет результаты по одному в строке.
+        """
+        text = input("Введите выражение: ").strip()
+        source_path = input("Путь к входному CSV (- для stdin): ").strip()
+        target_path = input("Путь для результатов (пусто - вывести на экран): ")
+        target_path = target_path.strip()
+        try:
+            source = sys.stdin if source_path == "-" else open(source_path, newline="")
+            target = open(target_path, "w") if target_path else sys.stdout
+            try:
+                count = evaluate_stream(text, source, target)
+            finally:
+                if source is not sys.stdin:
+                    source.close()
+                if target is not sys.stdout:
+                    target.close()
+        except (ArithmeticError, OSError, ValueError) as e:
+            print(f"Ошибка: {e}")
+            return
+        print(f"Посчитано строк: {count}")
+        self.history.append(Operation(text, "batch", count, None))
+
+    def show_history(self, page_size=20):
         if not self.history:
             print("История пуста.")
-        else:
-            print("\n--- История операций ---")
-            for entry in self.history:
-                print(entry)
+            return
+        pages = self.history.pages(page_size)
+        for number in range(pages):
+            print(f"\n--- История операций (страница {number + 1} из {pages}) ---")
+            for operation in self.history.page(number, page_size):
+                print(format_operation(operation))
+            if number + 1 < pages:
+                if input("Enter - следующая страница, q - назад: ").strip() == "q":
+                    break
+        stats = self.memo.stats()
+        print(
+            f"Кэш результатов: {stats['hits']} попаданий, {stats['misses']} "
+            f"промахов ({stats['hit_rate']:.0%})"
+        )
+
+    def search_history(self):
+        text = input("Введите текст для поиска: ").strip()
+        found = self.history.search(text)
+        if not found:
+            print("Ничего не найдено.")
+            return
+        for operation in found:
+            print(format_operation(operation))
@@ -0,0 +1,469 @@
+import math
+from array import array
+from datetime import date
+from itertools import compress
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from modules.dates import format_date, parse_date
+from modules.records import IdAllocator
+from modules.storage import JournalStorage
+
+
+class FinanceRow:
+    """
+    Ленивое представление строки колоночного хранилища с тем же набором
+    атрибутов, что и у FinanceRecord. Значения читаются из колонок при
+    обращении, а присваивание пишет прямо в колонки.
+    """
+
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    @property
+    def id(self):
+        return self.store.id_column[self.row]
+
+    @property
+    def amount(self):
+        return self.store.amounts[self.row]
+
+    @amount.setter
+    def amount(self, value):
+        self.store.amounts[self.row] = value
+
+    @property
+    def category(self):
+        return self.store.categories[self.store.codes[self.row]]
+
+    @category.setter
+    def category(self, value):
+        self.store.codes[self.row] = self.store.category_code(value)
+
+    @property
+    def ordinal(self):
+        return self.store.ordinals[self.row] or None
+
+    @property
+    def date(self):
+        raw = self.store.raw_dates.get(self.row)
+        if raw is not None:
+            return raw
+        return format_date(self.store.ordinals[self.row])
+
+    @date.setter
+    def date(self, value):
+        self.store.set_date(self.row, value)
+
+    @property
+    def description(self):
+        return self.store.descriptions[self.row]
+
+    @description.setter
+    def description(self, value):
+        self.store.descriptions[self.row] = value
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "amount": self.amount,
+            "category": self.category,
+            "date": self.date,
+            "description": self.description,
+        }
+
+
+class ColumnarFinanceStore:
+    """
+    Колоночное хранилище финансовых записей с тем же интерфейсом, что и
+    RecordStore.
+
+    Суммы лежат в array("d"), даты - в колонке порядковых номеров дней int32,
+    категории закодированы номерами в словаре категорий. Итоги и фильтры
+    считаются проходом по колонкам, а при наличии NumPy - векторно поверх тех
+    же буферов без копирования; суммы складываются math.fsum. Удалённые строки помечаются в колонке alive и
+    выбрасываются при следующей загрузке.
+    """
+
+    def __init__(self, data_path):
+        self.storage = JournalStorage(data_path, self.snapshot, merge=self._merge)
+        self.ids = IdAllocator()
+        self.indexes = []
+        self._clear()
+
+    def _clear(self):
+        self.id_column = array("q")
+        self.amounts = array("d")
+        self.ordinals = array("i")
+        self.codes = array("I")
+        self.alive = bytearray()
+        self.descriptions = []
+        self.raw_dates = {}
+        self.categories = []
+        self.category_codes = {}
+        self.rows = {}
+
+    def load(self):
+        self._clear()
+        for data in self.storage.load():
+            self._append(
+                data["id"],
+                data["amount"],
+                data["category"],
+                data["date"],
+                data["description"],
+            )
+        self.ids = IdAllocator(
+            self.storage.meta.get("last_id", 0), self.storage.reserve_ids
+        )
+        return self
+
+    def refresh(self):
+        return self.storage.sync()
+
+    def _merge(self, op, record_id, data):
+        self.ids.observe(record_id)
+        row = self.rows.pop(record_id, None)
+        if row is not None:
+            self.alive[row] = 0
+            for index in self.indexes:
+                index.discard(record_id)
+        if op == "delete":
+            return
+        view = self._append(
+            record_id,
+            data["amount"],
+            data["category"],
+            data["date"],
+            data["description"],
+        )
+        for index in self.indexes:
+            index.add(view)
+
+    def category_code(self, category):
+        code = self.category_codes.get(category)
+        if code is None:
+            code = self.category_codes[category] = len(self.categories)
+            self.categories.append(category)
+        return code
+
+    def set_date(self, row, value):
+        ordinal = parse_date(value)
+        self.ordinals[row] = ordinal or 0
+        if ordinal is not None and format_date(ordinal) == value:
+            self.raw_dates.pop(row, None)
+        else:
+            self.raw_dates[row] = value
+
+    def _append(self, record_id, amount, category, date, description):
+        row = len(self.id_column)
+        self.id_column.append(record_id)
+        self.amounts.append(amount)
+        self.ordinals.append(0)
+        self.codes.append(self.category_code(category))
+        self.alive.append(1)
+        self.descriptions.append(description)
+        self.set_date(row, date)
+        self.rows[record_id] = row
+        return FinanceRow(self, row)
+
+    def snapshot(self):
+        self.storage.meta["last_id"] = self.ids.last_id
+        return [record.to_dict() for record in self]
+
+    def save(self):
+        self.storage.compact(wait=True)
+
+    def close(self):
+        self.storage.close()
+
+    def stamp(self):
+        return self.storage.stamp()
+
+    def is_stale(self):
+        return self.storage.is_stale()
+
+    def add_index(self, index, build=True):
+        if build:
+            for record in self:
+                index.add(record)
+        self.indexes.append(index)
+        return index
+
+    def next_id(self):
+        return self.ids.allocate()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return (FinanceRow(self, row) for row in self.rows.values())
+
+    def __contains__(self, record_id):
+        return record_id in self.rows
+
+    def get(self, record_id):
+        row = self.rows.get(record_id)
+        return None if row is None else FinanceRow(self, row)
+
+    def add(self, record):
+        self.add_many([record])
+
+    def add_many(self, records):
+        self.refresh()
+        records = list(records)
+        missing = sum(1 for record in records if record.id is None)
+        next_id = self.ids.allocate(missing) if missing else None
+        operations = []
+        for record in records:
+            if record.id is None:
+                record.id = next_id
+                next_id += 1
+            else:
+                self.ids.observe(record.id)
+            if record.id in self.rows:
+                self.alive[self.rows[record.id]] = 0
+            view = self._append(
+                record.id,
+                record.amount,
+                record.category,
+                record.date,
+                record.description,
+            )
+            for index in self.indexes:
+                index.add(view)
+            operations.append(("add", record.id, view.to_dict()))
+        self.storage.append_many(operations)
+
+    def update(self, record):
+        self.refresh()
+        if record.id in self.storage.merged:
+            self.storage.conflicts += 1
+        view = self.get(record.id)
+        if not isinstance(record, FinanceRow):
+            view.amount = record.amount
+            view.category = record.category
+            view.date = record.date
+            view.description = record.description
+        for index in self.indexes:
+            index.discard(view.id)
+            index.add(view)
+        self.storage.append("edit", view.id, view.to_dict())
+
+    def delete(self, record_id):
+        self.refresh()
+        row = self.rows.pop(record_id, None)
+        if row is None:
+            return None
+        self.alive[row] = 0
+        for index in self.indexes:
+            index.discard(record_id)
+        self.storage.append("delete", record_id)
+        return FinanceRow(self, row)
+
+    @staticmethod
+    def _bounds(start, end):
+        # Незаданная граница периода - начало или конец календаря
+        return (
+            1 if start is None else start,
+            date.max.toordinal() if end is None else end,
+        )
+
+    def _mask(self, start, end):
+        mask = numpy.frombuffer(self.alive, dtype=numpy.bool_)
+        if start is not None or end is not None:
+            start, end = self._bounds(start, end)
+            ordinals = numpy.frombuffer(self.ordinals, dtype=numpy.int32)
+            mask = mask & (ordinals >= start) & (ordinals <= end)
+        return mask
+
+    def _selected_rows(self, start, end):
+        if start is None and end is None:
+            return compress(range(len(self.alive)), self.alive)
+        start, end = self._bounds(start, end)
+        return (
+            row
+            for row, (ordinal, alive) in enumerate(zip(self.ordinals, self.alive))
+            if alive and start <= ordinal <= end
+        )
+
+    @staticmethod
+    def _sums(amounts):
+        # math.fsum дает те же итоги, что и точные агрегаты FinanceRollups
+        return (
+            math.fsum(amount for amount in amounts if amount > 0),
+            math.fsum(amount for amount in amounts if amount <= 0),
+        )
+
+    @staticmethod
+    def _split(keys, amounts):
+        """
+        Группирует колонку сумм NumPy по ключам: [(ключ, [суммы])].
+        """
+        if not len(keys):
+            return []
+        order = numpy.argsort(keys, kind="stable")
+        keys = keys[order].tolist()
+        amounts = amounts[order].tolist()
+        starts = [0]
+        starts.extend(
+            index for index in range(1, len(keys)) if keys[index] != keys[index - 1]
+        )
+        starts.append(len(keys))
+        return [
+            (keys[low], amounts[low:high]) for low, high in zip(starts, starts[1:])
+        ]
+
+    def totals(self, start=None, end=None):
+        """
+        Возвращает (доходы, расходы) за период [start, end] или за всё время.
+        """
+        if not self.rows:
+            return 0, 0
+        if numpy is not None:
+            amounts = numpy.frombuffer(self.amounts, dtype=numpy.float64)
+            return self._sums(amounts[self._mask(start, end)].tolist())
+        amounts = self.amounts
+        return self._sums([amounts[row] for row in self._selected_rows(start, end)])
+
+    def category_totals(self, start=None, end=None):
+        """
+        Возвращает словарь {категория: сумма} за период или за всё время.
+        """
+        if not self.rows:
+            return {}
+        if numpy is not None:
+            mask = self._mask(start, end)
+            codes = numpy.frombuffer(self.codes, dtype=numpy.uint32)[mask]
+            amounts = numpy.frombuffer(self.amounts, dtype=numpy.float64)[mask]
+            groups = self._split(codes, amounts)
+        else:
+            grouped = {}
+            codes = self.codes
+            amounts = self.amounts
+            for row in self._selected_rows(start, end):
+                grouped.setdefault(codes[row], []).append(amounts[row])
+            groups = grouped.items()
+        return {self.categories[code]: math.fsum(values) for code, values in groups}
+
+    def monthly(self, start=None, end=None):
+        """
+        Возвращает [(год, месяц, доходы, расходы, количество)] по возрастанию
+        за период или за всё время; записи без даты не учитываются.
+        """
+        months = {}
+
+        def month_key(ordinal):
+            key = months.get(ordinal)
+            if key is None:
+                day = date.fromordinal(ordinal)
+                key = months[ordinal] = day.year * 12 + day.month - 1
+            return key
+
+        if numpy is not None:
+            ordinals = numpy.frombuffer(self.ordinals, dtype=numpy.int32)
+            mask = self._mask(start, end) & (ordinals > 0)
+            days, inverse = numpy.unique(ordinals[mask], return_inverse=True)
+            keys = numpy.array([month_key(day) for day in days.tolist()], numpy.int64)
+            amounts = numpy.frombuffer(self.amounts, dtype=numpy.float64)[mask]
+            groups = self._split(keys[inverse], amounts)
+        else:
+            grouped = {}
+            ordinals = self.ordinals
+            amounts = self.amounts
+            for row in self._selected_rows(start, end):
+                if ordinals[row]:
+                    key = month_key(ordinals[row])
+                    grouped.setdefault(key, []).append(amounts[row])
+            groups = sorted(grouped.items())
+        result = []
+        for key, values in groups:
+            year, month = divmod(key, 12)
+            result.append((year, month + 1, *self._sums(values), len(values)))
+        return result
+
+    def between(self, start, end):
+        """
+        Возвращает записи с датами в диапазоне [start, end] в порядке дат.
+        """
+        if not self.rows:
+            return []
+        if numpy is not None:
+            rows = numpy.nonzero(self._mask(start, end))[0]
+            ordinals = numpy.frombuffer(self.ordinals, dtype=numpy.int32)[rows]
+            rows = rows[numpy.argsort(ordinals, kind="stable")].tolist()
+        else:
+            rows = sorted(
+                self._selected_rows(start, end), key=self.ordinals.__getitem__
+            )
+        return [FinanceRow(self, row) for row in rows]
+
+    def iter_rows(self, start=None, end=None, category=None):
+        """
+        Отдаёт кортежи (id, amount, category, date, description) прямо из
+        колонок, с необязательным фильтром по периоду и категории.
+        """
+        if start is None and end is None:
+            rows = self._selected_rows(None, None)
+        else:
+            # Выгрузка за период идёт в порядке дат, как у DateIndex
+            ordinals = self.ordinals
+            ids = self.id_column
+            rows = sorted(
+                self._selected_rows(start, end),
+                key=lambda row: (ordinals[row], ids[row]),
+            )
+        codes = self.codes
+        if category is not None:
+            category = category.lower()
+            wanted = {
+                code
+                for code, name in enumerate(self.categories)
+                if name.lower() == category
+            }
+            rows = (row for row in rows if codes[row] in wanted)
+        ids = self.id_column
+        amounts = self.amounts
+        ordinals = self.ordinals
+        raw_dates = self.raw_dates
+        categories = self.categories
+        descriptions = self.descriptions
+        for row in rows:
+            # Пустая строка даты - тоже сохранённое значение, как в FinanceRow
+            raw = raw_dates.get(row)
+            yield (
+                ids[row],
+                amounts[row],
+                categories[codes[row]],
+                raw if raw is not None else format_date(ordinals[row]),
+                descriptions[row],
+            )
+
+    def on(self, ordinal):
+        return self.between(ordinal, ordinal)
+
+    def with_category(self, category):
+        category = category.lower()
+        wanted = {
+            code
+            for code, name in enumerate(self.categories)
+            if name.lower() == category
+        }
+        if not wanted or not self.rows:
+            return []
+        if numpy is not None:
+            codes = numpy.frombuffer(self.codes, dtype=numpy.uint32)
+            mask = self._mask(None, None) & numpy.isin(codes, list(wanted))
+            rows = numpy.nonzero(mask)[0].tolist()
+        else:
+            codes = self.codes
+            rows = [
+                row for row in self._selected_rows(None, None) if codes[row] in wanted
+            ]
+        return [FinanceRow(self, row) for row in rows]
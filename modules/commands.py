@@ -0,0 +1,520 @@
+import argparse
+import cProfile
+import json
+import os
+import sys
+import time
+
+from modules.contact import Contact, ContactManager
+from modules.csvimport import REQUIRED
+from modules.dates import parse_date
+from modules.finance import FinanceManager, FinanceRecord
+from modules.notes import Note, NotesManager
+from modules.session import env_flag, managers
+from modules.tasks import Task, TasksManager
+from modules.tracing import tracer
+
+
+class Section:
+    def __init__(self, factory, json_path, store, record):
+        self.factory = factory
+        self.json_path = json_path
+        self.store = store
+        self.record = record
+        self.fields = {
+            name: (convert, default) for name, convert, default in factory.CSV_FIELDS
+        }
+
+
+SECTIONS = {
+    "notes": Section(NotesManager, "data/notes.json", "notes", Note),
+    "tasks": Section(TasksManager, "data/tasks.json", "tasks", Task),
+    "contacts": Section(ContactManager, "data/contacts.json", "contacts", Contact),
+    "finance": Section(FinanceManager, "data/finances.json", "records", FinanceRecord),
+}
+OPERATIONS = ("add", "edit", "delete", "done", "get", "report", "search")
+
+
+class CommandRunner:
+    """
+    Выполняет команды без диалога: словари вида
+    {"op": "add", "section": "tasks", "data": {...}} (см. OPERATIONS).
+
+    Запись групповая. Добавления копятся и уходят в хранилище одним
+    add_many, а журналы сбрасываются на диск раз в commit_every команд и в
+    конце пакета. Результаты отдаются в порядке команд в момент фиксации,
+    когда у новых записей уже есть ID. Ошибка в команде не прерывает пакет,
+    а возвращается в её результате.
+
+    Команда get читает запись по ID. Если раздел в процессе ещё не загружен,
+    она берёт запись из отображённого в память снимка (open_mapped
+    менеджера), не загружая раздел целиком.
+    """
+
+    def __init__(self, database_path=None, commit_every=1000, columnar=False):
+        self.database_path = database_path
+        self.commit_every = commit_every
+        self.columnar = columnar
+        self.commands = 0
+        self.failed = 0
+        self.commits = 0
+        self.elapsed = 0.0
+        self._adds = []
+        self._results = []
+        self._managers = {}
+        self._mapped = {}
+
+    def _options(self, name):
+        return {"columnar": True} if self.columnar and name == "finance" else {}
+
+    def manager(self, name):
+        # В пределах одной фиксации менеджер не перечитывает чужие изменения
+        # на каждой команде: это делается один раз при первом обращении
+        manager = self._managers.get(name)
+        if manager is None:
+            section = self.section(name)
+            manager = self._managers[name] = managers.open(
+                section.factory,
+                section.json_path,
+                self.database_path,
+                **self._options(name),
+            )
+        return manager
+
+    def mapped(self, name):
+        """
+        Снимок раздела только для чтения (MappedRecordStore). Открывается
+        один раз и переоткрывается, если файлы раздела изменились.
+        """
+        store = self._mapped.get(name)
+        if store is None:
+            section = self.section(name)
+            store = self._mapped[name] = section.factory.open_mapped(
+                section.json_path
+            )
+        elif store.is_stale():
+            store.open()
+        return store
+
+    @staticmethod
+    def section(name):
+        section = SECTIONS.get(name) if isinstance(name, str) else None
+        if section is None:
+            raise ValueError(f"Неизвестный раздел: {name}")
+        return section
+
+    def run(self, commands):
+        """
+        Выполняет команды (словари или строки JSON) и отдаёт результаты.
+        """
+        start = time.perf_counter()
+        try:
+            for command in commands:
+                self._results.append(self.execute(command))
+                if len(self._results) >= self.commit_every:
+                    yield from self.commit()
+            yield from self.commit()
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+    def commit(self):
+        self.flush_adds()
+        managers.flush()
+        self.reset()
+        self.commits += 1
+        results, self._results = self._results, []
+        return results
+
+    def reset(self, name=None):
+        """
+        Забывает взятые из реестра менеджеры (или менеджер раздела name):
+        следующая команда получит их заново - с подтянутыми чужими
+        изменениями или перезагруженными, если реестр заменил устаревший.
+        """
+        if name is None:
+            self._managers = {}
+        else:
+            self._managers.pop(name, None)
+
+    def flush_adds(self):
+        """
+        Передаёт накопленные добавления в хранилища и проставляет ID в их
+        результатах. На диск они попадут при следующем managers.flush().
+        """
+        adds, self._adds = self._adds, []
+        groups = {}
+        for store, record, result in adds:
+            groups.setdefault(id(store), (store, []))[1].append((record, result))
+        for store, items in groups.values():
+            try:
+                store.add_many(record for record, _ in items)
+            except Exception:
+                # Записи проверены ещё в _add, так что сюда попадать не должны;
+                # если всё же попали, добавляем по одной, чтобы ошибка досталась
+                # своей команде, а остальные записи сохранились
+                self._add_each(store, items)
+                continue
+            for record, result in items:
+                result["id"] = record.id
+
+    def _add_each(self, store, items):
+        for record, result in items:
+            try:
+                store.add_many([record])
+            except Exception as e:
+                self.failed += 1
+                result.update(ok=False, error=str(e))
+                try:
+                    # Запись могла остаться в памяти, не попав в журнал
+                    if record.id is not None and record.id in store:
+                        store.delete(record.id)
+                except Exception:
+                    pass
+            else:
+                result["id"] = record.id
+
+    def execute(self, command):
+        self.commands += 1
+        result = {"n": self.commands, "ok": True}
+        try:
+            if isinstance(command, str):
+                try:
+                    command = json.loads(command)
+                except ValueError:
+                    raise ValueError("Строка не является JSON") from None
+            if not isinstance(command, dict):
+                raise ValueError("Команда должна быть объектом JSON")
+            op = command.get("op")
+            if op not in OPERATIONS:
+                raise ValueError(f"Неизвестная операция: {op}")
+            if op != "add" and self._adds:
+                # Команда может ссылаться на только что добавленные записи
+                self.flush_adds()
+            getattr(self, f"_{op}")(command, result)
+        except Exception as e:
+            self.failed += 1
+            if isinstance(e, KeyError):
+                e = f"Не задано поле {e.args[0]}"
+            result = {"n": result["n"], "ok": False, "error": str(e)}
+        return result
+
+    def _store(self, command):
+        section = self.section(command["section"])
+        return section, getattr(self.manager(command["section"]), section.store)
+
+    @staticmethod
+    def _values(section, data, partial=False):
+        """
+        Проверяет и приводит значения полей так же, как импорт CSV, чтобы
+        до хранилища доходили только корректные записи.
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Поле data должно быть объектом JSON")
+        values = {}
+        for name, value in data.items():
+            if name not in section.fields:
+                raise ValueError(f"Неизвестное поле: {name}")
+            convert, default = section.fields[name]
+            if value is None:
+                if default is REQUIRED:
+                    raise ValueError(f"Не задано поле {name}")
+                value = default
+            elif convert is not None:
+                # Конвертеры разбирают строки, как в CSV: 5 и "5" равноправны,
+                # а null, списки и true вместо числа отклоняются
+                try:
+                    value = convert(str(value))
+                except ValueError:
+                    raise ValueError(
+                        f"Некорректное значение поля {name}: {value}"
+                    ) from None
+            elif not isinstance(value, str):
+                raise ValueError(f"Поле {name} должно быть строкой")
+            values[name] = value
+        if not partial:
+            for name, (_, default) in section.fields.items():
+                if name not in values:
+                    if default is REQUIRED:
+                        raise ValueError(f"Не задано поле {name}")
+                    values[name] = default
+        return values
+
+    def _add(self, command, result):
+        section, store = self._store(command)
+        record = section.record.from_row(**self._values(section, command["data"]))
+        self._adds.append((store, record, result))
+
+    def _find(self, command):
+        section, store = self._store(command)
+        record = store.get(int(command["id"]))
+        if record is None:
+            raise ValueError(f"Запись {command['id']} не найдена")
+        return section, store, record
+
+    def _get(self, command, result):
+        name = command["section"]
+        section = self.section(name)
+        resident = name in self._managers or managers.cached(
+            section.factory,
+            self.database_path or section.json_path,
+            **self._options(name),
+        )
+        if resident or self.database_path:
+            # Загруженный менеджер видит и ещё не сброшенные на диск записи
+            _, _, record = self._find(command)
+        else:
+            record = self.mapped(name).get(int(command["id"]))
+            if record is None:
+                raise ValueError(f"Запись {command['id']} не найдена")
+        result["id"] = record.id
+        result["record"] = record.to_dict()
+
+    def _edit(self, command, result):
+        section, store, record = self._find(command)
+        values = self._values(section, command["data"], partial=True)
+        data = record.to_dict()
+        data.update(values)
+        store.update(section.record.from_dict(data))
+        result["id"] = record.id
+
+    def _delete(self, command, result):
+        _, store, record = self._find(command)
+        store.delete(record.id)
+        result["id"] = record.id
+
+    def _done(self, command, result):
+        command = dict(command, section="tasks")
+        _, store, task = self._find(command)
+        task.mark_done()
+        store.update(task)
+        result["id"] = task.id
+
+    def _report(self, command, result):
+        name = command["section"]
+        manager = self.manager(name)
+        if name == "finance":
+            # Без границ отчёт строится за всё время по готовым агрегатам
+            start = self._date(command.get("start"))
+            end = self._date(command.get("end"))
+            income, expenses = manager.report(start, end)
+            result.update(
+                income=income,
+                expenses=expenses,
+                balance=income + expenses,
+                categories=manager.category_totals(start, end),
+                monthly=[
+                    {"year": year, "month": month, "income": inc, "expenses": exp}
+                    for year, month, inc, exp, _ in manager.monthly(start, end)
+                ],
+            )
+        elif name == "tasks":
+            result.update(manager.stats.summary())
+        else:
+            result["count"] = len(getattr(manager, self.section(name).store))
+
+    @staticmethod
+    def _date(text):
+        if text is None:
+            return None
+        ordinal = parse_date(text)
+        if ordinal is None:
+            raise ValueError(f"Некорректная дата: {text}")
+        return ordinal
+
+    def _search(self, command, result):
+        name = command["section"]
+        manager = self.manager(name)
+        query = command["query"]
+        limit = int(command.get("limit", 10))
+        if name == "notes":
+            found = [
+                dict(note.to_dict(), score=score)
+                for note, score in manager.search(query, limit)
+            ]
+        elif name == "contacts":
+            found = [contact.to_dict() for contact in manager.find(query)[:limit]]
+        elif name == "tasks":
+            query = query.lower()
+            found = []
+            for task in manager.tasks:
+                if query in task.title.lower():
+                    found.append(task.to_dict())
+                    if len(found) == limit:
+                        break
+        else:
+            records = manager.records_by_category(query)
+            found = [record.to_dict() for record in records[:limit]]
+        result["found"] = found
+
+    def stats(self):
+        rate = self.commands / self.elapsed if self.elapsed else 0.0
+        return {
+            "commands": self.commands,
+            "failed": self.failed,
+            "commits": self.commits,
+            "elapsed": self.elapsed,
+            "rate": rate,
+        }
+
+
+def parse_fields(pairs):
+    """
+    Разбирает аргументы вида имя=значение в словарь.
+    """
+    data = {}
+    for pair in pairs:
+        name, separator, value = pair.partition("=")
+        if not separator:
+            raise ValueError(f"Ожидалось имя=значение: {pair}")
+        data[name] = value
+    return data
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="app.py",
+        description="Команды Персонального помощника без диалога.",
+    )
+    parser.add_argument(
+        "--db",
+        default=os.environ.get("ASSISTANT_DB"),
+        help="база SQLite вместо data/*.json (по умолчанию ASSISTANT_DB)",
+    )
+    parser.add_argument(
+        "--columnar",
+        action="store_true",
+        default=env_flag("ASSISTANT_COLUMNAR"),
+        help="хранить финансы по колонкам (по умолчанию ASSISTANT_COLUMNAR)",
+    )
+    parser.add_argument(
+        "--trace", metavar="ФАЙЛ", help="записать отчёт трассировки в файл JSON"
+    )
+    parser.add_argument(
+        "--profile", metavar="ФАЙЛ", help="снять профиль cProfile с выполнения команды"
+    )
+    commands = parser.add_subparsers(dest="op", required=True)
+    sections = sorted(SECTIONS)
+
+    add = commands.add_parser("add", help="добавить запись")
+    add.add_argument("section", choices=sections)
+    add.add_argument("fields", nargs="+", metavar="поле=значение")
+
+    edit = commands.add_parser("edit", help="изменить запись")
+    edit.add_argument("section", choices=sections)
+    edit.add_argument("id", type=int)
+    edit.add_argument("fields", nargs="+", metavar="поле=значение")
+
+    delete = commands.add_parser("delete", help="удалить запись")
+    delete.add_argument("section", choices=sections)
+    delete.add_argument("id", type=int)
+
+    done = commands.add_parser("done", help="отметить задачу выполненной")
+    done.add_argument("id", type=int)
+
+    get = commands.add_parser("get", help="показать запись по ID")
+    get.add_argument("section", choices=sections)
+    get.add_argument("id", type=int)
+
+    report = commands.add_parser("report", help="отчёт или сводка по разделу")
+    report.add_argument("section", choices=sections)
+    report.add_argument("--start", help="начало периода, ДД-ММ-ГГГГ")
+    report.add_argument("--end", help="конец периода, ДД-ММ-ГГГГ")
+
+    search = commands.add_parser("search", help="поиск по разделу")
+    search.add_argument("section", choices=sections)
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=10)
+
+    batch = commands.add_parser(
+        "batch", help="выполнить поток команд JSON Lines из файла или stdin"
+    )
+    batch.add_argument("file", nargs="?", default="-")
+    batch.add_argument("--commit-every", type=int, default=1000)
+
+    serve = commands.add_parser("serve", help="запустить локальный сервер")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8765)
+    serve.add_argument("--socket", help="путь к Unix-сокету вместо TCP")
+    serve.add_argument("--batch-size", type=int, default=256)
+    serve.add_argument("--queue-size", type=int, default=1024)
+    serve.add_argument("--max-in-flight", type=int, default=64)
+    return parser
+
+
+def command_from_args(args):
+    command = {"op": args.op}
+    for name in ("section", "id", "query", "limit", "start", "end"):
+        value = getattr(args, name, None)
+        if value is not None:
+            command[name] = value
+    if getattr(args, "fields", None):
+        command["data"] = parse_fields(args.fields)
+    return command
+
+
+def main(argv=None):
+    """
+    Точка входа командного режима; возвращает код завершения.
+    """
+    args = build_parser().parse_args(argv)
+    if args.trace:
+        tracer.enable()
+    try:
+        if not args.profile:
+            return run_args(args)
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(run_args, args)
+        finally:
+            profile.dump_stats(args.profile)
+    finally:
+        if args.trace:
+            tracer.dump(args.trace)
+
+
+def run_args(args):
+    if args.op == "serve":
+        # Сервер сам построен на CommandRunner, поэтому импортируется здесь
+        from modules.server import serve
+
+        serve(
+            args.db,
+            args.host,
+            args.port,
+            args.socket,
+            batch_size=args.batch_size,
+            queue_size=args.queue_size,
+            max_in_flight=args.max_in_flight,
+            columnar=args.columnar,
+        )
+        return 0
+    if args.op == "batch":
+        runner = CommandRunner(args.db, args.commit_every, args.columnar)
+        source = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+        try:
+            lines = (line for line in source if line.strip())
+            for result in runner.run(lines):
+                sys.stdout.write(json.dumps(result, ensure_ascii=False) + "\n")
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            managers.close()
+        stats = runner.stats()
+        print(
+            f"Команд: {stats['commands']}, ошибок: {stats['failed']}, "
+            f"фиксаций: {stats['commits']}, {stats['elapsed']:.2f} с, "
+            f"{stats['rate']:.0f} команд/с",
+            file=sys.stderr,
+        )
+        return 1 if stats["failed"] else 0
+
+    runner = CommandRunner(args.db, columnar=args.columnar)
+    try:
+        command = command_from_args(args)
+        (result,) = runner.run([command])
+    except ValueError as e:
+        result = {"ok": False, "error": str(e)}
+    finally:
+        managers.close()
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0 if result["ok"] else 1
@@ -1,8 +1,20 @@
-import json
-import csv
+from modules.csvexport import export_rows, row_getter
+from modules.csvimport import (
+    REQUIRED,
+    CsvImporter,
+    is_pattern,
+    print_progress,
+    print_result,
+)
+from modules.mapped import MappedRecordStore
+from modules.ngram import NgramIndex, PhoneTrie, normalize_phone, normalize_text
+from modules.records import RecordStore
+from modules.sqlstore import CONTACTS_TABLE, SqliteRecordStore, is_database
 
 
 class Contact:
+    __slots__ = ("id", "name", "phone", "email")
+
     def __init__(self, id, name, phone, email=""):
         self.id = id
         self.name = name
@@ -36,30 +48,103 @@ class Contact:
         )
         return contact
 
+    @staticmethod
+    def from_row(name, phone, email):
+        return Contact(id=None, name=name, phone=phone, email=email)
+
 
 class ContactManager:
+    EXPORT_FIELDS = ["id", "name", "phone", "email"]
+    CSV_FIELDS = [
+        ("name", None, REQUIRED),
+        ("phone", None, REQUIRED),
+        ("email", None, ""),
+    ]
+
     def __init__(self, data_path):
         self.data_path = data_path
         self.contacts = self.load_contacts()
+        if is_database(data_path):
+            # Поиск идёт запросами по индексированным колонкам таблицы
+            self.name_index = self.phone_index = self.phone_trie = None
+            return
+        self.name_index = self.contacts.add_index(
+            NgramIndex(lambda contact: normalize_text(contact.name))
+        )
+        self.phone_index = self.contacts.add_index(
+            NgramIndex(lambda contact: normalize_phone(contact.phone))
+        )
+        self.phone_trie = self.contacts.add_index(PhoneTrie())
 
     def load_contacts(self):
-        try:
-            with open(self.data_path, "r") as file:
-                content = file.read().strip()
-                if not content:
-                    return []
-                return [Contact.from_dict(contact) for contact in json.loads(content)]
-        except (FileNotFoundError, json.JSONDecodeError):
+        if is_database(self.data_path):
+            return SqliteRecordStore(
+                self.data_path, CONTACTS_TABLE, Contact.from_dict
+            ).load()
+        return RecordStore(self.data_path, Contact.from_dict).load()
+
+    def migrate_from_json(self, json_path):
+        return self.contacts.import_json(json_path)
+
+    @staticmethod
+    def open_mapped(data_path):
+        """
+        Открывает контакты только для чтения с декодированием по обращению.
+        """
+        return MappedRecordStore(data_path, Contact.from_dict).open()
+
+    def find(self, query):
+        """
+        Ищет контакты по подстроке имени или номера телефона. Запрос,
+        оканчивающийся на "*", ищет по началу имени или номера.
+        """
+        query = normalize_text(query.strip())
+        prefix = query.endswith("*")
+        if prefix:
+            query = query[:-1]
+        if not query:
             return []
+        if self.name_index is None:
+            return self._find_sql(query, prefix)
+        ids = set(self.name_index.search(query, prefix=prefix))
+        digits = normalize_phone(query)
+        if digits and not any(char.isalpha() for char in query):
+            if prefix:
+                ids.update(self.phone_trie.search(digits))
+            else:
+                ids.update(self.phone_index.search(digits))
+        return [self.contacts.get(contact_id) for contact_id in sorted(ids)]
+
+    def _find_sql(self, query, prefix):
+        digits = normalize_phone(query)
+        if not digits or any(char.isalpha() for char in query):
+            digits = None
+        if prefix:
+            # Диапазон по индексу вместо LIKE: не нужно экранировать % и _
+            where = "name_key >= ? AND name_key < ?"
+            params = [query, query + "\U0010ffff"]
+            if digits:
+                where += " OR phone_key >= ? AND phone_key < ?"
+                params += [digits, digits + "\U0010ffff"]
+        else:
+            where = "instr(name_key, ?) > 0"
+            params = [query]
+            if digits:
+                where += " OR instr(phone_key, ?) > 0"
+                params.append(digits)
+        return list(self.contacts.select(where, params))
 
     def save_contacts(self):
-        with open(self.data_path, "w") as file:
-            json.dump(
-                [contact.to_dict() for contact in self.contacts],
-                file,
-                indent=4,
-                ensure_ascii=False,
-            )
+        self.contacts.save()
+
+    def refresh(self):
+        return self.contacts.refresh()
+
+    def is_stale(self):
+        return self.contacts.is_stale()
+
+    def close(self):
+        self.contacts.close()
 
     def add_contact(self):
         name = input("Введите имя контакта: ")
@@ -67,19 +152,14 @@ class ContactManager:
         email = input("Введите email (необязательно): ")
 
         new_contact = Contact(
-            id=len(self.contacts) + 1, name=name, phone=phone, email=email
+            id=self.contacts.next_id(), name=name, phone=phone, email=email
         )
-        self.contacts.append(new_contact)
-        self.save_contacts()
+        self.contacts.add(new_contact)
         print("Контакт добавлен!")
 
     def search_contact(self):
-        query = input("Введите имя или номер телефона для поиска: ").lower()
-        results = [
-            contact
-            for contact in self.contacts
-            if query in contact.name.lower() or query in contact.phone
-        ]
+        query = input("Введите имя или номер телефона для поиска: ")
+        results = self.find(query)
 
         if not results:
             print("Контакты не найдены.")
@@ -93,7 +173,7 @@ class ContactManager:
 
     def edit_contact(self):
         id = int(input("Введите ID контакта для редактирования: "))
-        contact = next((contact for contact in self.contacts if contact.id == id), None)
+        contact = self.contacts.get(id)
 
         if not contact:
             print("Контакт не найден.")
@@ -104,48 +184,50 @@ class ContactManager:
         new_email = input(f"Введите новый email (текущий: {contact.email}): ").strip()
 
         contact.edit(name=new_name, phone=new_phone, email=new_email)
-        self.save_contacts()
+        self.contacts.update(contact)
         print("Контакт обновлен!")
 
     def delete_contact(self):
         id = int(input("Введите ID контакта для удаления: "))
-        self.contacts = [contact for contact in self.contacts if contact.id != id]
-        self.save_contacts()
+        self.contacts.delete(id)
         print("Контакт удален!")
 
     def import_from_csv(self):
-        csv_file_path = input("Введите путь к CSV-файлу: ").strip()
+        csv_file_path = input(
+            "Введите путь к CSV-файлу или шаблон (например, data/*.csv): "
+        ).strip()
         try:
-            with open(csv_file_path, mode="r", encoding="utf-8") as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    new_contact = Contact.from_dict(
-                        {
-                            "id": len(self.contacts) + 1,
-                            "name": row["name"],
-                            "phone": row["phone"],
-                            "email": row["email"],
-                        }
-                    )
-                    self.contacts.append(new_contact)
-            self.save_contacts()
+            if is_pattern(csv_file_path):
+                result = self.import_files(csv_file_path, progress=print_progress)
+            else:
+                result = self.import_csv(csv_file_path, progress=print_progress)
+            print_result(result)
             print("Контакты успешно импортированы!")
         except Exception as e:
             print(f"Ошибка при импорте: {e}")
 
+    def import_csv(self, path, batch_size=10000, reject_path=None, progress=None):
+        importer = CsvImporter(self.CSV_FIELDS, Contact.from_row, batch_size)
+        return importer.run(path, self.contacts, reject_path, progress)
+
+    def import_files(self, paths, workers=None, progress=None):
+        importer = CsvImporter(self.CSV_FIELDS, Contact.from_row)
+        return importer.run_parallel(paths, self.contacts, workers, progress)
+
     def export_to_csv(self):
-        csv_file_path = input("Введите путь для сохранения CSV-файла: ")
+        csv_file_path = input(
+            "Введите путь для сохранения CSV-файла (.csv.gz - со сжатием): "
+        )
         try:
-            with open(csv_file_path, mode="w", encoding="utf-8", newline="") as file:
-                fieldnames = ["id", "name", "phone", "email"]
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
-                writer.writeheader()
-                for contact in self.contacts:
-                    writer.writerow(contact.to_dict())
+            self.export_csv(csv_file_path)
             print("Контакты успешно экспортированы!")
         except Exception as e:
             print(f"Ошибка при экспорте: {e}")
 
+    def export_csv(self, path):
+        rows = map(row_getter(self.EXPORT_FIELDS), self.contacts)
+        return export_rows(path, self.EXPORT_FIELDS, rows)
+
     def menu(self):
         while True:
             print("\n--- Управление контактами ---")
@@ -0,0 +1,35 @@
+import csv
+import gzip
+from itertools import islice
+from operator import attrgetter
+
+
+def row_getter(fields):
+    """
+    Возвращает функцию, собирающую кортеж значений полей записи без
+    промежуточного словаря.
+    """
+    return attrgetter(*fields)
+
+
+def export_rows(path, header, rows, chunk_size=10000):
+    """
+    Записывает кортежи rows в CSV-файл пачками по chunk_size строк. Если путь
+    оканчивается на ".gz", файл сжимается gzip. Возвращает число строк.
+    """
+    if path.endswith(".gz"):
+        file = gzip.open(path, "wt", encoding="utf-8", newline="")
+    else:
+        file = open(path, "w", encoding="utf-8", newline="", buffering=1 << 20)
+    count = 0
+    rows = iter(rows)
+    with file:
+        writer = csv.writer(file)
+        writer.writerow(header)
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            writer.writerows(chunk)
+            count += len(chunk)
+    return count
@@ -0,0 +1,237 @@
+import csv
+import glob
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from operator import itemgetter
+
+
+class _Required:
+    def __reduce__(self):
+        # Передаётся в процессы импорта по имени, чтобы проверка "is" работала
+        return "REQUIRED"
+
+
+REQUIRED = _Required()
+
+
+TRUE_VALUES = frozenset(("true", "1", "yes", "да"))
+FALSE_VALUES = frozenset(("false", "0", "no", "нет", ""))
+
+
+def parse_bool(value):
+    text = value.strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f"Ожидалось true или false: {value}")
+
+
+def parse_amount(value):
+    amount = float(value)
+    if not math.isfinite(amount):
+        raise ValueError(f"Сумма должна быть конечным числом: {value}")
+    return amount
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.rejected = 0
+        self.elapsed = 0.0
+        self.reject_paths = []
+
+    @property
+    def rate(self):
+        return self.imported / self.elapsed if self.elapsed else 0.0
+
+
+class RejectWriter:
+    """
+    Файл отказов: строка исходного файла, текст ошибки и значения колонок.
+    Создаётся только при первой отклонённой строке.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    def write(self, line, error, row):
+        if self._writer is None:
+            self._file = open(self.path, "w", encoding="utf-8", newline="")
+            self._writer = csv.writer(self._file)
+        self._writer.writerow([line, str(error), *row])
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def is_pattern(path):
+    return any(char in path for char in "*?[")
+
+
+def reject_path_for(path):
+    return os.path.splitext(path)[0] + ".rejects.csv"
+
+
+class CsvImporter:
+    """
+    Потоковый импорт CSV в хранилище записей.
+
+    fields - список (имя колонки, конвертер, значение по умолчанию); для
+    обязательных колонок по умолчанию указывается REQUIRED, конвертер None
+    оставляет строку как есть. По заголовку файла один раз строится план
+    разбора - по функции на колонку, читающей значение по его позиции. Затем
+    строки читаются по одной, превращаются в записи через factory и
+    фиксируются в хранилище пачками по batch_size. Строки с ошибками
+    записываются в файл отказов вместе с текстом ошибки и не прерывают импорт.
+    """
+
+    def __init__(self, fields, factory, batch_size=10000):
+        self.fields = fields
+        self.factory = factory
+        self.batch_size = batch_size
+
+    def compile(self, header):
+        positions = {name.strip(): position for position, name in enumerate(header)}
+        plan = []
+        for name, converter, default in self.fields:
+            position = positions.get(name)
+            if position is None:
+                if default is REQUIRED:
+                    raise ValueError(f"В файле нет колонки '{name}'")
+                plan.append(lambda row, default=default: default)
+            elif converter is None:
+                plan.append(itemgetter(position))
+            else:
+                plan.append(
+                    lambda row, position=position, converter=converter: converter(
+                        row[position]
+                    )
+                )
+        return plan
+
+    def read(self, path, rejects, build=True):
+        """
+        Построчно читает файл и возвращает записи (или списки значений колонок
+        при build=False). Строки с ошибками уходят в rejects.
+        """
+        factory = self.factory
+        with open(path, mode="r", encoding="utf-8", newline="") as file:
+            reader = csv.reader(file)
+            header = next(reader, None)
+            if header is None:
+                return
+            plan = self.compile(header)
+            for row in reader:
+                try:
+                    values = [field(row) for field in plan]
+                    item = factory(*values) if build else values
+                except (ValueError, TypeError, IndexError) as e:
+                    rejects.write(reader.line_num, e, row)
+                    continue
+                yield item
+
+    def run(self, path, store, reject_path=None, progress=None):
+        """
+        Импортирует файл path в store. progress, если задан, вызывается после
+        каждой пачки с текущим ImportResult.
+        """
+        result = ImportResult()
+        rejects = RejectWriter(reject_path or reject_path_for(path))
+        start = time.perf_counter()
+        try:
+            batch = []
+            for record in self.read(path, rejects):
+                batch.append(record)
+                if len(batch) >= self.batch_size:
+                    result.rejected = rejects.count
+                    self._commit(store, batch, result, start, progress)
+                    batch = []
+            result.rejected = rejects.count
+            self._commit(store, batch, result, start, progress)
+        finally:
+            rejects.close()
+        if rejects.count:
+            result.reject_paths.append(rejects.path)
+        return result
+
+    def run_parallel(self, paths, store, workers=None, progress=None):
+        """
+        Импортирует несколько файлов: список путей или шаблон вида
+        "shards/*.csv". Файлы разбираются и проверяются параллельно в пуле
+        процессов, а результаты добавляются в store в порядке путей одной
+        фиксацией, поэтому ID выдаются детерминированно.
+        """
+        if isinstance(paths, str):
+            paths = sorted(
+                path for path in glob.glob(paths) if not path.endswith(".rejects.csv")
+            )
+        result = ImportResult()
+        start = time.perf_counter()
+        records = []
+        factory = self.factory
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            parsed = executor.map(parse_file, repeat(self.fields), paths)
+            for values, rejected, reject_path in parsed:
+                records.extend([factory(*row) for row in values])
+                result.rejected += rejected
+                if reject_path is not None:
+                    result.reject_paths.append(reject_path)
+                result.imported = len(records)
+                result.elapsed = time.perf_counter() - start
+                if progress is not None:
+                    progress(result)
+        store.add_many(records)
+        result.elapsed = time.perf_counter() - start
+        if progress is not None:
+            progress(result)
+        return result
+
+    @staticmethod
+    def _commit(store, batch, result, start, progress):
+        if batch:
+            store.add_many(batch)
+            result.imported += len(batch)
+        result.elapsed = time.perf_counter() - start
+        if progress is not None:
+            progress(result)
+
+
+def parse_file(fields, path):
+    """
+    Разбирает один файл в процессе пула. Возвращает списки значений колонок,
+    число отклонённых строк и путь к файлу отказов.
+    """
+    rejects = RejectWriter(reject_path_for(path))
+    try:
+        values = list(CsvImporter(fields, None).read(path, rejects, build=False))
+    finally:
+        rejects.close()
+    return values, rejects.count, rejects.path if rejects.count else None
+
+
+def print_progress(result):
+    print(
+        f"\rИмпортировано: {result.imported}, отклонено: {result.rejected} "
+        f"({result.rate:.0f} строк/с)",
+        end="",
+        flush=True,
+    )
+
+
+def print_result(result):
+    print()
+    if result.rejected:
+        print(
+            f"Отклонено строк: {result.rejected}, подробности в "
+            + ", ".join(result.reject_paths)
+        )
@@ -0,0 +1,87 @@
+import bisect
+from datetime import date
+from functools import lru_cache
+
+DATE_FORMAT = "%d-%m-%Y"
+
+
+@lru_cache(maxsize=1 << 16)
+def parse_date(text):
+    """
+    Переводит дату в формате ДД-ММ-ГГГГ в порядковый номер дня
+    (date.toordinal). Для некорректной даты возвращает None. Результаты
+    кэшируются: в данных повторяется лишь несколько тысяч разных дат.
+    """
+    try:
+        day, month, year = text.split("-")
+        return date(int(year), int(month), int(day)).toordinal()
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def format_date(ordinal):
+    return date.fromordinal(ordinal).strftime(DATE_FORMAT)
+
+
+class DateIndex:
+    """
+    Вторичный индекс записей, отсортированных по дате.
+
+    Новые записи копятся в буфере и вливаются в отсортированный список при
+    первом запросе, поэтому массовый импорт стоит одну сортировку, а не
+    вставку в середину списка на каждую запись.
+    """
+
+    def __init__(self, attribute="ordinal"):
+        self.attribute = attribute
+        self.entries = []
+        self.pending = []
+        self.ordinals = {}
+
+    def __len__(self):
+        return len(self.ordinals)
+
+    def add(self, record):
+        ordinal = getattr(record, self.attribute)
+        if ordinal is None:
+            return
+        self.ordinals[record.id] = ordinal
+        self.pending.append((ordinal, record.id, record))
+
+    def discard(self, record_id):
+        ordinal = self.ordinals.pop(record_id, None)
+        if ordinal is None:
+            return
+        self._merge()
+        position = bisect.bisect_left(self.entries, (ordinal, record_id))
+        del self.entries[position]
+
+    def _merge(self):
+        if self.pending:
+            self.entries.extend(self.pending)
+            self.pending = []
+            self.entries.sort(key=lambda entry: entry[:2])
+
+    def between(self, start, end):
+        """
+        Возвращает записи с датами в диапазоне [start, end] в порядке дат.
+        """
+        self._merge()
+        low = bisect.bisect_left(self.entries, (start,))
+        high = bisect.bisect_left(self.entries, (end + 1,))
+        return [entry[2] for entry in self.entries[low:high]]
+
+    def iter_between(self, start, end):
+        """
+        То же, что between, но отдаёт записи по одной, не копируя срез.
+        """
+        self._merge()
+        entries = self.entries
+        for position in range(
+            bisect.bisect_left(entries, (start,)),
+            bisect.bisect_left(entries, (end + 1,)),
+        ):
+            yield entries[position][2]
+
+    def on(self, ordinal):
+        return self.between(ordinal, ordinal)
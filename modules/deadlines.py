@@ -0,0 +1,102 @@
+import bisect
+from datetime import date
+
+PRIORITY_NAMES = ("Высокий", "Средний", "Низкий")
+PRIORITY_RANKS = {name.lower(): rank for rank, name in enumerate(PRIORITY_NAMES)}
+DEFAULT_RANK = PRIORITY_RANKS["средний"]
+# Задачи без срока идут после всех задач со сроком
+NO_DUE = date.max.toordinal() + 1
+
+
+def priority_rank(priority):
+    """
+    Переводит приоритет в число для сортировки: чем меньше, тем важнее.
+    Приоритет вводится свободным текстом, незнакомые значения считаются
+    средними.
+    """
+    if not priority:
+        return DEFAULT_RANK
+    return PRIORITY_RANKS.get(priority.strip().lower(), DEFAULT_RANK)
+
+
+def today_ordinal():
+    return date.today().toordinal()
+
+
+class DeadlineIndex:
+    """
+    Вторичный индекс невыполненных задач, упорядоченных по сроку, затем по
+    приоритету и ID.
+
+    Ближайшие задачи, просроченные и задачи на N дней вперёд находятся
+    бинарным поиском за O(log N) плюс размер ответа. Выполненные задачи в
+    индекс не попадают. Как и в DateIndex, новые записи копятся в буфере:
+    небольшой буфер вставляется на свои места, большой (импорт) вливается
+    одной сортировкой.
+    """
+
+    MERGE_BY_INSERT = 64
+
+    def __init__(self):
+        self.entries = []
+        self.pending = []
+        self.keys = {}
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, task):
+        if task.done:
+            return
+        due = task.due if task.due is not None else NO_DUE
+        key = (due, priority_rank(task.priority), task.id)
+        self.keys[task.id] = key
+        self.pending.append((*key, task))
+
+    def discard(self, task_id):
+        key = self.keys.pop(task_id, None)
+        if key is None:
+            return
+        self._merge()
+        del self.entries[bisect.bisect_left(self.entries, key)]
+
+    def _merge(self):
+        pending = self.pending
+        if not pending:
+            return
+        self.pending = []
+        if len(pending) <= self.MERGE_BY_INSERT:
+            for entry in pending:
+                bisect.insort(self.entries, entry)
+        else:
+            # ID уникальны, поэтому до сравнения самих задач дело не доходит
+            self.entries.extend(pending)
+            self.entries.sort()
+
+    def upcoming(self, limit=10):
+        """
+        Возвращает limit самых срочных невыполненных задач.
+        """
+        self._merge()
+        return [entry[3] for entry in self.entries[:limit]]
+
+    def overdue(self, today=None):
+        """
+        Возвращает задачи со сроком раньше today (по умолчанию - сегодня).
+        """
+        if today is None:
+            today = today_ordinal()
+        self._merge()
+        high = bisect.bisect_left(self.entries, (today,))
+        return [entry[3] for entry in self.entries[:high]]
+
+    def due_within(self, days, today=None):
+        """
+        Возвращает задачи со сроком от today до today + days включительно.
+        """
+        if today is None:
+            today = today_ordinal()
+        self._merge()
+        low = bisect.bisect_left(self.entries, (today,))
+        high = bisect.bisect_left(self.entries, (today + days + 1,))
+        return [entry[3] for entry in self.entries[low:high]]
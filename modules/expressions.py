@@ -0,0 +1,348 @@
+import csv
+import math
+import re
+from functools import lru_cache
+from itertools import islice
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+TOKEN = re.compile(
+    r"\s*(?:(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)"
+    r"|(?P<name>[^\W\d]\w*)|(?P<operator>\*\*|[-+*/%^(),]))"
+)
+BINARY = {"+": "+", "-": "-", "*": "*", "/": "/", "%": "%"}
+
+# Функции выражений: имя -> (число аргументов, вариант для чисел, для NumPy)
+FUNCTIONS = {
+    "abs": (1, abs, "absolute"),
+    "sqrt": (1, math.sqrt, "sqrt"),
+    "exp": (1, math.exp, "exp"),
+    "log": (1, math.log, "log"),
+    "min": (2, min, "minimum"),
+    "max": (2, max, "maximum"),
+}
+
+
+def tokenize(text):
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = TOKEN.match(text, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Непонятный символ в позиции {position + 1}")
+        kind = match.lastgroup
+        tokens.append((kind, match.group(kind), match.start(kind)))
+        position = match.end()
+    tokens.append(("end", "", len(text)))
+    return tokens
+
+
+class Parser:
+    """
+    Разбор арифметического выражения методом рекурсивного спуска.
+
+    Приоритеты: унарный минус и плюс, затем степень (^ или **, правая
+    ассоциативность, -2^2 = -4), затем * / %, затем + -. Переменные
+    заменяются на аргументы _0, _1, ... в порядке первого появления, а
+    степень и функции - на вызовы из окружения компиляции.
+
+    Результат - плоский код: в lines копятся присваивания вида
+    "_t0 = _0 + 1.0", по одной операции в строке, а методы разбора
+    возвращают имя или число с результатом. Поэтому глубина вложенности
+    кода не зависит от длины выражения, и компилятор Python не упирается в
+    свои пределы на длинных суммах.
+    """
+
+    def __init__(self, text):
+        self.tokens = tokenize(text)
+        self.position = 0
+        self.variables = []
+        self.lines = []
+
+    def parse(self):
+        if self.tokens[0][0] == "end":
+            raise ValueError("Пустое выражение")
+        try:
+            result = self.sum()
+        except RecursionError:
+            # Глубоко вложенные скобки или степени: рекурсия разбора
+            raise ValueError("Слишком глубокая вложенность выражения") from None
+        kind, value, offset = self.peek()
+        if kind != "end":
+            raise ValueError(f"Лишний символ '{value}' в позиции {offset + 1}")
+        return result
+
+    def peek(self):
+        return self.tokens[self.position]
+
+    def take(self, value=None):
+        token = self.tokens[self.position]
+        if value is not None and token[1] != value:
+            raise ValueError(f"Ожидалось '{value}' в позиции {token[2] + 1}")
+        self.position += 1
+        return token
+
+    def emit(self, code):
+        name = f"_t{len(self.lines)}"
+        self.lines.append(f"{name} = {code}")
+        return name
+
+    def sum(self):
+        code = self.product()
+        while self.peek()[1] in ("+", "-") and self.peek()[0] == "operator":
+            operator = self.take()[1]
+            code = self.emit(f"{code} {BINARY[operator]} {self.product()}")
+        return code
+
+    def product(self):
+        code = self.unary()
+        while self.peek()[1] in ("*", "/", "%") and self.peek()[0] == "operator":
+            operator = self.take()[1]
+            code = self.emit(f"{code} {BINARY[operator]} {self.unary()}")
+        return code
+
+    def unary(self):
+        # Цепочку знаков сворачиваем в цикле: --x = x, -+-x = x
+        negative = False
+        while self.peek()[0] == "operator" and self.peek()[1] in ("-", "+"):
+            if self.take()[1] == "-":
+                negative = not negative
+        code = self.power()
+        return self.emit(f"-{code}") if negative else code
+
+    def power(self):
+        code = self.atom()
+        if self.peek()[1] in ("^", "**"):
+            self.take()
+            code = self.emit(f"_pow({code}, {self.unary()})")
+        return code
+
+    def atom(self):
+        kind, value, offset = self.take()
+        if kind == "number":
+            number = float(value)
+            if not math.isfinite(number):
+                # repr дал бы имя inf, которого нет среди переменных
+                raise ValueError(f"Слишком большое число в позиции {offset + 1}")
+            return repr(number)
+        if kind == "name":
+            if self.peek()[1] == "(":
+                return self.call(value, offset)
+            if value not in self.variables:
+                self.variables.append(value)
+            return f"_{self.variables.index(value)}"
+        if value == "(":
+            code = self.sum()
+            self.take(")")
+            return code
+        if kind == "end":
+            raise ValueError("Выражение оборвано")
+        raise ValueError(f"Неожиданный символ '{value}' в позиции {offset + 1}")
+
+    def call(self, name, offset):
+        if name not in FUNCTIONS:
+            raise ValueError(f"Неизвестная функция '{name}' в позиции {offset + 1}")
+        self.take("(")
+        arguments = [self.sum()]
+        while self.peek()[1] == ",":
+            self.take()
+            arguments.append(self.sum())
+        self.take(")")
+        if len(arguments) != FUNCTIONS[name][0]:
+            raise ValueError(
+                f"Функция {name} принимает аргументов: {FUNCTIONS[name][0]}"
+            )
+        return self.emit(f"_f_{name}({', '.join(arguments)})")
+
+
+SCALAR_NAMESPACE = {"_pow": math.pow}
+SCALAR_NAMESPACE.update(
+    (f"_f_{name}", function) for name, (_, function, _) in FUNCTIONS.items()
+)
+if numpy is not None:
+    ARRAY_NAMESPACE = {"_pow": numpy.power}
+    ARRAY_NAMESPACE.update(
+        (f"_f_{name}", getattr(numpy, function))
+        for name, (_, _, function) in FUNCTIONS.items()
+    )
+
+
+class Expression:
+    """
+    Скомпилированное выражение.
+
+    Текст разбирается один раз и компилируется в байт-код функции Python от
+    переменных (variables - в порядке появления в тексте). evaluate считает
+    одно значение, evaluate_columns - целые колонки: через NumPy, если он
+    установлен, иначе плотным циклом по готовой функции. Ошибки вычисления
+    (деление на ноль, корень из отрицательного числа) и бесконечности дают
+    nan в строке, а не прерывают пакет.
+    """
+
+    def __init__(self, text):
+        parser = Parser(text)
+        result = parser.parse()
+        self.text = text
+        self.variables = tuple(parser.variables)
+        arguments = ", ".join(f"_{i}" for i in range(len(self.variables)))
+        lines = [f"def _expression({arguments}):"]
+        lines.extend(f"    {line}" for line in parser.lines)
+        lines.append(f"    return {result}")
+        try:
+            self.code = compile("\n".join(lines), "<выражение>", "exec")
+        except (RecursionError, SyntaxError):
+            raise ValueError("Выражение слишком сложное") from None
+        self.function = self._define(SCALAR_NAMESPACE)
+        self._array_function = None
+
+    def _define(self, namespace):
+        namespace = dict(namespace)
+        exec(self.code, namespace)
+        return namespace["_expression"]
+
+    def __repr__(self):
+        return f"Expression({self.text!r})"
+
+    def evaluate(self, values=None, **named):
+        """
+        Считает выражение; значения переменных передаются словарём или
+        именованными аргументами.
+        """
+        values = dict(values or (), **named)
+        try:
+            arguments = [float(values[name]) for name in self.variables]
+        except KeyError as error:
+            raise ValueError(f"Не задана переменная {error.args[0]}") from None
+        return self.function(*arguments)
+
+    def _columns(self, columns):
+        try:
+            return [columns[name] for name in self.variables]
+        except KeyError as error:
+            raise ValueError(f"Нет колонки для переменной {error.args[0]}") from None
+
+    def evaluate_columns(self, columns, use_numpy=None):
+        """
+        Считает выражение для каждой строки колонок {переменная: значения}.
+        Возвращает массив NumPy или список чисел; use_numpy=False заставляет
+        считать без NumPy.
+        """
+        columns = self._columns(columns)
+        if use_numpy is not False and numpy is not None:
+            return self._evaluate_arrays(columns)
+        return self._evaluate_loop(columns)
+
+    def _evaluate_arrays(self, columns):
+        if self._array_function is None:
+            self._array_function = self._define(ARRAY_NAMESPACE)
+        arrays = [numpy.asarray(column, dtype=numpy.float64) for column in columns]
+        if not arrays:
+            return numpy.array(self._evaluate_loop(columns), dtype=numpy.float64)
+        with numpy.errstate(all="ignore"):
+            result = numpy.asarray(self._array_function(*arrays), dtype=numpy.float64)
+        result = numpy.broadcast_to(result, arrays[0].shape).copy()
+        result[~numpy.isfinite(result)] = numpy.nan
+        return result
+
+    def _evaluate_loop(self, columns):
+        function = self.function
+        if not columns:
+            return [self._safe(function)]
+        try:
+            result = [function(*row) for row in zip(*columns)]
+        except (ArithmeticError, ValueError):
+            # Редкий случай: пересчитываем построчно, заменяя ошибки на nan
+            safe = self._safe
+            result = [safe(function, *row) for row in zip(*columns)]
+        if not all(map(math.isfinite, result)):
+            result = [value if math.isfinite(value) else math.nan for value in result]
+        return result
+
+    @staticmethod
+    def _safe(function, *row):
+        try:
+            return function(*row)
+        except (ArithmeticError, ValueError):
+            return math.nan
+
+
+@lru_cache(maxsize=256)
+def compile_expression(text):
+    """
+    Разбирает и компилирует выражение; повторные тексты берутся из кэша.
+    """
+    return Expression(text)
+
+
+def is_number(text):
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+def read_columns(file, names, chunk_size=65536):
+    """
+    Читает CSV с заголовком из file и отдаёт колонки {имя: [числа]} пачками
+    по chunk_size строк. Нужны только колонки names. Файл с единственной
+    колонкой без заголовка тоже подходит, если переменная одна.
+    """
+    reader = csv.reader(file)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [name.strip() for name in header]
+    if len(names) == 1 and len(header) == 1 and is_number(header[0]):
+        # Просто столбец чисел: первая строка - уже данные
+        positions = [0]
+        rows = [header]
+        line = 0
+    else:
+        missing = [name for name in names if name not in header]
+        if missing:
+            raise ValueError(f"Во входных данных нет колонок: {', '.join(missing)}")
+        positions = [header.index(name) for name in names]
+        rows = []
+        line = 1
+    while True:
+        rows.extend(islice(reader, chunk_size - len(rows)))
+        if not rows:
+            return
+        columns = {name: [] for name in names}
+        for row in rows:
+            line += 1
+            if not row:
+                continue
+            try:
+                for name, position in zip(names, positions):
+                    columns[name].append(float(row[position]))
+            except (IndexError, ValueError):
+                raise ValueError(f"Строка {line}: ожидались числа") from None
+        rows = []
+        yield columns
+
+
+def evaluate_stream(text, source, target, chunk_size=65536, use_numpy=None):
+    """
+    Считает выражение для всех строк CSV из source и пишет по результату в
+    строке в target. Возвращает число посчитанных строк.
+    """
+    expression = compile_expression(text)
+    if not expression.variables:
+        # Постоянное выражение: одна строка, ошибка вычисления даёт nan
+        (value,) = expression.evaluate_columns({}, use_numpy=False)
+        target.write(f"{value!r}\n")
+        return 1
+    count = 0
+    for columns in read_columns(source, expression.variables, chunk_size):
+        result = expression.evaluate_columns(columns, use_numpy)
+        if numpy is not None and isinstance(result, numpy.ndarray):
+            result = result.tolist()
+        target.write("".join(f"{value!r}\n" for value in result))
+        count += len(result)
+    return count
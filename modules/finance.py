@@ -1,14 +1,31 @@
-import json
-import csv
-from datetime import datetime
+from datetime import date
+
+from modules.columnar import ColumnarFinanceStore
+from modules.csvexport import export_rows, row_getter
+from modules.csvimport import (
+    REQUIRED,
+    CsvImporter,
+    is_pattern,
+    parse_amount,
+    print_progress,
+    print_result,
+)
+from modules.dates import DateIndex, parse_date
+from modules.mapped import MappedRecordStore
+from modules.records import RecordStore, intern_text
+from modules.rollups import FinanceRollups
+from modules.sqlstore import SqliteFinanceStore, is_database
 
 
 class FinanceRecord:
+    __slots__ = ("id", "amount", "category", "date", "ordinal", "description")
+
     def __init__(self, id, amount, category, date, description):
         self.id = id
         self.amount = amount
-        self.category = category
-        self.date = date
+        self.category = intern_text(category)
+        self.date = intern_text(date)
+        self.ordinal = parse_date(date)
         self.description = description
 
     def to_dict(self):
@@ -31,35 +48,119 @@ class FinanceRecord:
             description=data["description"],
         )
 
+    @staticmethod
+    def from_row(amount, category, date, description):
+        return FinanceRecord(
+            id=None,
+            amount=amount,
+            category=category,
+            date=date,
+            description=description,
+        )
+
 
 class FinanceManager:
-    def __init__(self, file_path):
+    EXPORT_FIELDS = ["id", "amount", "category", "date", "description"]
+    CSV_FIELDS = [
+        ("amount", parse_amount, REQUIRED),
+        ("category", None, REQUIRED),
+        ("date", None, REQUIRED),
+        ("description", None, ""),
+    ]
+
+    def __init__(self, file_path, columnar=False):
         self.file_path = file_path
+        self.columnar = columnar
+        self.sql = is_database(file_path)
         self.records = self.load_records()
+        if self.sql:
+            # Итоги и фильтры считаются запросами к базе
+            self.date_index = self.records
+            self.rollups = None
+            return
+        if columnar:
+            # Колоночное хранилище само отвечает на запросы по датам и итогам
+            # проходом по колонкам, без агрегатов на каждую запись
+            self.date_index = self.records
+            self.rollups = None
+            return
+        self.date_index = self.records.add_index(DateIndex())
+        self.rollups = self.records.add_index(FinanceRollups())
 
     def load_records(self):
         """
-        Загружает финансовые записи из JSON-файла. Если файл пустой или отсутствует, возвращает пустой список.
+        Загружает финансовые записи из JSON-файла и журнала операций. Если файл пустой или отсутствует, хранилище будет пустым.
         """
-        try:
-            with open(self.file_path, "r", encoding="utf-8") as file:
-                content = file.read()
-                if not content:
-                    return []
-                return [
-                    FinanceRecord.from_dict(record) for record in json.loads(content)
-                ]
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
+        if self.sql:
+            return SqliteFinanceStore(self.file_path, FinanceRecord.from_dict).load()
+        if self.columnar:
+            return ColumnarFinanceStore(self.file_path).load()
+        return RecordStore(self.file_path, FinanceRecord.from_dict).load()
+
+    def migrate_from_json(self, json_path):
+        return self.records.import_json(json_path)
+
+    @staticmethod
+    def open_mapped(file_path):
+        """
+        Открывает финансовые записи только для чтения с декодированием по
+        обращению.
+        """
+        return MappedRecordStore(file_path, FinanceRecord.from_dict).open()
 
     def save_records(self):
-        with open(self.file_path, "w", encoding="utf-8") as file:
-            json.dump(
-                [record.to_dict() for record in self.records],
-                file,
-                indent=4,
-                ensure_ascii=False,
-            )
+        self.records.save()
+
+    def refresh(self):
+        return self.records.refresh()
+
+    def is_stale(self):
+        return self.records.is_stale()
+
+    def close(self):
+        self.records.close()
+
+    def records_between(self, start, end):
+        """
+        Возвращает записи за период [start, end]; даты задаются порядковыми
+        номерами дней (см. modules.dates.parse_date).
+        """
+        return self.date_index.between(start, end)
+
+    def report(self, start=None, end=None):
+        """
+        Возвращает (доходы, расходы) за период или за всё время.
+        """
+        if self.rollups is None:
+            return self.records.totals(start, end)
+        return self.rollups.totals(start, end)
+
+    def category_totals(self, start=None, end=None):
+        """
+        Возвращает суммы по категориям за период или за всё время (границы не
+        заданы). В построчном режиме считается по агрегатам, без обхода
+        записей.
+        """
+        if self.rollups is None:
+            return self.records.category_totals(start, end)
+        return self.rollups.category_totals(start, end)
+
+    def monthly(self, start=None, end=None):
+        """
+        Возвращает [(год, месяц, доходы, расходы, количество)] за период или
+        за всё время.
+        """
+        if self.rollups is None:
+            return self.records.monthly(start, end)
+        return self.rollups.monthly(start, end)
+
+    def records_by_category(self, category):
+        if self.columnar or self.sql:
+            return self.records.with_category(category)
+        category = category.lower()
+        return [
+            record for record in self.records if record.category.lower() == category
+        ]
 
     def menu(self):
         while True:
@@ -93,7 +194,7 @@ class FinanceManager:
 
     def add_record(self):
         try:
-            amount = float(
+            amount = parse_amount(
                 input(
                     "Введите сумму операции (положительное число для дохода, отрицательное для расхода): "
                 )
@@ -105,14 +206,13 @@ class FinanceManager:
             description = input("Введите описание операции: ")
 
             new_record = FinanceRecord(
-                id=len(self.records) + 1,
+                id=self.records.next_id(),
                 amount=amount,
                 category=category,
                 date=date,
                 description=description,
             )
-            self.records.append(new_record)
-            self.save_records()
+            self.records.add(new_record)
             print("Финансовая запись добавлена!")
         except ValueError:
             print("Ошибка ввода. Убедитесь, что сумма указана корректно.")
@@ -132,18 +232,27 @@ class FinanceManager:
         print("\n--- Фильтрация записей ---")
         print("1. Фильтровать по дате")
         print("2. Фильтровать по категории")
+        print("3. Фильтровать по периоду")
         choice = input("Выберите фильтр: ")
 
         if choice == "1":
-            date = input("Введите дату для фильтрации (в формате ДД-ММ-ГГГГ): ")
-            filtered = [record for record in self.records if record.date == date]
+            date = parse_date(
+                input("Введите дату для фильтрации (в формате ДД-ММ-ГГГГ): ")
+            )
+            if date is None:
+                print("Ошибка ввода даты. Убедитесь, что дата указана корректно.")
+                return
+            filtered = self.date_index.on(date)
+        elif choice == "3":
+            start = parse_date(input("Введите начальную дату (в формате ДД-ММ-ГГГГ): "))
+            end = parse_date(input("Введите конечную дату (в формате ДД-ММ-ГГГГ): "))
+            if start is None or end is None:
+                print("Ошибка ввода дат. Убедитесь, что даты указаны корректно.")
+                return
+            filtered = self.records_between(start, end)
         elif choice == "2":
             category = input("Введите категорию для фильтрации: ")
-            filtered = [
-                record
-                for record in self.records
-                if record.category.lower() == category.lower()
-            ]
+            filtered = self.records_by_category(category)
         else:
             print("Неверный ввод.")
             return
@@ -160,56 +269,90 @@ class FinanceManager:
         start_date = input("Введите начальную дату (в формате ДД-ММ-ГГГГ): ")
         end_date = input("Введите конечную дату (в формате ДД-ММ-ГГГГ): ")
 
-        try:
-            start_dt = datetime.strptime(start_date, "%d-%m-%Y")
-            end_dt = datetime.strptime(end_date, "%d-%m-%Y")
-
-            filtered = [
-                record
-                for record in self.records
-                if start_dt <= datetime.strptime(record.date, "%d-%m-%Y") <= end_dt
-            ]
-
-            income = sum(record.amount for record in filtered if record.amount > 0)
-            expenses = sum(record.amount for record in filtered if record.amount < 0)
-
-            print("\n--- Отчёт ---")
-            print(f"Доходы: {income}")
-            print(f"Расходы: {expenses}")
-            print(f"Баланс: {income + expenses}")
-        except ValueError:
+        start = parse_date(start_date)
+        end = parse_date(end_date)
+        if start is None or end is None:
             print("Ошибка ввода дат. Убедитесь, что даты указаны корректно.")
+            return
+
+        income, expenses = self.report(start, end)
+
+        print("\n--- Отчёт ---")
+        print(f"Доходы: {income}")
+        print(f"Расходы: {expenses}")
+        print(f"Баланс: {income + expenses}")
+        categories = self.category_totals(start, end)
+        if categories:
+            print("По категориям:")
+            for category, total in sorted(categories.items()):
+                print(f"  {category}: {total}")
+        months = self.monthly(start, end)
+        if months:
+            print("По месяцам (доходы / расходы):")
+            for year, month, month_income, month_expenses, _ in months:
+                print(f"  {month:02d}-{year}: {month_income} / {month_expenses}")
 
     def import_from_csv(self):
-        csv_file_path = input("Введите путь к CSV-файлу: ").strip()
+        csv_file_path = input(
+            "Введите путь к CSV-файлу или шаблон (например, data/*.csv): "
+        ).strip()
         try:
-            with open(csv_file_path, mode="r", encoding="utf-8") as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    new_record = FinanceRecord.from_dict(
-                        {
-                            "id": len(self.records) + 1,
-                            "amount": float(row["amount"]),
-                            "category": row["category"],
-                            "date": row["date"],
-                            "description": row["description"],
-                        }
-                    )
-                    self.records.append(new_record)
-            self.save_records()
+            if is_pattern(csv_file_path):
+                result = self.import_files(csv_file_path, progress=print_progress)
+            else:
+                result = self.import_csv(csv_file_path, progress=print_progress)
+            print_result(result)
             print("Данные успешно импортированы!")
         except Exception as e:
             print(f"Ошибка при импорте: {e}")
 
+    def import_csv(self, path, batch_size=10000, reject_path=None, progress=None):
+        importer = CsvImporter(self.CSV_FIELDS, FinanceRecord.from_row, batch_size)
+        return importer.run(path, self.records, reject_path, progress)
+
+    def import_files(self, paths, workers=None, progress=None):
+        importer = CsvImporter(self.CSV_FIELDS, FinanceRecord.from_row)
+        return importer.run_parallel(paths, self.records, workers, progress)
+
     def export_to_csv(self):
-        file_path = input("Введите путь для сохранения CSV-файла: ").strip()
+        file_path = input(
+            "Введите путь для сохранения CSV-файла (.csv.gz - со сжатием): "
+        ).strip()
+        print("Фильтры экспорта (оставьте пустым, чтобы не фильтровать):")
+        start_date = input("Начальная дата (ДД-ММ-ГГГГ): ").strip()
+        end_date = input("Конечная дата (ДД-ММ-ГГГГ): ").strip()
+        category = input("Категория: ").strip() or None
+        start = parse_date(start_date) if start_date else None
+        end = parse_date(end_date) if end_date else None
+        if (start_date and start is None) or (end_date and end is None):
+            print("Ошибка ввода дат. Убедитесь, что даты указаны корректно.")
+            return
         try:
-            with open(file_path, mode="w", encoding="utf-8", newline="") as file:
-                fieldnames = ["id", "amount", "category", "date", "description"]
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
-                writer.writeheader()
-                for record in self.records:
-                    writer.writerow(record.to_dict())
+            self.export_csv(file_path, start=start, end=end, category=category)
             print("Данные успешно экспортированы!")
         except Exception as e:
             print(f"Ошибка при экспорте: {e}")
+
+    def export_csv(self, path, start=None, end=None, category=None):
+        """
+        Экспортирует записи в CSV. Период [start, end] (порядковые номера дней,
+        любую границу можно опустить) и категория сужают выгрузку; записи
+        берутся из индексов по мере записи, без копирования коллекции.
+        """
+        if self.columnar or self.sql:
+            rows = self.records.iter_rows(start, end, category)
+        else:
+            if start is None and end is None:
+                records = iter(self.records)
+            else:
+                records = self.date_index.iter_between(
+                    start if start is not None else 1,
+                    end if end is not None else date.max.toordinal(),
+                )
+            if category is not None:
+                category = category.lower()
+                records = (
+                    record for record in records if record.category.lower() == category
+                )
+            rows = map(row_getter(self.EXPORT_FIELDS), records)
+        return export_rows(path, self.EXPORT_FIELDS, rows)
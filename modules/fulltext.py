@@ -0,0 +1,184 @@
+import bisect
+import heapq
+import math
+import os
+import pickle
+import re
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.casefold())
+
+
+class InvertedIndex:
+    """
+    Инвертированный индекс для полнотекстового поиска с ранжированием BM25.
+
+    fields задаёт индексируемые атрибуты записи и их вес, например
+    {"title": 2, "content": 1}: слово из заголовка считается дважды.
+    """
+
+    VERSION = 1
+
+    def __init__(self, fields, k1=1.2, b=0.75):
+        self.fields = fields
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.doc_lengths = {}
+        self.doc_terms = {}
+        self.total_length = 0
+        self.vocabulary = []
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def add(self, record):
+        if record.id in self.doc_lengths:
+            self.discard(record.id)
+        counts = {}
+        for field, weight in self.fields.items():
+            for term in tokenize(getattr(record, field) or ""):
+                counts[term] = counts.get(term, 0) + weight
+        for term, count in counts.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                bisect.insort(self.vocabulary, term)
+            posting[record.id] = count
+        length = sum(counts.values())
+        self.doc_lengths[record.id] = length
+        self.total_length += length
+        if self.doc_terms is not None:
+            self.doc_terms[record.id] = list(counts)
+
+    def discard(self, record_id):
+        length = self.doc_lengths.pop(record_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        if self.doc_terms is None:
+            # После загрузки из файла обратный список слов строится при первой
+            # необходимости, чтобы не замедлять запуск
+            self.doc_terms = {record_id: [] for record_id in self.doc_lengths}
+            self.doc_terms[record_id] = []
+            for term, posting in self.postings.items():
+                for posting_id in posting:
+                    self.doc_terms[posting_id].append(term)
+        for term in self.doc_terms.pop(record_id):
+            posting = self.postings[term]
+            del posting[record_id]
+            if not posting:
+                del self.postings[term]
+                position = bisect.bisect_left(self.vocabulary, term)
+                del self.vocabulary[position]
+
+    def expand(self, token):
+        """
+        Возвращает словарные формы для токена запроса. "слово*" означает поиск
+        по префиксу.
+        """
+        if not token.endswith("*"):
+            return [token] if token in self.postings else []
+        prefix = token[:-1]
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + "\U0010ffff")
+        return self.vocabulary[start:end]
+
+    def search(self, query, limit=10):
+        """
+        Ищет записи по запросу и возвращает до limit пар (id, оценка) по
+        убыванию релевантности. Слова в запросе объединяются через И, группы
+        слов можно объединить через OR/ИЛИ, "слово*" ищет по префиксу.
+        """
+        groups = [[]]
+        for token in query.split():
+            if token in ("OR", "ИЛИ", "|"):
+                groups.append([])
+                continue
+            prefix = token.endswith("*")
+            words = tokenize(token)
+            if prefix and words:
+                words[-1] += "*"
+            groups[-1].extend(words)
+
+        scores = {}
+        for group in groups:
+            if not group:
+                continue
+            expansions = [self.expand(token) for token in group]
+            if not all(expansions):
+                continue
+            group_scores = None
+            for terms in sorted(expansions, key=self._postings_size):
+                term_scores = {}
+                for term in terms:
+                    for record_id, score in self._score(term):
+                        if group_scores is None or record_id in group_scores:
+                            previous = term_scores.get(record_id, 0)
+                            term_scores[record_id] = previous + score
+                if group_scores is not None:
+                    term_scores = {
+                        record_id: group_scores[record_id] + score
+                        for record_id, score in term_scores.items()
+                    }
+                group_scores = term_scores
+                if not group_scores:
+                    break
+            for record_id, score in group_scores.items():
+                if score > scores.get(record_id, 0):
+                    scores[record_id] = score
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+    def _postings_size(self, terms):
+        return sum(len(self.postings[term]) for term in terms)
+
+    def _score(self, term):
+        posting = self.postings[term]
+        count = len(self.doc_lengths)
+        idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+        average = self.total_length / count if count else 0
+        k1, b = self.k1, self.b
+        for record_id, frequency in posting.items():
+            norm = k1 * (1 - b + b * self.doc_lengths[record_id] / average)
+            yield record_id, idf * frequency * (k1 + 1) / (frequency + norm)
+
+    def save(self, path, stamp):
+        data = {
+            "version": self.VERSION,
+            "stamp": stamp,
+            "fields": self.fields,
+            "postings": self.postings,
+            "doc_lengths": self.doc_lengths,
+        }
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as file:
+            pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path, fields, stamp):
+        """
+        Загружает сохранённый индекс. Возвращает None, если файла нет или он
+        построен для другого состояния хранилища.
+        """
+        try:
+            with open(path, "rb") as file:
+                data = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        if (
+            data.get("version") != cls.VERSION
+            or data.get("stamp") != stamp
+            or data.get("fields") != fields
+        ):
+            return None
+        index = cls(fields)
+        index.postings = data["postings"]
+        index.doc_lengths = data["doc_lengths"]
+        index.doc_terms = None
+        index.total_length = sum(index.doc_lengths.values())
+        index.vocabulary = sorted(index.postings)
+        return index
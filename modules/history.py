@@ -0,0 +1,162 @@
+import json
+import os
+from collections import OrderedDict, deque, namedtuple
+from itertools import islice
+
+from modules.storage import replace_durably
+
+# Операция калькулятора. Для арифметики op - знак (+ - * /), a и b -
+# операнды; для выражения op = "expr", a - текст, b - значения переменных;
+# для пакета op = "batch", a - текст, b - число строк, result - None.
+Operation = namedtuple("Operation", ["a", "op", "b", "result"])
+
+
+def format_operation(operation):
+    a, op, b, result = operation
+    if op == "expr":
+        return f"{a} = {result}"
+    if op == "batch":
+        return f"{a}: пакет из {b} строк"
+    return f"{a} {op} {b} = {result}"
+
+
+class OperationHistory:
+    """
+    История операций калькулятора: кольцевой буфер последних limit операций
+    в памяти и журнал JSON Lines на диске.
+
+    Каждая операция дописывается в конец файла одной строкой. При открытии
+    читаются только последние limit строк; когда файл вырастает вдвое
+    против limit, он атомарно переписывается с одним буфером, так что и
+    память, и файл остаются ограниченными.
+    """
+
+    def __init__(self, path=None, limit=1000):
+        self.path = path
+        self.limit = limit
+        self.entries = deque(maxlen=limit)
+        self.file_lines = 0
+        self._file = None
+        self._torn = False
+        if path is not None:
+            self._read()
+
+    def _read(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                for line in file:
+                    self.file_lines += 1
+                    self._torn = not line.endswith("\n")
+                    try:
+                        self.entries.append(Operation(*json.loads(line)))
+                    except (TypeError, ValueError):
+                        # Недописанная строка после сбоя
+                        continue
+        except FileNotFoundError:
+            pass
+
+    def append(self, operation):
+        self.entries.append(operation)
+        if self.path is None:
+            return
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+            if self._torn:
+                self._file.write("\n")
+                self._torn = False
+        self._file.write(json.dumps(list(operation), ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.file_lines += 1
+        if self.file_lines >= 2 * self.limit:
+            self.compact()
+
+    def compact(self):
+        """
+        Переписывает файл, оставляя в нём только операции из буфера.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            for operation in self.entries:
+                file.write(json.dumps(list(operation), ensure_ascii=False) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+        replace_durably(temp_path, self.path)
+        self.file_lines = len(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __bool__(self):
+        return bool(self.entries)
+
+    def page(self, number, size=20):
+        """
+        Возвращает страницу number (с нуля) по size операций, новые первыми.
+        """
+        start = number * size
+        return list(islice(reversed(self.entries), start, start + size))
+
+    def pages(self, size=20):
+        return (len(self.entries) + size - 1) // size
+
+    def search(self, text, limit=20):
+        """
+        Ищет операции, в записи которых встречается text, новые первыми.
+        """
+        text = text.lower()
+        found = []
+        for operation in reversed(self.entries):
+            if text in format_operation(operation).lower():
+                found.append(operation)
+                if len(found) == limit:
+                    break
+        return found
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class OperationMemo:
+    """
+    LRU-кэш результатов арифметических операций по ключу (op, a, b).
+    Счётчики hits/misses показывают, как часто результат уже был посчитан.
+    """
+
+    def __init__(self, size=1024):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+
+    def get(self, op, a, b, compute):
+        key = (op, a, b)
+        result = self._results.get(key)
+        if result is not None:
+            self.hits += 1
+            self._results.move_to_end(key)
+            return result
+        self.misses += 1
+        result = compute(a, b)
+        if result is not None:
+            self._results[key] = result
+            if len(self._results) > self.size:
+                self._results.popitem(last=False)
+        return result
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+            "size": len(self._results),
+        }
@@ -0,0 +1,131 @@
+import os
+import struct
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+COUNTERS = struct.Struct("<qq")
+
+
+class FileLock:
+    """
+    Межпроцессная рекомендательная блокировка (fcntl.flock) на файле
+    <имя>.lock рядом с данными.
+
+    Внутри процесса блокировка повторно входимая: flock берётся при первом
+    захвате и снимается при последнем освобождении, поэтому её могут
+    одновременно держать основной поток и фоновые потоки записи и сжатия.
+    flock(2) меняет LOCK_SH на LOCK_EX не атомарно, отпуская общую
+    блокировку, поэтому на месте она не повышается: исключительный захват
+    ждёт, пока общую отпустят другие потоки процесса, а поток, сам
+    держащий общую блокировку, повысить её не может.
+    В начале файла лежат два общих для всех процессов счётчика: версия
+    хранилища (растёт с каждой записью в журнал) и последний выданный ID.
+    Без fcntl (Windows) блокировка ничего не делает, а счётчики работают.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._fd = None
+        self._exclusive = False
+        self._count = 0
+        # Общие захваты по потокам и число ждущих исключительного захвата
+        self._readers = {}
+        self._waiting = 0
+        self._mutex = threading.Lock()
+        self._released = threading.Condition(self._mutex)
+
+    def _descriptor(self):
+        if self._fd is None:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        return self._fd
+
+    def acquire(self, exclusive=True):
+        thread = threading.get_ident()
+        with self._released:
+            if exclusive and not self._exclusive:
+                if thread in self._readers:
+                    raise RuntimeError(
+                        "Нельзя повысить общую блокировку до исключительной"
+                    )
+                self._waiting += 1
+                try:
+                    while self._readers and not self._exclusive:
+                        self._released.wait()
+                finally:
+                    self._waiting -= 1
+            elif not exclusive and thread not in self._readers:
+                # Новые читатели пропускают вперёд ждущий исключительный захват
+                while self._waiting and not self._exclusive:
+                    self._released.wait()
+            fd = self._descriptor()
+            if self._count == 0:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                self._exclusive = exclusive
+            self._count += 1
+            if not exclusive:
+                self._readers[thread] = self._readers.get(thread, 0) + 1
+
+    def release(self, exclusive=True):
+        """
+        Снимает захват. Исключительный можно снять из другого потока (сжатие
+        отпускает блокировку в фоновом потоке), общий - только из своего.
+        """
+        with self._released:
+            if not exclusive:
+                thread = threading.get_ident()
+                if self._readers[thread] == 1:
+                    del self._readers[thread]
+                else:
+                    self._readers[thread] -= 1
+            self._count -= 1
+            if self._count == 0:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                self._exclusive = False
+            self._released.notify_all()
+
+    def exclusive(self):
+        return _Held(self, True)
+
+    def shared(self):
+        return _Held(self, False)
+
+    def counters(self):
+        """
+        Возвращает (версия, последний ID). Читать можно без блокировки:
+        16 байт читаются одним pread.
+        """
+        data = os.pread(self._descriptor(), COUNTERS.size, 0)
+        if len(data) < COUNTERS.size:
+            return 0, 0
+        return COUNTERS.unpack(data)
+
+    def set_counters(self, version, last_id):
+        """
+        Записывает счётчики; вызывается только под exclusive().
+        """
+        os.pwrite(self._descriptor(), COUNTERS.pack(version, last_id), 0)
+
+    def close(self):
+        with self._mutex:
+            if self._fd is not None and self._count == 0:
+                os.close(self._fd)
+                self._fd = None
+
+
+class _Held:
+    def __init__(self, lock, exclusive):
+        self.lock = lock
+        self.exclusive = exclusive
+
+    def __enter__(self):
+        self.lock.acquire(self.exclusive)
+        return self.lock
+
+    def __exit__(self, *exc_info):
+        self.lock.release(self.exclusive)
@@ -0,0 +1,226 @@
+import bisect
+import json
+import mmap
+import os
+import re
+import struct
+
+from modules.storage import JournalStorage
+
+OFFSETS_MAGIC = b"PAOFFS1\n"
+OFFSETS_HEADER = struct.Struct("<QQQQ")
+OFFSETS_ENTRY = struct.Struct("<qQQ")
+RECORD_ID = re.compile(rb'\{"id": (-?\d+)[,}]')
+
+
+class MappedRecordStore:
+    """
+    Хранилище записей только для чтения поверх отображённого в память снимка.
+
+    Снимок JournalStorage хранит по одной записи на строку, поэтому для него
+    один раз строится индекс смещений <имя>.offsets: отсортированные по ID
+    тройки (id, смещение, длина) фиксированного размера. Индекс тоже
+    отображается в память, и запись находится бинарным поиском и
+    декодируется только при обращении. Журнал невелик и читается целиком
+    поверх снимка. Снимок в старом формате (JSON с отступами) читается
+    обычным образом.
+    """
+
+    def __init__(self, data_path, from_dict):
+        self.from_dict = from_dict
+        self.storage = JournalStorage(data_path, None)
+        self.offsets_path = os.path.splitext(data_path)[0] + ".offsets"
+        self.count = 0
+        self.overlay = {}
+        self.own_stamp = None
+        self._data = None
+        self._offsets = None
+        self._length = 0
+
+    def open(self):
+        self.close()
+        self.own_stamp = self.storage.stamp()
+        self._map_snapshot()
+        self._read_journal()
+        self._length = self.count
+        for record_id, data in self.overlay.items():
+            in_snapshot = self._find(record_id) is not None
+            if in_snapshot and data is None:
+                self._length -= 1
+            elif not in_snapshot and data is not None:
+                self._length += 1
+        return self
+
+    def _map_snapshot(self):
+        try:
+            with open(self.storage.data_path, "rb") as file:
+                if os.fstat(file.fileno()).st_size:
+                    self._data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            pass
+        if self._data is None:
+            return
+        if self._data[:3] not in (b"[\n{", b"[]\n", b"[]"):
+            # Старый формат: декодируем целиком и кладём в журнальный слой
+            for data in json.loads(self._data[:].decode("utf-8")):
+                self.overlay.setdefault(data["id"], data)
+            self._data.close()
+            self._data = None
+            return
+        self._offsets = self._load_offsets()
+        if self._offsets is None:
+            self._offsets = self._build_offsets()
+        self.count = OFFSETS_HEADER.unpack_from(self._offsets, len(OFFSETS_MAGIC))[3]
+
+    def _data_stamp(self):
+        stat = os.stat(self.storage.data_path)
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load_offsets(self):
+        try:
+            with open(self.offsets_path, "rb") as file:
+                offsets = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (FileNotFoundError, ValueError):
+            return None
+        header_end = len(OFFSETS_MAGIC) + OFFSETS_HEADER.size
+        magic = offsets[: len(OFFSETS_MAGIC)]
+        if magic == OFFSETS_MAGIC and len(offsets) >= header_end:
+            *stamp, count = OFFSETS_HEADER.unpack_from(offsets, len(OFFSETS_MAGIC))
+            if (
+                tuple(stamp) == self._data_stamp()
+                and len(offsets) == header_end + count * OFFSETS_ENTRY.size
+            ):
+                return offsets
+        offsets.close()
+        return None
+
+    def _spans(self):
+        """
+        Отдаёт (смещение, длина) каждой строки-записи снимка в порядке файла.
+        """
+        data = self._data
+        position = data.find(b"\n") + 1
+        size = len(data)
+        while position < size:
+            end = data.find(b"\n", position)
+            if end < 0:
+                end = size
+            line_end = end
+            if data[line_end - 1 : line_end] == b"\r":
+                line_end -= 1
+            if data[line_end - 1 : line_end] == b",":
+                line_end -= 1
+            if line_end > position and data[position : position + 1] == b"{":
+                yield position, line_end - position
+            position = end + 1
+
+    def _build_offsets(self):
+        """
+        Один проход по снимку: для каждой строки-записи её ID, смещение и длина.
+        """
+        data = self._data
+        entries = []
+        for offset, length in self._spans():
+            match = RECORD_ID.match(data, offset, offset + length)
+            if match is not None:
+                record_id = int(match.group(1))
+            else:
+                record_id = json.loads(data[offset : offset + length])["id"]
+            entries.append((record_id, offset, length))
+        entries.sort()
+        payload = bytearray(OFFSETS_MAGIC)
+        payload += OFFSETS_HEADER.pack(*self._data_stamp(), len(entries))
+        for entry in entries:
+            payload += OFFSETS_ENTRY.pack(*entry)
+        temp_path = self.offsets_path + ".tmp"
+        try:
+            with open(temp_path, "wb") as file:
+                file.write(payload)
+            os.replace(temp_path, self.offsets_path)
+        except OSError:
+            # Без файла индекса работаем с ним в памяти
+            pass
+        return bytes(payload)
+
+    def _read_journal(self):
+        try:
+            with open(self.storage.journal_path, "rb") as file:
+                content = file.read()
+        except FileNotFoundError:
+            return
+        for line in content.splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry["op"] == "delete":
+                self.overlay[entry["id"]] = None
+            elif entry["op"] != "meta":
+                self.overlay[entry["id"]] = entry["data"]
+
+    def _entry(self, position):
+        return OFFSETS_ENTRY.unpack_from(
+            self._offsets,
+            len(OFFSETS_MAGIC) + OFFSETS_HEADER.size + position * OFFSETS_ENTRY.size,
+        )
+
+    def _find(self, record_id):
+        if not self.count:
+            return None
+        position = bisect.bisect_left(
+            range(self.count), record_id, key=lambda i: self._entry(i)[0]
+        )
+        if position < self.count:
+            entry_id, offset, length = self._entry(position)
+            if entry_id == record_id:
+                return offset, length
+        return None
+
+    def _decode(self, offset, length):
+        return json.loads(self._data[offset : offset + length])
+
+    def __len__(self):
+        return self._length
+
+    def __contains__(self, record_id):
+        if record_id in self.overlay:
+            return self.overlay[record_id] is not None
+        return self._find(record_id) is not None
+
+    def get(self, record_id):
+        if record_id in self.overlay:
+            data = self.overlay[record_id]
+        else:
+            found = self._find(record_id)
+            data = None if found is None else self._decode(*found)
+        return None if data is None else self.from_dict(data)
+
+    def __iter__(self):
+        """
+        Отдаёт записи в порядке снимка, декодируя их по одной.
+        """
+        seen = set()
+        if self._data is not None:
+            for offset, length in self._spans():
+                data = self._decode(offset, length)
+                if data["id"] in self.overlay:
+                    seen.add(data["id"])
+                    data = self.overlay[data["id"]]
+                    if data is None:
+                        continue
+                yield self.from_dict(data)
+        for record_id, data in self.overlay.items():
+            if data is not None and record_id not in seen:
+                yield self.from_dict(data)
+
+    def is_stale(self):
+        return self.storage.stamp() != self.own_stamp
+
+    def close(self):
+        for mapped in (self._data, self._offsets):
+            if isinstance(mapped, mmap.mmap):
+                mapped.close()
+        self._data = None
+        self._offsets = None
+        self.count = 0
+        self.overlay = {}
@@ -0,0 +1,151 @@
+from array import array
+
+
+def normalize_text(text):
+    return (text or "").casefold()
+
+
+def normalize_phone(phone):
+    return "".join(char for char in phone or "" if char.isdigit())
+
+
+class NgramIndex:
+    """
+    Индекс триграмм для поиска подстроки в нормализованном ключе записи.
+
+    Списки записей для триграмм только дополняются: при изменении или удалении
+    запись просто убирается из keys, а устаревшие ссылки отсекаются проверкой
+    кандидатов и чистятся полной перестройкой, когда их становится много.
+    """
+
+    N = 3
+
+    def __init__(self, key):
+        self.key = key
+        self.keys = {}
+        self.postings = {}
+        self.stale = 0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def add(self, record):
+        if record.id in self.keys:
+            self.discard(record.id)
+        value = self.key(record)
+        self.keys[record.id] = value
+        self._post(record.id, value)
+
+    def _post(self, record_id, value):
+        postings = self.postings
+        for gram in {value[i : i + self.N] for i in range(len(value) - self.N + 1)}:
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array("q")
+            posting.append(record_id)
+
+    def discard(self, record_id):
+        if self.keys.pop(record_id, None) is not None:
+            self.stale += 1
+            if self.stale > max(len(self.keys), 1024):
+                self.rebuild()
+
+    def rebuild(self):
+        self.postings = {}
+        self.stale = 0
+        for record_id, value in self.keys.items():
+            self._post(record_id, value)
+
+    def search(self, query, prefix=False):
+        """
+        Возвращает ID записей, ключ которых содержит query (или начинается с
+        него при prefix=True), в порядке возрастания ID.
+        """
+        keys = self.keys
+        if len(query) < self.N:
+            candidates = keys
+        else:
+            grams = {query[i : i + self.N] for i in range(len(query) - self.N + 1)}
+            postings = [self.postings.get(gram) for gram in grams]
+            if not all(postings):
+                return []
+            candidates = set(min(postings, key=len))
+        if prefix:
+            matches = [rid for rid in candidates if keys.get(rid, "").startswith(query)]
+        else:
+            matches = [rid for rid in candidates if query in keys.get(rid, "")]
+        return sorted(matches)
+
+
+class PhoneTrie:
+    """
+    Префиксное дерево по цифрам нормализованных телефонов.
+
+    Дерево строится только на глубину depth цифр, дальше номера складываются
+    в корзину узла и проверяются при поиске. Так узлов остаётся немного даже
+    на миллионах контактов.
+    """
+
+    def __init__(self, depth=6):
+        self.depth = depth
+        self.root = {}
+        self.phones = {}
+        self.stale = 0
+
+    def __len__(self):
+        return len(self.phones)
+
+    def add(self, record):
+        if record.id in self.phones:
+            self.discard(record.id)
+        digits = normalize_phone(record.phone)
+        self.phones[record.id] = digits
+        self._insert(record.id, digits)
+
+    def _insert(self, record_id, digits):
+        node = self.root
+        for digit in digits[: self.depth]:
+            child = node.get(digit)
+            if child is None:
+                child = node[digit] = {}
+            node = child
+        bucket = node.get("")
+        if bucket is None:
+            bucket = node[""] = array("q")
+        bucket.append(record_id)
+
+    def discard(self, record_id):
+        if self.phones.pop(record_id, None) is not None:
+            self.stale += 1
+            if self.stale > max(len(self.phones), 1024):
+                self.rebuild()
+
+    def rebuild(self):
+        self.root = {}
+        self.stale = 0
+        for record_id, digits in self.phones.items():
+            self._insert(record_id, digits)
+
+    def search(self, digits):
+        """
+        Возвращает ID записей, телефон которых начинается с digits, в порядке
+        возрастания ID.
+        """
+        node = self.root
+        for digit in digits[: self.depth]:
+            node = node.get(digit)
+            if node is None:
+                return []
+        candidates = set()
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for digit, child in node.items():
+                if digit:
+                    stack.append(child)
+                else:
+                    candidates.update(child)
+        phones = self.phones
+        return sorted(
+            rid for rid in candidates if phones.get(rid, "").startswith(digits)
+        )
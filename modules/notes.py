@@ -1,9 +1,23 @@
 from datetime import datetime
-import json
-import csv
+import os
+
+from modules.csvexport import export_rows, row_getter
+from modules.csvimport import (
+    REQUIRED,
+    CsvImporter,
+    is_pattern,
+    print_progress,
+    print_result,
+)
+from modules.fulltext import InvertedIndex
+from modules.mapped import MappedRecordStore
+from modules.records import RecordStore
+from modules.sqlstore import NOTES_TABLE, SqliteRecordStore, is_database
 
 
 class Note:
+    __slots__ = ("id", "title", "content", "timestamp")
+
     def __init__(self, id, title, content):
         self.id = id
         self.title = title
@@ -33,38 +47,97 @@ class Note:
             title=data["title"],
             content=data["content"],
         )
+        if data.get("timestamp"):
+            note.timestamp = data["timestamp"]
+        return note
+
+    @staticmethod
+    def from_row(title, content, timestamp):
+        note = Note(id=None, title=title, content=content)
+        if timestamp:
+            note.timestamp = timestamp
         return note
 
 
 class NotesManager:
+    SEARCH_FIELDS = {"title": 2, "content": 1}
+    EXPORT_FIELDS = ["id", "title", "content", "timestamp"]
+    CSV_FIELDS = [
+        ("title", None, REQUIRED),
+        ("content", None, REQUIRED),
+        ("timestamp", None, None),
+    ]
+
     def __init__(self, data_path):
         self.data_path = data_path
+        self.index_path = os.path.splitext(data_path)[0] + ".index"
         self.notes = self.load_notes()
+        self.search_index = self.load_search_index()
 
     def load_notes(self):
-        try:
-            with open(self.data_path, "r", encoding="utf-8") as file:
-                return [Note.from_dict(note) for note in json.load(file)]
-        except json.JSONDecodeError:
-            return []
-        except FileNotFoundError:
-            return []
+        if is_database(self.data_path):
+            return SqliteRecordStore(self.data_path, NOTES_TABLE, Note.from_dict).load()
+        return RecordStore(self.data_path, Note.from_dict).load()
+
+    def migrate_from_json(self, json_path):
+        return self.notes.import_json(json_path)
+
+    @staticmethod
+    def open_mapped(data_path):
+        """
+        Открывает заметки только для чтения: файл не читается целиком, а
+        заметки декодируются по одной при обращении.
+        """
+        return MappedRecordStore(data_path, Note.from_dict).open()
+
+    def load_search_index(self):
+        """
+        Загружает поисковый индекс из файла рядом с заметками, а если он
+        устарел или отсутствует, строит его заново. В SQLite поиск идёт по
+        таблице FTS5, и отдельный индекс не нужен.
+        """
+        if is_database(self.data_path):
+            return None
+        index = InvertedIndex.load(
+            self.index_path, self.SEARCH_FIELDS, self.notes.stamp()
+        )
+        if index is None:
+            return self.notes.add_index(InvertedIndex(self.SEARCH_FIELDS))
+        return self.notes.add_index(index, build=False)
+
+    def save_search_index(self):
+        if self.search_index is not None:
+            self.search_index.save(self.index_path, self.notes.stamp())
 
     def save_notes(self):
-        with open(self.data_path, "w", encoding="utf-8") as file:
-            json.dump(
-                [note.to_dict() for note in self.notes],
-                file,
-                indent=4,
-                ensure_ascii=False,
-            )
+        self.notes.save()
+        self.save_search_index()
+
+    def refresh(self):
+        return self.notes.refresh()
+
+    def is_stale(self):
+        return self.notes.is_stale()
+
+    def close(self):
+        # Индекс сохраняется с отпечатком файлов, поэтому сначала подтягиваем
+        # чужие изменения
+        self.notes.refresh()
+        self.notes.close()
+        self.save_search_index()
+
+    def search(self, query, limit=10):
+        if self.search_index is None:
+            hits = self.notes.search(query, limit, self.SEARCH_FIELDS.values())
+        else:
+            hits = self.search_index.search(query, limit)
+        return [(self.notes.get(note_id), score) for note_id, score in hits]
 
     def create_note(self):
         title = input("Введите заголовок заметки: ")
         content = input("Введите содержимое заметки: ")
-        new_note = Note(id=len(self.notes) + 1, title=title, content=content)
-        self.notes.append(new_note)
-        self.save_notes()
+        new_note = Note(id=self.notes.next_id(), title=title, content=content)
+        self.notes.add(new_note)
         print("Заметка успешно добавлена!")
 
     def view_notes(self):
@@ -77,7 +150,7 @@ class NotesManager:
 
     def view_note_details(self):
         note_id = int(input("Введите ID заметки: "))
-        note = next((note for note in self.notes if note.id == note_id), None)
+        note = self.notes.get(note_id)
         if not note:
             print("Заметка не найдена...")
             return
@@ -86,9 +159,23 @@ class NotesManager:
         print(f"Содержимое: {note.content}")
         print(f"Дата создания/изменения: {note.timestamp}")
 
+    def search_notes(self):
+        query = input(
+            "Введите запрос (слова через пробел, OR для альтернатив, * для префикса): "
+        ).strip()
+        results = self.search(query)
+        if not results:
+            print("Заметки не найдены.")
+            return
+        print("\nНайденные заметки:")
+        for note, score in results:
+            print(
+                f"[{note.id}] {note.title} ({note.timestamp}) | Релевантность: {score:.2f}"
+            )
+
     def edit_note(self):
         note_id = int(input("Введите ID заметки для редактирования: "))
-        note = next((note for note in self.notes if note.id == note_id), None)
+        note = self.notes.get(note_id)
 
         if not note:
             print("Заметка не найдена...")
@@ -101,48 +188,50 @@ class NotesManager:
 
         note.edit(title=new_title, content=new_content)
 
-        self.save_notes()
+        self.notes.update(note)
         print("Заметка обновлена!")
 
     def delete_note(self):
         note_id = int(input("Введите ID заметки для удаления: "))
-        self.notes = [note for note in self.notes if note.id != note_id]
-        self.save_notes()
+        self.notes.delete(note_id)
         print("Заметка успешно удалена!")
 
     def import_from_csv(self):
-        csv_file_path = input("Введите путь к CSV-файлу: ").strip()
+        csv_file_path = input(
+            "Введите путь к CSV-файлу или шаблон (например, data/*.csv): "
+        ).strip()
         try:
-            with open(csv_file_path, mode="r", encoding="utf-8") as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    new_note = Note.from_dict(
-                        {
-                            "id": len(self.notes) + 1,
-                            "title": row["title"],
-                            "content": row["content"],
-                            "timestamp": row["timestamp"],
-                        }
-                    )
-                    self.notes.append(new_note)
-            self.save_notes()
+            if is_pattern(csv_file_path):
+                result = self.import_files(csv_file_path, progress=print_progress)
+            else:
+                result = self.import_csv(csv_file_path, progress=print_progress)
+            print_result(result)
             print("Заметки успешно импортированы!")
         except Exception as e:
             print(f"Ошибка при импорте: {e}")
 
+    def import_csv(self, path, batch_size=10000, reject_path=None, progress=None):
+        importer = CsvImporter(self.CSV_FIELDS, Note.from_row, batch_size)
+        return importer.run(path, self.notes, reject_path, progress)
+
+    def import_files(self, paths, workers=None, progress=None):
+        importer = CsvImporter(self.CSV_FIELDS, Note.from_row)
+        return importer.run_parallel(paths, self.notes, workers, progress)
+
     def export_to_csv(self):
-        csv_file_path = input("Введите путь для сохранения CSV-файла: ").strip()
+        csv_file_path = input(
+            "Введите путь для сохранения CSV-файла (.csv.gz - со сжатием): "
+        ).strip()
         try:
-            with open(csv_file_path, mode="w", encoding="utf-8", newline="") as file:
-                fieldnames = ["id", "title", "content", "timestamp"]
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
-                writer.writeheader()
-                for note in self.notes:
-                    writer.writerow(note.to_dict())
+            self.export_csv(csv_file_path)
             print("Заметки успешно экспортированы!")
         except Exception as e:
             print(f"Ошибка при экспорте: {e}")
 
+    def export_csv(self, path):
+        rows = map(row_getter(self.EXPORT_FIELDS), self.notes)
+        return export_rows(path, self.EXPORT_FIELDS, rows)
+
     def menu(self):
         while True:
             print("\n--- Управление заметками ---")
@@ -153,7 +242,8 @@ class NotesManager:
             print("5. Удалить заметку")
             print("6. Импорт заметок из CSV")
             print("7. Экспорт заметок в CSV")
-            print("8. Назад в главное меню")
+            print("8. Поиск заметок")
+            print("9. Назад в главное меню")
 
             choice = input("Выберите действие: ")
 
@@ -172,6 +262,9 @@ class NotesManager:
             elif choice == "7":
                 self.export_to_csv()
             elif choice == "8":
+                self.search_notes()
+            elif choice == "9":
+                self.save_search_index()
                 break
             else:
                 print("Неверный ввод, попробуйте снова.")
@@ -0,0 +1,169 @@
+import sys
+
+from modules.storage import JournalStorage
+
+
+def intern_text(value):
+    """
+    Интернирует строку, чтобы повторяющиеся значения (приоритеты, категории,
+    даты) хранились в памяти одним объектом на всё хранилище.
+    """
+    return sys.intern(value) if type(value) is str else value
+
+
+class IdAllocator:
+    """
+    Выдаёт возрастающие ID. Однажды выданный ID больше не используется, даже
+    если запись удалена: последний выданный ID сохраняется вместе с журналом.
+    """
+
+    def __init__(self, last_id=0, reserve=None):
+        self.last_id = last_id
+        self.reserve = reserve
+
+    def observe(self, record_id):
+        if record_id > self.last_id:
+            self.last_id = record_id
+
+    def allocate(self, count=1):
+        """
+        Выдаёт count идущих подряд ID и возвращает первый. reserve, если
+        задан, согласует ID с другими процессами (JournalStorage.reserve_ids).
+        """
+        if self.reserve is None:
+            first = self.last_id + 1
+        else:
+            first = self.reserve(count, self.last_id)
+        self.last_id = first + count - 1
+        return first
+
+
+class RecordStore:
+    """
+    Упорядоченное хранилище записей с доступом по ID за O(1).
+
+    Записи лежат в словаре в порядке добавления, а все изменения сразу
+    дописываются в журнал JournalStorage.
+    """
+
+    def __init__(self, data_path, from_dict):
+        self.from_dict = from_dict
+        self.storage = JournalStorage(data_path, self.snapshot, merge=self._merge)
+        self.ids = IdAllocator()
+        self.indexes = []
+        self._records = {}
+
+    def load(self):
+        self._records = {}
+        for data in self.storage.load():
+            record = self.from_dict(data)
+            self._records[record.id] = record
+        self.ids = IdAllocator(
+            self.storage.meta.get("last_id", 0), self.storage.reserve_ids
+        )
+        return self
+
+    def refresh(self):
+        """
+        Подтягивает изменения, сделанные другими процессами.
+        """
+        return self.storage.sync()
+
+    def _merge(self, op, record_id, data):
+        self.ids.observe(record_id)
+        if record_id in self._records:
+            for index in self.indexes:
+                index.discard(record_id)
+        if op == "delete":
+            self._records.pop(record_id, None)
+            return
+        record = self.from_dict(data)
+        self._records[record_id] = record
+        for index in self.indexes:
+            index.add(record)
+
+    def snapshot(self):
+        self.storage.meta["last_id"] = self.ids.last_id
+        return [record.to_dict() for record in self._records.values()]
+
+    def save(self):
+        self.storage.compact(wait=True)
+
+    def close(self):
+        self.storage.close()
+
+    def stamp(self):
+        return self.storage.stamp()
+
+    def is_stale(self):
+        return self.storage.is_stale()
+
+    def add_index(self, index, build=True):
+        """
+        Подключает вторичный индекс: у него вызываются add(record) и
+        discard(record_id) при каждом изменении хранилища.
+        """
+        if build:
+            for record in self._records.values():
+                index.add(record)
+        self.indexes.append(index)
+        return index
+
+    def next_id(self):
+        return self.ids.allocate()
+
+    def __len__(self):
+        return len(self._records)
+
+    def __iter__(self):
+        return iter(self._records.values())
+
+    def __contains__(self, record_id):
+        return record_id in self._records
+
+    def get(self, record_id):
+        return self._records.get(record_id)
+
+    def add(self, record):
+        self.add_many([record])
+
+    def add_many(self, records):
+        """
+        Добавляет записи и фиксирует их в журнале одной операцией записи.
+        """
+        self.refresh()
+        records = list(records)
+        missing = sum(1 for record in records if record.id is None)
+        next_id = self.ids.allocate(missing) if missing else None
+        operations = []
+        for record in records:
+            if record.id is None:
+                record.id = next_id
+                next_id += 1
+            else:
+                self.ids.observe(record.id)
+            self._records[record.id] = record
+            for index in self.indexes:
+                index.add(record)
+            operations.append(("add", record.id, record.to_dict()))
+        self.storage.append_many(operations)
+
+    def update(self, record):
+        self.refresh()
+        if record.id in self.storage.merged:
+            # Запись изменили в другом процессе, пока её правили здесь
+            self.storage.conflicts += 1
+        self._records[record.id] = record
+        for index in self.indexes:
+            index.discard(record.id)
+            index.add(record)
+        self.storage.append("edit", record.id, record.to_dict())
+
+    def delete(self, record_id):
+        self.refresh()
+        record = self._records.pop(record_id, None)
+        if record is not None:
+            for index in self.indexes:
+                index.discard(record_id)
+            self.storage.append("delete", record_id)
+        return record
@@ -0,0 +1,307 @@
+import bisect
+from datetime import date
+from itertools import accumulate
+
+from modules.deadlines import PRIORITY_NAMES, priority_rank, today_ordinal
+
+# Суммы копятся целыми числами в единицах 2**-1074 (наименьшее положительное
+# число float): любое конечное число float переводится в них без потерь
+EXACT_SHIFT = 1074
+
+
+def exact_amount(amount):
+    try:
+        numerator, denominator = amount.as_integer_ratio()
+    except (OverflowError, ValueError):
+        # inf и nan не проходят проверку ввода (см. parse_amount)
+        return 0
+    return numerator << (EXACT_SHIFT + 1 - denominator.bit_length())
+
+
+def from_exact(total):
+    """
+    Переводит точную сумму в float с одним округлением, как у math.fsum.
+    """
+    return total / (1 << EXACT_SHIFT) if total else 0
+
+
+class Totals:
+    __slots__ = ("income", "expenses", "count")
+
+    def __init__(self):
+        self.income = 0
+        self.expenses = 0
+        self.count = 0
+
+    @property
+    def balance(self):
+        return self.income + self.expenses
+
+
+class FinanceRollups:
+    """
+    Агрегаты финансовых записей по дням, месяцам и категориям.
+
+    Обновляются за O(1) при каждом добавлении, изменении и удалении записи.
+    Суммы хранятся точно (см. exact_amount), поэтому удаление записи и
+    вычитание префиксных сумм не копят ошибку округления: итог за любой
+    период совпадает с math.fsum сумм его записей.
+    Для запросов по периоду по дневным итогам лениво строятся префиксные
+    суммы, общие и по каждой категории, поэтому баланс, разбивка по
+    категориям и по месяцам за любой период считаются бинарными поисками
+    без обхода самих записей.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.days = {}
+        self.months = {}
+        self.categories = {}
+        self.category_days = {}
+        self._month_of = {}
+        self._prefix = None
+        self._category_prefix = {}
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, record):
+        if record.id in self.entries:
+            self.discard(record.id)
+        entry = (record.ordinal, record.amount, record.category)
+        self.entries[record.id] = entry
+        self._apply(entry, 1)
+
+    def discard(self, record_id):
+        entry = self.entries.pop(record_id, None)
+        if entry is not None:
+            self._apply(entry, -1)
+
+    def _apply(self, entry, sign):
+        ordinal, amount, category = entry
+        amount = exact_amount(amount)
+        self._bump(self.categories, category, amount, sign)
+        if ordinal is not None:
+            month = self._month_of.get(ordinal)
+            if month is None:
+                day = date.fromordinal(ordinal)
+                month = self._month_of[ordinal] = (day.year, day.month)
+            self._bump(self.days, ordinal, amount, sign)
+            self._bump(self.months, month, amount, sign)
+            days = self.category_days.get(category)
+            if days is None:
+                days = self.category_days[category] = {}
+            self._bump(days, ordinal, amount, sign)
+            if not days:
+                del self.category_days[category]
+            # Префиксные суммы по дням пересчитаются при следующем запросе
+            self._prefix = None
+            self._category_prefix.pop(category, None)
+
+    @staticmethod
+    def _bump(group, key, amount, sign):
+        totals = group.get(key)
+        if totals is None:
+            totals = group[key] = Totals()
+        if amount > 0:
+            totals.income += sign * amount
+        else:
+            totals.expenses += sign * amount
+        totals.count += sign
+        if not totals.count:
+            del group[key]
+
+    @staticmethod
+    def _build_prefix(group):
+        days = sorted(group)
+        income = [0, *accumulate(group[day].income for day in days)]
+        expenses = [0, *accumulate(group[day].expenses for day in days)]
+        counts = [0, *accumulate(group[day].count for day in days)]
+        return days, income, expenses, counts
+
+    def _prefix_sums(self):
+        if self._prefix is None:
+            self._prefix = self._build_prefix(self.days)
+        return self._prefix
+
+    @staticmethod
+    def _range(prefix, start, end):
+        days, income, expenses, counts = prefix
+        low = bisect.bisect_left(days, start)
+        high = bisect.bisect_right(days, end)
+        return (
+            income[high] - income[low],
+            expenses[high] - expenses[low],
+            counts[high] - counts[low],
+        )
+
+    def totals(self, start=None, end=None):
+        """
+        Возвращает (доходы, расходы) за период [start, end] по дневным итогам
+        или, без границ, за всё время.
+        """
+        if start is None and end is None:
+            totals = self.categories.values()
+            return (
+                from_exact(sum(category.income for category in totals)),
+                from_exact(sum(category.expenses for category in totals)),
+            )
+        start = 1 if start is None else start
+        end = date.max.toordinal() if end is None else end
+        income, expenses, _ = self._range(self._prefix_sums(), start, end)
+        return from_exact(income), from_exact(expenses)
+
+    def category_totals(self, start=None, end=None):
+        """
+        Возвращает балансы по категориям за период или, без границ, за всё
+        время (тогда учитываются и записи без даты).
+        """
+        if start is None and end is None:
+            return {
+                category: from_exact(totals.balance)
+                for category, totals in self.categories.items()
+            }
+        start = 1 if start is None else start
+        end = date.max.toordinal() if end is None else end
+        result = {}
+        for category, days in self.category_days.items():
+            prefix = self._category_prefix.get(category)
+            if prefix is None:
+                prefix = self._category_prefix[category] = self._build_prefix(days)
+            income, expenses, count = self._range(prefix, start, end)
+            if count:
+                result[category] = from_exact(income + expenses)
+        return result
+
+    def monthly(self, start=None, end=None):
+        """
+        Возвращает [(год, месяц, доходы, расходы, количество)] по возрастанию,
+        за всё время или только за дни периода [start, end].
+        """
+        if start is None and end is None:
+            return [
+                (
+                    year,
+                    month,
+                    from_exact(totals.income),
+                    from_exact(totals.expenses),
+                    totals.count,
+                )
+                for (year, month), totals in sorted(self.months.items())
+            ]
+        start = 1 if start is None else start
+        end = date.max.toordinal() if end is None else end
+        prefix = self._prefix_sums()
+        result = []
+        for year, month in sorted(self.months):
+            first = date(year, month, 1).toordinal()
+            if month == 12:
+                last = date(year, 12, 31).toordinal()
+            else:
+                last = date(year, month + 1, 1).toordinal() - 1
+            if last < start or first > end:
+                continue
+            income, expenses, count = self._range(
+                prefix, max(first, start), min(last, end)
+            )
+            if count:
+                result.append(
+                    (year, month, from_exact(income), from_exact(expenses), count)
+                )
+        return result
+
+
+class TaskStats:
+    """
+    Счётчики задач: выполненные и открытые, по приоритетам и по месяцам
+    срока.
+
+    Как и FinanceRollups, обновляются за O(1) при каждом добавлении,
+    изменении и удалении задачи, так что сводка не обходит задачи. Число
+    просроченных считается по числу открытых задач на каждый день срока с
+    лениво построенными префиксными суммами.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.done = 0
+        self.priorities = {}
+        self.months = {}
+        self.open_days = {}
+        self._prefix = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, task):
+        if task.id in self.entries:
+            self.discard(task.id)
+        month = None
+        if task.due is not None:
+            day = date.fromordinal(task.due)
+            month = (day.year, day.month)
+        entry = (bool(task.done), priority_rank(task.priority), task.due, month)
+        self.entries[task.id] = entry
+        self._apply(entry, 1)
+
+    def discard(self, task_id):
+        entry = self.entries.pop(task_id, None)
+        if entry is not None:
+            self._apply(entry, -1)
+
+    def _apply(self, entry, sign):
+        done, rank, due, month = entry
+        self.done += sign * done
+        self._bump(self.priorities, rank, done, sign)
+        if month is not None:
+            self._bump(self.months, month, done, sign)
+            if not done:
+                count = self.open_days.get(due, 0) + sign
+                if count:
+                    self.open_days[due] = count
+                else:
+                    del self.open_days[due]
+                self._prefix = None
+
+    @staticmethod
+    def _bump(group, key, done, sign):
+        counts = group.get(key)
+        if counts is None:
+            counts = group[key] = [0, 0]
+        counts[done] += sign
+        if not counts[0] and not counts[1]:
+            del group[key]
+
+    def overdue(self, today):
+        """
+        Число открытых задач со сроком раньше today.
+        """
+        if self._prefix is None:
+            days = sorted(self.open_days)
+            counts = [0, *accumulate(self.open_days[day] for day in days)]
+            self._prefix = (days, counts)
+        days, counts = self._prefix
+        return counts[bisect.bisect_left(days, today)]
+
+    def summary(self, today=None):
+        """
+        Возвращает сводку: total, done, open, overdue, by_priority
+        {приоритет: (открытые, выполненные)} и by_month
+        [(год, месяц, открытые, выполненные)] по возрастанию.
+        """
+        if today is None:
+            today = today_ordinal()
+        return {
+            "total": len(self.entries),
+            "done": self.done,
+            "open": len(self.entries) - self.done,
+            "overdue": self.overdue(today),
+            "by_priority": {
+                PRIORITY_NAMES[rank]: tuple(counts)
+                for rank, counts in sorted(self.priorities.items())
+            },
+            "by_month": [
+                (year, month, *counts)
+                for (year, month), counts in sorted(self.months.items())
+            ],
+        }
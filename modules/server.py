@@ -0,0 +1,265 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+
+from modules.commands import OPERATIONS, SECTIONS, CommandRunner
+from modules.session import managers
+from modules.tracing import tracer
+
+WRITES = ("add", "edit", "delete", "done")
+SERVICE = ("ping", "stats")
+
+
+def percentile(ordered, fraction):
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+class LatencyStats:
+    """
+    Задержки запросов по операциям: общее число и последние size замеров,
+    по которым считаются перцентили.
+    """
+
+    def __init__(self, size=10000):
+        self.size = size
+        self.counts = {}
+        self.samples = {}
+
+    def record(self, op, seconds):
+        samples = self.samples.get(op)
+        if samples is None:
+            samples = self.samples[op] = deque(maxlen=self.size)
+        samples.append(seconds)
+        self.counts[op] = self.counts.get(op, 0) + 1
+
+    def summary(self):
+        result = {}
+        for op, samples in self.samples.items():
+            ordered = sorted(samples)
+            result[op] = {
+                "count": self.counts[op],
+                "p50_ms": percentile(ordered, 0.5) * 1000,
+                "p95_ms": percentile(ordered, 0.95) * 1000,
+                "p99_ms": percentile(ordered, 0.99) * 1000,
+                "max_ms": ordered[-1] * 1000,
+            }
+        return result
+
+
+class AssistantServer:
+    """
+    Локальный сервер над общими менеджерами разделов.
+
+    Протокол: по строке JSON на запрос и на ответ. Запрос - команда
+    CommandRunner ({"op": ..., "section": ..., ...}) и необязательный
+    "rid", который возвращается в ответе: ответы на запросы одного
+    соединения приходят по мере готовности. Служебные операции: "ping" и
+    "stats" (задержки, очереди, счётчики).
+
+    Записи ставятся в очередь своего раздела. Писатель раздела забирает из
+    неё до batch_size команд, применяет их по порядку и один раз сбрасывает
+    журналы на диск. Клиенты получают ответ после fsync. Чтения выполняет
+    один общий CommandRunner. Работа с менеджерами (подтягивание чужих
+    изменений, загрузка, команды) идёт в пуле потоков под asyncio.Lock
+    раздела, так что цикл событий не ждёт ни блокировок, ни fsync, а чтения
+    не ждут сброса записей на диск.
+
+    Противодавление: очереди ограничены queue_size, а одно соединение
+    держит не больше max_in_flight незавершённых запросов. Пока слотов нет,
+    сервер не читает сокет, и клиент упирается в буферы ядра.
+    """
+
+    def __init__(
+        self,
+        database_path=None,
+        batch_size=256,
+        queue_size=1024,
+        max_in_flight=64,
+        columnar=False,
+    ):
+        self.database_path = database_path
+        self.columnar = columnar
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.max_in_flight = max_in_flight
+        self.latency = LatencyStats()
+        self.reader = CommandRunner(database_path, columnar=columnar)
+        self.locks = {}
+        self.queues = {}
+        self.writers = []
+        self.connections = 0
+        self.in_flight = 0
+        self.batches = 0
+        self.batched_writes = 0
+
+    async def start(self, host="127.0.0.1", port=8765, socket_path=None):
+        for name in SECTIONS:
+            self.locks[name] = asyncio.Lock()
+            queue = self.queues[name] = asyncio.Queue(self.queue_size)
+            self.writers.append(asyncio.create_task(self._write_loop(name, queue)))
+        if socket_path:
+            return await asyncio.start_unix_server(self.handle, path=socket_path)
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        slots = asyncio.Semaphore(self.max_in_flight)
+        send_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                await slots.acquire()
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError):
+                    # Обрыв соединения или слишком длинная строка
+                    break
+                if not line:
+                    break
+                task = asyncio.create_task(self._serve(line, writer, send_lock, slots))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _serve(self, line, writer, send_lock, slots):
+        start = time.perf_counter()
+        self.in_flight += 1
+        op = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError:
+                # CommandRunner вернёт ошибку разбора
+                request = line.decode("utf-8", "replace")
+            if isinstance(request, dict):
+                op = request.get("op")
+                rid = request.get("rid")
+            else:
+                rid = None
+            try:
+                response = await self._dispatch(op, request)
+            except Exception as e:
+                # Клиент всегда получает ответ, даже если запрос сломал сервер
+                response = {"ok": False, "error": str(e)}
+            response.pop("n", None)
+            if rid is not None:
+                response["rid"] = rid
+            data = (json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8")
+            async with send_lock:
+                writer.write(data)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.in_flight -= 1
+            slots.release()
+            if op not in OPERATIONS and op not in SERVICE:
+                op = "invalid"
+            self.latency.record(op, time.perf_counter() - start)
+
+    async def _dispatch(self, op, request):
+        if op == "ping":
+            return {"ok": True}
+        if op == "stats":
+            return dict(self.stats(), ok=True)
+        if op in WRITES:
+            section = "tasks" if op == "done" else request.get("section")
+            queue = self.queues.get(section) if isinstance(section, str) else None
+            if queue is not None:
+                future = asyncio.get_running_loop().create_future()
+                await queue.put((request, future))
+                return await future
+        section = request.get("section") if isinstance(request, dict) else None
+        lock = self.locks.get(section) if isinstance(section, str) else None
+        if lock is None:
+            # Ошибочный запрос: CommandRunner сам сформирует ответ
+            return self.reader.execute(request)
+        async with lock:
+            return await asyncio.get_running_loop().run_in_executor(
+                None, self._read, section, request
+            )
+
+    def _read(self, section, request):
+        # Менеджер берётся из реестра заново, чтобы подтянуть чужие записи
+        self.reader.reset(section)
+        return self.reader.execute(request)
+
+    async def _write_loop(self, section, queue):
+        runner = CommandRunner(self.database_path, columnar=self.columnar)
+        lock = self.locks[section]
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            results = [{"ok": False, "error": "Запись не выполнена"} for _ in batch]
+            try:
+                async with lock:
+                    results = await loop.run_in_executor(
+                        None, self._write, runner, batch
+                    )
+                await loop.run_in_executor(None, managers.flush)
+            except Exception as e:
+                results = [{"ok": False, "error": str(e)} for _ in batch]
+            finally:
+                self.batches += 1
+                self.batched_writes += len(batch)
+                for (_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+
+    @staticmethod
+    def _write(runner, batch):
+        # Менеджеры берутся из реестра заново на каждую пачку: если реестр
+        # перезагрузил устаревший менеджер, писать в закрытый старый нельзя
+        runner.reset()
+        # execute() сам превращает ошибку команды в её результат,
+        # поэтому плохой запрос не останавливает писателя раздела
+        results = [runner.execute(request) for request, _ in batch]
+        runner.flush_adds()
+        return results
+
+    def stats(self):
+        stats = {
+            "connections": self.connections,
+            "in_flight": self.in_flight,
+            "queues": {name: queue.qsize() for name, queue in self.queues.items()},
+            "write_batches": self.batches,
+            "writes": self.batched_writes,
+            "latency": self.latency.summary(),
+            "managers": managers.stats(),
+        }
+        if tracer.enabled:
+            stats["trace"] = tracer.summary()
+        return stats
+
+
+async def run_server(server, host, port, socket_path):
+    listener = await server.start(host, port, socket_path)
+    address = socket_path or f"{host}:{port}"
+    print(f"Сервер слушает {address}", flush=True)
+    async with listener:
+        await listener.serve_forever()
+
+
+def serve(database_path=None, host="127.0.0.1", port=8765, socket_path=None, **kwargs):
+    """
+    Запускает сервер и работает до Ctrl+C; на выходе дописывает журналы и
+    закрывает менеджеры.
+    """
+    server = AssistantServer(database_path, **kwargs)
+    try:
+        asyncio.run(run_server(server, host, port, socket_path))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        managers.flush()
+        managers.close()
+        if socket_path and os.path.exists(socket_path):
+            os.remove(socket_path)
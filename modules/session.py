@@ -0,0 +1,97 @@
+import os
+import threading
+
+from modules.storage import journal_writer
+
+
+TRUE_VALUES = ("1", "true", "yes", "on", "да")
+
+
+def env_flag(name):
+    """
+    Включён ли флаг в переменной окружения name: 1, true, yes, on или да.
+    """
+    return os.environ.get(name, "").strip().lower() in TRUE_VALUES
+
+
+class ManagerRegistry:
+    """
+    Кэш загруженных менеджеров на всё время работы процесса.
+
+    Менеджер создаётся при первом обращении и переиспользуется дальше. При
+    каждом обращении он подтягивает операции, которые другие процессы
+    дописали в журнал после него, без полной перезагрузки. Если же файлы
+    изменили в обход блокировки (проверяются inode, время изменения и размер
+    снимка и журнала), менеджер загружается заново. Счётчики hits/misses
+    показывают попадания в кэш, merged - сколько чужих операций было влито,
+    reloads - сколько раз пришлось перезагружаться.
+    """
+
+    def __init__(self):
+        self.managers = {}
+        self.hits = 0
+        self.misses = 0
+        self.merged = 0
+        self.reloads = 0
+        self._lock = threading.Lock()
+
+    def get(self, factory, data_path, **options):
+        key = (factory, data_path, tuple(sorted(options.items())))
+        with self._lock:
+            manager = self.managers.get(key)
+            if manager is None:
+                self.misses += 1
+            else:
+                merged = manager.refresh()
+                if not manager.is_stale():
+                    self.hits += 1
+                    self.merged += merged
+                    return manager
+                self.reloads += 1
+                manager.close()
+            manager = self.managers[key] = factory(data_path, **options)
+            return manager
+
+    def cached(self, factory, data_path, **options):
+        """
+        Возвращает уже загруженный менеджер или None, ничего не загружая.
+        """
+        key = (factory, data_path, tuple(sorted(options.items())))
+        with self._lock:
+            return self.managers.get(key)
+
+    def open(self, factory, json_path, database_path=None, **options):
+        """
+        Возвращает менеджер раздела: по его JSON-файлу или, если задан
+        database_path, по общей базе SQLite, куда данные из JSON переносятся
+        при первом открытии. options передаются конструктору менеджера.
+        """
+        if not database_path:
+            return self.get(factory, json_path, **options)
+        manager = self.get(factory, database_path, **options)
+        manager.migrate_from_json(json_path)
+        return manager
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "merged": self.merged,
+            "reloads": self.reloads,
+            "writer": journal_writer.stats(),
+        }
+
+    def flush(self):
+        """
+        Дописывает на диск все отложенные фоновым потоком операции.
+        """
+        journal_writer.flush()
+
+    def close(self):
+        with self._lock:
+            for manager in self.managers.values():
+                manager.close()
+            self.managers.clear()
+
+
+managers = ManagerRegistry()
@@ -0,0 +1,528 @@
+import os
+import sqlite3
+
+from modules.dates import parse_date
+from modules.deadlines import PRIORITY_NAMES, priority_rank, today_ordinal
+from modules.fulltext import tokenize
+from modules.ngram import normalize_phone, normalize_text
+from modules.storage import JournalStorage
+
+DATABASE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+# Логические значения хранятся как 0/1 и возвращаются как bool
+sqlite3.register_converter("BOOLEAN", lambda value: value == b"1")
+
+
+def is_database(path):
+    return os.path.splitext(path)[1].lower() in DATABASE_SUFFIXES
+
+
+class SqlTable:
+    """
+    Схема таблицы записей: columns - [(имя, тип)] полей to_dict() кроме id,
+    derived - {имя: (тип, функция от словаря записи)} для вычисляемых
+    колонок, по которым строятся индексы, indexes - кортежи колонок
+    вторичных индексов, fts - колонки полнотекстового индекса FTS5.
+    """
+
+    def __init__(self, name, columns, derived=None, indexes=(), fts=None):
+        self.name = name
+        self.columns = columns
+        self.derived = derived or {}
+        self.indexes = indexes
+        self.fts = fts
+
+    def statements(self):
+        name = self.name
+        columns = [f"{column} {kind}" for column, kind in self.columns]
+        columns += [f"{column} {kind}" for column, (kind, _) in self.derived.items()]
+        yield (
+            f"CREATE TABLE IF NOT EXISTS {name} "
+            f"(id INTEGER PRIMARY KEY, {', '.join(columns)})"
+        )
+        for index in self.indexes:
+            yield (
+                f"CREATE INDEX IF NOT EXISTS {name}_{'_'.join(index)} "
+                f"ON {name} ({', '.join(index)})"
+            )
+        if self.fts:
+            fts = ", ".join(self.fts)
+            new = ", ".join(f"new.{column}" for column in self.fts)
+            old = ", ".join(f"old.{column}" for column in self.fts)
+            yield (
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {name}_fts USING fts5"
+                f"({fts}, content='{name}', content_rowid='id')"
+            )
+            # Внешнее содержимое FTS5 синхронизируется триггерами
+            yield (
+                f"CREATE TRIGGER IF NOT EXISTS {name}_fts_insert AFTER INSERT ON "
+                f"{name} BEGIN INSERT INTO {name}_fts (rowid, {fts}) "
+                f"VALUES (new.id, {new}); END"
+            )
+            yield (
+                f"CREATE TRIGGER IF NOT EXISTS {name}_fts_delete AFTER DELETE ON "
+                f"{name} BEGIN INSERT INTO {name}_fts ({name}_fts, rowid, {fts}) "
+                f"VALUES ('delete', old.id, {old}); END"
+            )
+            yield (
+                f"CREATE TRIGGER IF NOT EXISTS {name}_fts_update AFTER UPDATE ON "
+                f"{name} BEGIN INSERT INTO {name}_fts ({name}_fts, rowid, {fts}) "
+                f"VALUES ('delete', old.id, {old}); INSERT INTO {name}_fts "
+                f"(rowid, {fts}) VALUES (new.id, {new}); END"
+            )
+
+
+NOTES_TABLE = SqlTable(
+    "notes",
+    [("title", "TEXT"), ("content", "TEXT"), ("timestamp", "TEXT")],
+    fts=("title", "content"),
+)
+TASKS_TABLE = SqlTable(
+    "tasks",
+    [
+        ("title", "TEXT"),
+        ("description", "TEXT"),
+        ("done", "BOOLEAN"),
+        ("priority", "TEXT"),
+        ("due_date", "TEXT"),
+    ],
+    derived={"due_ordinal": ("INTEGER", lambda data: parse_date(data["due_date"]))},
+    indexes=[("due_ordinal",), ("priority",), ("done",)],
+)
+CONTACTS_TABLE = SqlTable(
+    "contacts",
+    [("name", "TEXT"), ("phone", "TEXT"), ("email", "TEXT")],
+    derived={
+        "name_key": ("TEXT", lambda data: normalize_text(data["name"])),
+        "phone_key": ("TEXT", lambda data: normalize_phone(data["phone"])),
+    },
+    indexes=[("name_key",), ("phone_key",)],
+)
+FINANCE_TABLE = SqlTable(
+    "finances",
+    [
+        ("amount", "REAL"),
+        ("category", "TEXT"),
+        ("date", "TEXT"),
+        ("description", "TEXT"),
+    ],
+    derived={
+        "ordinal": ("INTEGER", lambda data: parse_date(data["date"])),
+        "category_key": ("TEXT", lambda data: data["category"].lower()),
+    },
+    indexes=[("ordinal",), ("category_key",)],
+)
+
+
+class SqliteRecordStore:
+    """
+    Хранилище записей в таблице SQLite с тем же интерфейсом, что и
+    RecordStore.
+
+    База работает в режиме WAL, все запросы параметризованы и собираются
+    один раз, поэтому sqlite3 переиспользует подготовленные выражения.
+    Последний выданный ID хранится в таблице meta и выдаётся атомарно, так
+    что несколько процессов не получат одинаковых ID. Данные читаются из
+    базы при каждом обращении, поэтому хранилище никогда не устаревает.
+    """
+
+    def __init__(self, db_path, table, from_dict):
+        self.db_path = db_path
+        self.table = table
+        self.from_dict = from_dict
+        self.indexes = []
+        self.connection = None
+        self.fields = ["id", *(column for column, _ in table.columns)]
+        names = [*self.fields, *table.derived]
+        placeholders = ", ".join("?" * len(names))
+        updates = ", ".join(f"{name} = excluded.{name}" for name in names[1:])
+        self._select = f"SELECT {', '.join(self.fields)} FROM {table.name}"
+        self._upsert = (
+            f"INSERT INTO {table.name} ({', '.join(names)}) VALUES ({placeholders}) "
+            f"ON CONFLICT(id) DO UPDATE SET {updates}"
+        )
+        self._id_key = f"last_id:{table.name}"
+
+    def load(self):
+        self.close()
+        connection = sqlite3.connect(
+            self.db_path,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+        )
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)"
+            )
+            for statement in self.table.statements():
+                connection.execute(statement)
+            connection.execute(
+                "INSERT OR IGNORE INTO meta (key, value) "
+                f"SELECT ?, coalesce(max(id), 0) FROM {self.table.name}",
+                (self._id_key,),
+            )
+        self.connection = connection
+        return self
+
+    def _record(self, cursor, row):
+        return self.from_dict(dict(zip(self.fields, row)))
+
+    def _values(self, record):
+        data = record.to_dict()
+        values = [data[field] for field in self.fields]
+        for _, function in self.table.derived.values():
+            values.append(function(data))
+        return values
+
+    def select(self, where="", params=(), order="id", limit=None):
+        """
+        Отдаёт записи, подходящие под условие where, по одной из курсора.
+        """
+        query = self._select
+        if where:
+            query += f" WHERE {where}"
+        query += f" ORDER BY {order}"
+        if limit is not None:
+            query += " LIMIT ?"
+            params = (*params, limit)
+        cursor = self.connection.cursor()
+        cursor.row_factory = self._record
+        return cursor.execute(query, params)
+
+    def scalar(self, query, params=()):
+        return self.connection.execute(query, params).fetchone()[0]
+
+    def save(self):
+        self.connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def is_stale(self):
+        return False
+
+    def refresh(self):
+        return 0
+
+    def add_index(self, index, build=True):
+        if build:
+            for record in self:
+                index.add(record)
+        self.indexes.append(index)
+        return index
+
+    def _reserve(self, count):
+        """
+        Резервирует count новых ID и возвращает первый из них.
+        """
+        last_id = self.connection.execute(
+            "UPDATE meta SET value = value + ? WHERE key = ? RETURNING value",
+            (count, self._id_key),
+        ).fetchone()[0]
+        return last_id - count + 1
+
+    def next_id(self):
+        with self.connection:
+            return self._reserve(1)
+
+    def __len__(self):
+        return self.scalar(f"SELECT count(*) FROM {self.table.name}")
+
+    def __iter__(self):
+        return iter(self.select())
+
+    def __contains__(self, record_id):
+        query = f"SELECT 1 FROM {self.table.name} WHERE id = ?"
+        return self.connection.execute(query, (record_id,)).fetchone() is not None
+
+    def get(self, record_id):
+        return next(iter(self.select("id = ?", (record_id,))), None)
+
+    def add(self, record):
+        self.add_many([record])
+
+    def add_many(self, records):
+        """
+        Добавляет записи одной транзакцией.
+        """
+        records = list(records)
+        with self.connection:
+            missing = [record for record in records if record.id is None]
+            if missing:
+                first_id = self._reserve(len(missing))
+                for offset, record in enumerate(missing):
+                    record.id = first_id + offset
+            top_id = max((record.id for record in records), default=0)
+            self.connection.execute(
+                "UPDATE meta SET value = max(value, ?) WHERE key = ?",
+                (top_id, self._id_key),
+            )
+            self.connection.executemany(self._upsert, map(self._values, records))
+        for record in records:
+            for index in self.indexes:
+                index.add(record)
+
+    def update(self, record):
+        with self.connection:
+            self.connection.execute(self._upsert, self._values(record))
+        for index in self.indexes:
+            index.discard(record.id)
+            index.add(record)
+
+    def delete(self, record_id):
+        record = self.get(record_id)
+        if record is not None:
+            with self.connection:
+                self.connection.execute(
+                    f"DELETE FROM {self.table.name} WHERE id = ?", (record_id,)
+                )
+            for index in self.indexes:
+                index.discard(record_id)
+        return record
+
+    def search(self, query, limit=10, weights=None):
+        """
+        Полнотекстовый поиск по FTS5 с тем же синтаксисом запроса, что и у
+        InvertedIndex.search. Возвращает до limit пар (id, оценка BM25).
+        """
+        match = fts_query(query)
+        if not match:
+            return []
+        name = self.table.name
+        weights = ", ".join(str(weight) for weight in weights or ())
+        rank = f"bm25({name}_fts{', ' if weights else ''}{weights})"
+        rows = self.connection.execute(
+            f"SELECT rowid, -{rank} FROM {name}_fts WHERE {name}_fts MATCH ? "
+            f"ORDER BY {rank} LIMIT ?",
+            (match, limit),
+        )
+        return rows.fetchall()
+
+    def import_json(self, json_path):
+        """
+        Однократно переносит записи из JSON-хранилища (снимок и журнал).
+        Повторный вызов для того же файла ничего не делает. Возвращает число
+        перенесённых записей.
+        """
+        key = f"imported:{os.path.abspath(json_path)}"
+        query = "SELECT 1 FROM meta WHERE key = ?"
+        if self.connection.execute(query, (key,)).fetchone() is not None:
+            return 0
+        storage = JournalStorage(json_path, None)
+        records = [self.from_dict(data) for data in storage.load()]
+        storage.close()
+        self.add_many(records)
+        with self.connection:
+            self.connection.execute(
+                "UPDATE meta SET value = max(value, ?) WHERE key = ?",
+                (storage.meta.get("last_id", 0), self._id_key),
+            )
+            self.connection.execute(
+                "INSERT INTO meta (key, value) VALUES (?, ?)", (key, len(records))
+            )
+        return len(records)
+
+
+def fts_query(query):
+    """
+    Переводит запрос в синтаксис FTS5: слова группы объединяются через AND,
+    группы - через OR, "слово*" ищет по префиксу.
+    """
+    groups = [[]]
+    for token in query.split():
+        if token in ("OR", "ИЛИ", "|"):
+            groups.append([])
+            continue
+        words = [f'"{word}"' for word in tokenize(token)]
+        if token.endswith("*") and words:
+            words[-1] += "*"
+        groups[-1].extend(words)
+    return " OR ".join(f"({' AND '.join(group)})" for group in groups if group)
+
+
+class SqliteFinanceStore(SqliteRecordStore):
+    """
+    Финансовые записи в SQLite. Фильтры по датам и категориям и итоги
+    считаются запросами по индексированным колонкам ordinal и category_key,
+    с тем же интерфейсом, что и у ColumnarFinanceStore.
+    """
+
+    def __init__(self, db_path, from_dict):
+        super().__init__(db_path, FINANCE_TABLE, from_dict)
+
+    @staticmethod
+    def _period(start, end, category=None):
+        conditions = []
+        params = []
+        if start is not None:
+            conditions.append("ordinal >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("ordinal <= ?")
+            params.append(end)
+        if category is not None:
+            conditions.append("category_key = ?")
+            params.append(category.lower())
+        return " AND ".join(conditions), params
+
+    def totals(self, start=None, end=None):
+        """
+        Возвращает (доходы, расходы) за период [start, end] или за всё время.
+        """
+        where, params = self._period(start, end)
+        query = (
+            "SELECT total(CASE WHEN amount > 0 THEN amount END), "
+            "total(CASE WHEN amount <= 0 THEN amount END) FROM finances"
+        )
+        if where:
+            query += f" WHERE {where}"
+        return tuple(self.connection.execute(query, params).fetchone())
+
+    def category_totals(self, start=None, end=None):
+        where, params = self._period(start, end)
+        query = "SELECT category, total(amount) FROM finances"
+        if where:
+            query += f" WHERE {where}"
+        query += " GROUP BY category"
+        return dict(self.connection.execute(query, params).fetchall())
+
+    def monthly(self, start=None, end=None):
+        """
+        Итоги по месяцам в том же виде, что и FinanceRollups.monthly.
+        """
+        where, params = self._period(start, end)
+        # ordinal - номер дня от 01.01.0001, julianday 1721424.5 - его ноль
+        month = "strftime('%Y-%m', ordinal + 1721424.5)"
+        query = (
+            f"SELECT {month}, total(CASE WHEN amount > 0 THEN amount END), "
+            "total(CASE WHEN amount <= 0 THEN amount END), count(*) "
+            "FROM finances WHERE ordinal IS NOT NULL"
+        )
+        if where:
+            query += f" AND {where}"
+        query += f" GROUP BY {month} ORDER BY {month}"
+        return [
+            (int(key[:4]), int(key[5:]), income, expenses, count)
+            for key, income, expenses, count in self.connection.execute(query, params)
+        ]
+
+    def between(self, start, end):
+        where, params = self._period(start, end)
+        return list(self.select(where, params, order="ordinal, id"))
+
+    def on(self, ordinal):
+        return self.between(ordinal, ordinal)
+
+    def with_category(self, category):
+        where, params = self._period(None, None, category)
+        return list(self.select(where, params))
+
+    def iter_rows(self, start=None, end=None, category=None):
+        """
+        Отдаёт кортежи (id, amount, category, date, description) прямо из
+        курсора, с необязательным фильтром по периоду и категории.
+        """
+        where, params = self._period(start, end, category)
+        query = "SELECT id, amount, category, date, description FROM finances"
+        if where:
+            query += f" WHERE {where}"
+        if start is None and end is None:
+            query += " ORDER BY id"
+        else:
+            # Выгрузка за период идёт в порядке дат, как у DateIndex
+            query += " ORDER BY ordinal, id"
+        return self.connection.execute(query, params)
+
+
+class SqliteTaskStore(SqliteRecordStore):
+    """
+    Задачи в SQLite. Запросы по срокам (см. DeadlineIndex) идут по
+    индексированной колонке due_ordinal, ранг приоритета считается той же
+    функцией priority_rank, зарегистрированной в соединении.
+    """
+
+    OPEN_ORDER = "due_ordinal, priority_rank(priority), id"
+
+    def __init__(self, db_path, from_dict):
+        super().__init__(db_path, TASKS_TABLE, from_dict)
+
+    def load(self):
+        super().load()
+        self.connection.create_function(
+            "priority_rank", 1, priority_rank, deterministic=True
+        )
+        return self
+
+    def upcoming(self, limit=10):
+        tasks = list(
+            self.select(
+                "NOT done AND due_ordinal IS NOT NULL",
+                order=self.OPEN_ORDER,
+                limit=limit,
+            )
+        )
+        if len(tasks) < limit:
+            tasks.extend(
+                self.select(
+                    "NOT done AND due_ordinal IS NULL",
+                    order="priority_rank(priority), id",
+                    limit=limit - len(tasks),
+                )
+            )
+        return tasks
+
+    def overdue(self, today=None):
+        if today is None:
+            today = today_ordinal()
+        return list(
+            self.select("NOT done AND due_ordinal < ?", (today,), order=self.OPEN_ORDER)
+        )
+
+    def due_within(self, days, today=None):
+        if today is None:
+            today = today_ordinal()
+        return list(
+            self.select(
+                "NOT done AND due_ordinal BETWEEN ? AND ?",
+                (today, today + days),
+                order=self.OPEN_ORDER,
+            )
+        )
+
+    def summary(self, today=None):
+        """
+        Сводка в том же виде, что TaskStats.summary, посчитанная запросами.
+        """
+        if today is None:
+            today = today_ordinal()
+        done = self.scalar("SELECT count(*) FROM tasks WHERE done")
+        total = len(self)
+        overdue = self.scalar(
+            "SELECT count(*) FROM tasks WHERE NOT done AND due_ordinal < ?", (today,)
+        )
+        by_priority = {}
+        for rank, open_count, done_count in self.connection.execute(
+            "SELECT priority_rank(priority) AS rank, total(NOT done), total(done) "
+            "FROM tasks GROUP BY rank ORDER BY rank"
+        ):
+            by_priority[PRIORITY_NAMES[rank]] = (int(open_count), int(done_count))
+        by_month = []
+        for month, open_count, done_count in self.connection.execute(
+            "SELECT strftime('%Y-%m', due_ordinal + 1721424.5) AS month, "
+            "total(NOT done), total(done) FROM tasks "
+            "WHERE due_ordinal IS NOT NULL GROUP BY month ORDER BY month"
+        ):
+            year, month = month.split("-")
+            by_month.append((int(year), int(month), int(open_count), int(done_count)))
+        return {
+            "total": total,
+            "done": done,
+            "open": total - done,
+            "overdue": overdue,
+            "by_priority": by_priority,
+            "by_month": by_month,
+        }
@@ -0,0 +1,651 @@
+import atexit
+import json
+import marshal
+import os
+import threading
+import time
+
+from modules.locking import FileLock
+
+# Версия формата бинарного кэша снимка; при изменении старые кэши игнорируются
+CACHE_VERSION = 1
+CACHE_MAGIC = b"PACACHE"
+
+
+def fsync_directory(path):
+    """
+    Сбрасывает на диск запись каталога, чтобы os.replace пережил сбой питания.
+    """
+    try:
+        descriptor = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+def replace_durably(temp_path, path):
+    os.replace(temp_path, path)
+    fsync_directory(path)
+
+
+class JournalWriter:
+    """
+    Фоновый поток, который дописывает журналы операций.
+
+    Хранилища складывают готовые строки журнала в свой буфер и отмечаются
+    здесь как изменённые. Поток выжидает delay секунд, чтобы собрать серию
+    быстрых правок, и записывает буфер каждого хранилища одним вызовом write
+    с последующим fsync. flush() делает то же самое сразу в вызывающем потоке.
+    Счётчики: requests - сколько раз хранилища просили записать,
+    writes - сколько записей на диск реально сделано.
+    """
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.requests = 0
+        self.writes = 0
+        self.bytes_written = 0
+        self._dirty = set()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    def schedule(self, storage):
+        with self._condition:
+            self.requests += 1
+            self._dirty.add(storage)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def _take(self, storage=None):
+        with self._condition:
+            if storage is None:
+                dirty = list(self._dirty)
+                self._dirty.clear()
+            elif storage in self._dirty:
+                self._dirty.discard(storage)
+                dirty = [storage]
+            else:
+                dirty = []
+        return dirty
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._dirty:
+                    self._condition.wait()
+            time.sleep(self.delay)
+            self.flush()
+
+    def flush(self, storage=None):
+        """
+        Записывает накопленные операции всех хранилищ (или одного storage).
+        """
+        for dirty in self._take(storage):
+            written = dirty._write_pending()
+            if written:
+                with self._condition:
+                    self.writes += 1
+                    self.bytes_written += written
+
+    @property
+    def coalesced(self):
+        """
+        Сколько записей на диск сэкономлено объединением правок.
+        """
+        return max(self.requests - self.writes, 0)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "writes": self.writes,
+            "coalesced": self.coalesced,
+            "bytes": self.bytes_written,
+        }
+
+
+journal_writer = JournalWriter()
+atexit.register(journal_writer.flush)
+
+
+class JournalStorage:
+    """
+    Хранилище записей на основе журнала операций (JSON Lines).
+
+    Снимок хранится в исходном файле data/*.json как JSON-массив (по одной записи
+    на строку), а каждая операция добавления/изменения/удаления дописывается в
+    журнал рядом с ним. При загрузке журнал проигрывается поверх снимка, а при
+    превышении порогов снимок пересобирается в фоновом потоке.
+
+    Операции дописываются в журнал фоновым потоком JournalWriter, снимок и
+    журнал заменяются атомарно: запись во временный файл, fsync, os.replace.
+
+    Несколько процессов могут работать с одними файлами. Запись в журнал и
+    сжатие идут под межпроцессной блокировкой FileLock, которая хранит и
+    общий счётчик версий. Если версия на диске ушла вперёд, sync() дочитывает
+    чужие операции и передаёт их в merge(op, id, data) хранилища. Конфликт
+    (запись меняли оба процесса) решается по порядку в журнале - так же, как
+    при следующей загрузке, - и учитывается в conflicts.
+
+    Рядом со снимком лежит его бинарная копия (marshal) с отпечатком файла
+    снимка. Если отпечаток совпадает, снимок читается из неё одним чтением без
+    разбора JSON, иначе - из JSON, после чего копия пересоздаётся.
+    """
+
+    def __init__(
+        self,
+        data_path,
+        snapshot,
+        compact_min_entries=100,
+        compact_ratio=0.5,
+        compact_min_bytes=4 * 1024 * 1024,
+        writer=None,
+        merge=None,
+    ):
+        self.data_path = data_path
+        self.journal_path = os.path.splitext(data_path)[0] + ".journal"
+        self.cache_path = os.path.splitext(data_path)[0] + ".cache"
+        self.snapshot = snapshot
+        self.compact_min_entries = compact_min_entries
+        self.compact_ratio = compact_ratio
+        self.compact_min_bytes = compact_min_bytes
+        self.writer = writer or journal_writer
+        self.merge = merge
+        self.lock = FileLock(os.path.splitext(data_path)[0] + ".lock")
+        self.version = 0
+        self.conflicts = 0
+        self.merged = set()
+        self.meta = {}
+        self.own_stamp = None
+        self.record_count = 0
+        self.journal_entries = 0
+        self.journal_size = 0
+        self.snapshot_size = 0
+        self._journal = None
+        self._pending = []
+        self._pending_entries = 0
+        self._pending_size = 0
+        self._pending_ids = []
+        # Смещения в журнале: своих последних записей по ID и ещё не
+        # прочитанных чужих операций; сбрасываются при каждой sync()
+        self._written = {}
+        self._foreign = []
+        self._journal_ino = 0
+        self._replaced = False
+        self._lock = threading.Lock()
+        # Не даёт двум потокам одновременно запустить сжатие
+        self._compact_lock = threading.Lock()
+        self._compaction = None
+
+    def load(self):
+        """
+        Читает снимок, проигрывает поверх него журнал и возвращает список записей
+        (словарей) в порядке добавления.
+        """
+        with self.lock.shared():
+            result = self._load()
+            self.version, last_id = self.lock.counters()
+        self.meta["last_id"] = max(self.meta["last_id"], last_id)
+        self._written = {}
+        self._foreign = []
+        self._replaced = False
+        return result
+
+    def _load(self):
+        records = {}
+        migrate = False
+        try:
+            snapshot = self._read_cache()
+            if snapshot is None:
+                with open(self.data_path, "r", encoding="utf-8") as file:
+                    content = file.read()
+                snapshot = json.loads(content) if content.strip() else []
+                self._write_cache(snapshot)
+            top_id = max((data["id"] for data in snapshot), default=0)
+            for data in snapshot:
+                if data["id"] in records:
+                    # Старые версии выдавали одинаковые ID, не теряем такие записи
+                    top_id += 1
+                    data = dict(data, id=top_id)
+                    migrate = True
+                records[data["id"]] = data
+        except (FileNotFoundError, json.JSONDecodeError):
+            records = {}
+
+        self.meta = {"last_id": max(records, default=0)}
+        self.journal_entries = 0
+        self.journal_size = 0
+        try:
+            with open(self.journal_path, "rb") as file:
+                content = file.read()
+                self._journal_ino = os.fstat(file.fileno()).st_ino
+        except FileNotFoundError:
+            content = b""
+            self._journal_ino = 0
+        end = content.rfind(b"\n") + 1
+        if end != len(content):
+            # Обрезаем недописанную последнюю строку после сбоя
+            with open(self.journal_path, "r+b") as file:
+                file.truncate(end)
+        for line in content[:end].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            self._apply(records, entry)
+            self.journal_entries += 1
+        self.journal_size = end
+
+        self.record_count = len(records)
+        result = list(records.values())
+        if migrate:
+            self._write_snapshot(result)
+        stamp = self._data_stamp()
+        self.snapshot_size = stamp[2] if stamp else 0
+        self.own_stamp = self.stamp()
+        return result
+
+    def _data_stamp(self):
+        try:
+            stat = os.stat(self.data_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _read_cache(self):
+        """
+        Возвращает записи снимка из бинарного кэша или None, если кэша нет,
+        он другой версии или построен для другого состояния файла снимка.
+        """
+        stamp = self._data_stamp()
+        if stamp is None:
+            return None
+        try:
+            with open(self.cache_path, "rb") as file:
+                content = file.read()
+        except FileNotFoundError:
+            return None
+        if not content.startswith(CACHE_MAGIC):
+            return None
+        try:
+            version, cached_stamp, records = marshal.loads(
+                memoryview(content)[len(CACHE_MAGIC) :]
+            )
+        except (EOFError, ValueError, TypeError):
+            return None
+        if version != CACHE_VERSION or tuple(cached_stamp) != stamp:
+            return None
+        return records
+
+    def _write_cache(self, records):
+        stamp = self._data_stamp()
+        if stamp is None:
+            return
+        temp_path = self.cache_path + ".tmp"
+        try:
+            with open(temp_path, "wb") as file:
+                file.write(CACHE_MAGIC)
+                marshal.dump((CACHE_VERSION, stamp, records), file)
+            os.replace(temp_path, self.cache_path)
+        except (OSError, ValueError):
+            # Кэш только ускоряет загрузку: без него данные читаются из JSON
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def _apply(self, records, entry):
+        if entry["op"] == "meta":
+            self.meta.update(entry["data"])
+            return
+        self.meta["last_id"] = max(self.meta["last_id"], entry["id"])
+        if entry["op"] == "delete":
+            records.pop(entry["id"], None)
+        else:
+            records[entry["id"]] = entry["data"]
+
+    def stamp(self):
+        """
+        Отпечаток текущего состояния файлов на диске. Нужен, чтобы проверять,
+        построены ли сохранённые рядом индексы для этого же состояния.
+        """
+        stamp = []
+        for path in (self.data_path, self.journal_path):
+            try:
+                stat = os.stat(path)
+                stamp.extend([stat.st_ino, stat.st_mtime_ns, stat.st_size])
+            except FileNotFoundError:
+                stamp.extend([0, 0, 0])
+        return stamp
+
+    def is_stale(self):
+        """
+        Проверяет, меняли ли файлы в обход блокировки (правка вручную,
+        восстановление из копии, git checkout). Такие изменения не двигают
+        общий счётчик версий, поэтому sync() их не видит. Если версия ушла
+        вперёд, расхождение отпечатков разберёт sync().
+        """
+        running = self._compaction
+        if running is not None and running.is_alive():
+            # Своё сжатие меняет файлы раньше, чем обновляет отпечаток
+            return False
+        return (
+            self.stamp() != self.own_stamp
+            and self.lock.counters()[0] == self.version
+        )
+
+    def append(self, op, record_id, data=None):
+        """
+        Дописывает в журнал одну операцию: "add", "edit" или "delete".
+        """
+        self.append_many([(op, record_id, data)])
+
+    def append_many(self, operations):
+        lines = []
+        ids = []
+        for op, record_id, data in operations:
+            entry = {"op": op, "id": record_id}
+            if op == "delete":
+                self.record_count -= 1
+            else:
+                entry["data"] = data
+                if op == "add":
+                    self.record_count += 1
+            lines.append((json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8"))
+            ids.append(record_id)
+        if not lines:
+            return
+        with self._lock:
+            self._pending.extend(lines)
+            self._pending_ids.extend(ids)
+            self._pending_entries += len(lines)
+            self._pending_size += sum(map(len, lines))
+        self.writer.schedule(self)
+        if self.needs_compaction():
+            self.compact()
+
+    def _open_journal(self):
+        """
+        Открывает журнал для дописывания. Если другой процесс сжал журнал и
+        заменил файл, старый дескриптор закрывается, а хранилище помечается
+        для полной сверки в sync().
+        """
+        if self._journal is not None:
+            try:
+                current = os.stat(self.journal_path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current != os.fstat(self._journal.fileno()).st_ino:
+                self._journal.close()
+                self._journal = None
+        if self._journal is None:
+            self._journal = open(self.journal_path, "ab")
+            stat = os.fstat(self._journal.fileno())
+            if stat.st_ino != self._journal_ino:
+                if self._journal_ino or stat.st_size:
+                    self._replaced = True
+                self._journal_ino = stat.st_ino
+                self.journal_size = stat.st_size
+        return self._journal
+
+    def _write_pending(self):
+        """
+        Дописывает накопленные строки в журнал одним вызовом write и fsync.
+        Возвращает число записанных байт.
+        """
+        with self.lock.exclusive(), self._lock:
+            if not self._pending:
+                return 0
+            journal = self._open_journal()
+            offset = os.fstat(journal.fileno()).st_size
+            if offset > self.journal_size:
+                # Между нашими записями журнал дописывал другой процесс
+                self._foreign.append((self.journal_size, offset))
+            payload = b"".join(self._pending)
+            journal.write(payload)
+            journal.flush()
+            os.fsync(journal.fileno())
+            for record_id, line in zip(self._pending_ids, self._pending):
+                self._written[record_id] = offset
+                offset += len(line)
+            version, last_id = self.lock.counters()
+            self.version = version + 1
+            self.lock.set_counters(self.version, max(last_id, self.meta["last_id"]))
+            self.journal_entries += self._pending_entries
+            self.journal_size = offset
+            self._pending = []
+            self._pending_ids = []
+            self._pending_entries = 0
+            self._pending_size = 0
+            self.own_stamp = self.stamp()
+        return len(payload)
+
+    def reserve_ids(self, count, last_id):
+        """
+        Выделяет count новых ID, не пересекающихся с ID других процессов, и
+        возвращает первый из них.
+        """
+        with self.lock.exclusive():
+            version, shared_last = self.lock.counters()
+            first = max(shared_last, last_id) + 1
+            self.lock.set_counters(version, first + count - 1)
+        return first
+
+    def sync(self):
+        """
+        Применяет к хранилищу операции, которые другие процессы дописали в
+        журнал после нашей последней синхронизации. Возвращает их число.
+        """
+        self.merged = set()
+        if self.merge is None:
+            return 0
+        if (
+            not self._foreign
+            and not self._replaced
+            and self.lock.counters()[0] == self.version
+        ):
+            return 0
+        self._wait_compaction()
+        self.flush()
+        with self.lock.shared():
+            with self._lock:
+                try:
+                    stat = os.stat(self.journal_path)
+                except FileNotFoundError:
+                    stat = None
+                inode = stat.st_ino if stat is not None else 0
+                replaced = self._replaced or inode != self._journal_ino
+                if not replaced:
+                    if stat is not None and stat.st_size > self.journal_size:
+                        self._foreign.append((self.journal_size, stat.st_size))
+                        self.journal_size = stat.st_size
+                foreign, self._foreign = self._foreign, []
+                written, self._written = self._written, {}
+                pending = set(self._pending_ids)
+            if replaced:
+                return self._resync()
+            applied = self._merge_ranges(foreign, written, pending)
+            self.version = self.lock.counters()[0]
+        self.own_stamp = self.stamp()
+        return applied
+
+    def _merge_ranges(self, ranges, written, pending):
+        applied = 0
+        with open(self.journal_path, "rb") as file:
+            for start, end in ranges:
+                file.seek(start)
+                offset = start
+                for line in file.read(end - start).splitlines(keepends=True):
+                    position = offset
+                    offset += len(line)
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if entry["op"] == "meta":
+                        continue
+                    record_id = entry["id"]
+                    self.journal_entries += 1
+                    self.meta["last_id"] = max(self.meta["last_id"], record_id)
+                    if record_id in written or record_id in pending:
+                        self.conflicts += 1
+                        # Наша запись позже в журнале - при загрузке победит она
+                        if record_id in pending or written[record_id] > position:
+                            continue
+                    self.merge(entry["op"], record_id, entry.get("data"))
+                    self.merged.add(record_id)
+                    applied += 1
+        return applied
+
+    def _resync(self):
+        """
+        Журнал заменён сжатием в другом процессе: сверяем хранилище с диском
+        целиком и применяем различия по записям.
+        """
+        ours = {data["id"]: data for data in self.snapshot()}
+        applied = 0
+        for data in self.load():
+            if ours.pop(data["id"], None) != data:
+                self.merge("edit", data["id"], data)
+                self.merged.add(data["id"])
+                applied += 1
+        for record_id in ours:
+            self.merge("delete", record_id, None)
+            self.merged.add(record_id)
+            applied += 1
+        return applied
+
+    def _wait_compaction(self):
+        running = self._compaction
+        if running is not None and running is not threading.current_thread():
+            running.join()
+
+    def flush(self):
+        """
+        Сразу записывает операции, ещё не дописанные фоновым потоком.
+        """
+        self.writer.flush(self)
+
+    def needs_compaction(self):
+        """
+        Сжатие нужно, когда журнал сравнялся с долей compact_ratio снимка по
+        числу записей или по размеру. Пороги растут вместе со снимком, поэтому
+        при большом импорте снимок переписывается O(log N) раз, а не на
+        каждые compact_min_bytes журнала.
+        """
+        entries = self.journal_entries + self._pending_entries
+        size = self.journal_size + self._pending_size
+        if size >= max(self.compact_min_bytes, self.compact_ratio * self.snapshot_size):
+            return True
+        return (
+            entries >= self.compact_min_entries
+            and entries >= self.compact_ratio * max(self.record_count, 1)
+        )
+
+    def compact(self, wait=False):
+        """
+        Записывает новый снимок и сокращает журнал. По умолчанию запись идёт в
+        фоновом потоке; операции, дописанные за это время, остаются в журнале.
+        Другие процессы ждут окончания сжатия на блокировке.
+        """
+        with self._compact_lock:
+            running = self._compaction
+            if running is not None and running.is_alive():
+                if wait:
+                    running.join()
+                return
+            self.lock.acquire()
+            try:
+                self.sync()
+                self.flush()
+                with self._lock:
+                    records = self.snapshot()
+                    self.record_count = len(records)
+                    running = threading.Thread(
+                        target=self._compact, args=(records, self.journal_size)
+                    )
+                    self._compaction = running
+                    running.start()
+            except BaseException:
+                self.lock.release()
+                raise
+        if wait:
+            running.join()
+
+    def _compact(self, records, offset):
+        try:
+            self._write_snapshot(records)
+            self._replace_journal(offset)
+        finally:
+            self.lock.release()
+
+    def _replace_journal(self, offset):
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            try:
+                with open(self.journal_path, "rb") as file:
+                    file.seek(offset)
+                    tail = file.read()
+            except FileNotFoundError:
+                tail = b""
+            # Снимок не хранит служебные данные (например, последний выданный ID),
+            # поэтому они переносятся первой строкой нового журнала
+            header = {"op": "meta", "data": self.meta}
+            header = (json.dumps(header) + "\n").encode("utf-8")
+            tail = header + tail
+            temp_path = self.journal_path + ".tmp"
+            with open(temp_path, "wb") as file:
+                file.write(tail)
+                file.flush()
+                os.fsync(file.fileno())
+            replace_durably(temp_path, self.journal_path)
+            self._written = {
+                record_id: position - offset + len(header)
+                for record_id, position in self._written.items()
+                if position >= offset
+            }
+            self._journal_ino = os.stat(self.journal_path).st_ino
+            # Другие процессы по новой версии увидят, что журнал заменён
+            version, last_id = self.lock.counters()
+            self.version = version + 1
+            self.lock.set_counters(self.version, last_id)
+            self.journal_entries = tail.count(b"\n")
+            self.journal_size = len(tail)
+            self.own_stamp = self.stamp()
+
+    def _write_snapshot(self, records):
+        temp_path = self.data_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            if records:
+                file.write("[\n")
+                file.write(
+                    ",\n".join(json.dumps(r, ensure_ascii=False) for r in records)
+                )
+                file.write("\n]\n")
+            else:
+                file.write("[]\n")
+            file.flush()
+            os.fsync(file.fileno())
+            size = os.fstat(file.fileno()).st_size
+        replace_durably(temp_path, self.data_path)
+        self.snapshot_size = size
+        self._write_cache(records)
+
+    def close(self):
+        self.flush()
+        running = self._compaction
+        if running is not None:
+            running.join()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+        self.lock.close()
@@ -1,8 +1,23 @@
-import json
-import csv
+from modules.csvexport import export_rows, row_getter
+from modules.csvimport import (
+    REQUIRED,
+    CsvImporter,
+    is_pattern,
+    parse_bool,
+    print_progress,
+    print_result,
+)
+from modules.dates import parse_date
+from modules.deadlines import DeadlineIndex
+from modules.mapped import MappedRecordStore
+from modules.records import RecordStore, intern_text
+from modules.rollups import TaskStats
+from modules.sqlstore import SqliteTaskStore, is_database
 
 
 class Task:
+    __slots__ = ("id", "title", "description", "done", "priority", "due_date", "due")
+
     def __init__(
         self, id, title, priority="Средний", description="", done=False, due_date=None
     ):
@@ -10,8 +25,9 @@ class Task:
         self.title = title
         self.description = description
         self.done = done
-        self.priority = priority
-        self.due_date = due_date
+        self.priority = intern_text(priority)
+        self.due_date = intern_text(due_date)
+        self.due = parse_date(due_date)
 
     def mark_done(self):
         self.done = True
@@ -20,17 +36,18 @@ class Task:
         if title:
             self.title = title
         if description:
-            self.descirption = description
+            self.description = description
         if priority:
-            self.priority = priority
+            self.priority = intern_text(priority)
         if due_date:
-            self.due_date = due_date
+            self.due_date = intern_text(due_date)
+            self.due = parse_date(due_date)
 
     def to_dict(self):
         data = {
             "id": self.id,
             "title": self.title,
-            "description": self.descirption,
+            "description": self.description,
             "done": self.done,
             "priority": self.priority,
             "due_date": self.due_date,
@@ -49,27 +66,65 @@ class Task:
         )
         return task
 
+    @staticmethod
+    def from_row(title, description, done, priority, due_date):
+        return Task(
+            id=None,
+            title=title,
+            description=description,
+            done=done,
+            priority=priority,
+            due_date=due_date,
+        )
+
 
 class TasksManager:
+    EXPORT_FIELDS = ["id", "title", "description", "done", "priority", "due_date"]
+    CSV_FIELDS = [
+        ("title", None, REQUIRED),
+        ("description", None, ""),
+        ("done", parse_bool, False),
+        ("priority", None, "Средний"),
+        ("due_date", None, None),
+    ]
+
     def __init__(self, data_path):
         self.data_path = data_path
         self.tasks = self.load_tasks()
+        if is_database(self.data_path):
+            # Запросы по срокам и сводку выполняет сама база
+            self.deadlines = self.tasks
+            self.stats = self.tasks
+        else:
+            self.deadlines = self.tasks.add_index(DeadlineIndex())
+            self.stats = self.tasks.add_index(TaskStats())
 
     def load_tasks(self):
-        try:
-            with open(self.data_path, "r", encoding="utf-8") as file:
-                return [Task.from_dict(task) for task in json.load(file)]
-        except (FileNotFoundError, json.JSONDecodeError):
-            return []
+        if is_database(self.data_path):
+            return SqliteTaskStore(self.data_path, Task.from_dict).load()
+        return RecordStore(self.data_path, Task.from_dict).load()
+
+    def migrate_from_json(self, json_path):
+        return self.tasks.import_json(json_path)
+
+    @staticmethod
+    def open_mapped(data_path):
+        """
+        Открывает задачи только для чтения с декодированием по обращению.
+        """
+        return MappedRecordStore(data_path, Task.from_dict).open()
 
     def save_tasks(self):
-        with open(self.data_path, "w", encoding="utf-8") as file:
-            json.dump(
-                [task.to_dict() for task in self.tasks],
-                file,
-                indent=4,
-                ensure_ascii=False,
-            )
+        self.tasks.save()
+
+    def refresh(self):
+        return self.tasks.refresh()
+
+    def is_stale(self):
+        return self.tasks.is_stale()
+
+    def close(self):
+        self.tasks.close()
 
     def add_task(self):
         title = input("Введите заголовок задачи: ")
@@ -78,14 +133,13 @@ class TasksManager:
         due_date = input("Введите срок выполнения задачи (ДД-ММ-ГГГГ): ")
 
         new_task = Task(
-            id=len(self.tasks) + 1,
+            id=self.tasks.next_id(),
             title=title,
             description=description,
             priority=priority,
             due_date=due_date,
         )
-        self.tasks.append(new_task)
-        self.save_tasks()
+        self.tasks.add(new_task)
         print("Задача добавлена!")
 
     def view_tasks(self):
@@ -93,28 +147,63 @@ class TasksManager:
             print("Нет доступных задач.")
             return
 
+        choice = input(
+            "Показать: 1 - все задачи, 2 - ближайшие, 3 - просроченные, "
+            "4 - на ближайшие дни: "
+        ).strip()
+        if choice == "2":
+            tasks = self.deadlines.upcoming(10)
+        elif choice == "3":
+            tasks = self.deadlines.overdue()
+        elif choice == "4":
+            try:
+                days = int(input("Сколько дней вперёд: "))
+            except ValueError:
+                print("Неверный ввод.")
+                return
+            tasks = self.deadlines.due_within(days)
+        else:
+            tasks = self.tasks
+
         print("\nСписок задач:")
-        for task in self.tasks:
+        shown = 0
+        for task in tasks:
             status = "Выполнена" if task.done else "Не выполнена"
             print(
                 f"[{task.id}] {task.title} | Приоритет: {task.priority} | Срок: {task.due_date} | Статус: {status}"
             )
+            shown += 1
+        if not shown:
+            print("Подходящих задач нет.")
+
+    def show_dashboard(self):
+        stats = self.stats.summary()
+        print("\n--- Сводка по задачам ---")
+        print(f"Всего: {stats['total']}")
+        print(f"Открытых: {stats['open']}, выполненных: {stats['done']}")
+        print(f"Просроченных: {stats['overdue']}")
+        print("По приоритетам (открытые / выполненные):")
+        for priority, (open_count, done_count) in stats["by_priority"].items():
+            print(f"  {priority}: {open_count} / {done_count}")
+        print("По месяцам срока (открытые / выполненные):")
+        for year, month, open_count, done_count in stats["by_month"]:
+            print(f"  {month:02d}-{year}: {open_count} / {done_count}")
 
     def mark_task_done(self):
         task_id = int(input("Введите ID задачи: "))
-        task = next((task for task in self.tasks if task.id == task_id), None)
+        task = self.tasks.get(task_id)
 
         if not task:
             print("Задача не найдена.")
             return
 
         task.mark_done()
-        self.save_tasks()
+        self.tasks.update(task)
         print("Задача отмечена как выполненная!")
 
     def edit_task(self):
         task_id = int(input("Введите ID задачи для редактирования: "))
-        task = next((task for task in self.tasks if task.id == task_id), None)
+        task = self.tasks.get(task_id)
 
         if not task:
             print("Задача не найдена.")
@@ -135,57 +224,64 @@ class TasksManager:
             priority=new_priority,
             due_date=new_due_date,
         )
-        self.save_tasks()
+        self.tasks.update(task)
         print("Задача обновлена!")
 
     def delete_task(self):
         task_id = int(input("Введите ID задачи для удаления: "))
-        self.tasks = [task for task in self.tasks if task.id != task_id]
-        self.save_tasks()
+        self.tasks.delete(task_id)
         print("Задача удалена!")
 
     def import_from_csv(self):
-        csv_file_path = input("Введите путь к CSV-файлу: ")
+        csv_file_path = input(
+            "Введите путь к CSV-файлу или шаблон (например, data/*.csv): "
+        )
         try:
-            with open(csv_file_path, mode="r", encoding="utf-8") as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    new_task = Task.from_dict(
-                        {
-                            "id": len(self.tasks) + 1,
-                            "title": row["title"],
-                            "description": row["description"],
-                            "done": row["done"].lower() == "true",
-                            "priority": row["priority"],
-                            "due_date": row["due_date"],
-                        }
-                    )
-                    self.tasks.append(new_task)
-            self.save_tasks()
+            if is_pattern(csv_file_path):
+                result = self.import_files(csv_file_path, progress=print_progress)
+            else:
+                result = self.import_csv(csv_file_path, progress=print_progress)
+            print_result(result)
             print("Задачи успешно импортированы!")
         except Exception as e:
             print(f"Ошибка при импорте: {e}")
 
+    def import_csv(self, path, batch_size=10000, reject_path=None, progress=None):
+        importer = CsvImporter(self.CSV_FIELDS, Task.from_row, batch_size)
+        return importer.run(path, self.tasks, reject_path, progress)
+
+    def import_files(self, paths, workers=None, progress=None):
+        importer = CsvImporter(self.CSV_FIELDS, Task.from_row)
+        return importer.run_parallel(paths, self.tasks, workers, progress)
+
     def export_to_csv(self):
-        file_path = input("Введите путь для сохранения CSV-файла: ")
+        file_path = input(
+            "Введите путь для сохранения CSV-файла (.csv.gz - со сжатием): "
+        )
+        choice = input(
+            "Экспортировать задачи: 1 - все, 2 - невыполненные, 3 - выполненные: "
+        ).strip()
+        done = {"2": False, "3": True}.get(choice)
         try:
-            with open(file_path, mode="w", encoding="utf-8", newline="") as file:
-                fieldnames = [
-                    "id",
-                    "title",
-                    "description",
-                    "done",
-                    "priority",
-                    "due_date",
-                ]
-                writer = csv.DictWriter(file, fieldnames=fieldnames)
-                writer.writeheader()
-                for task in self.tasks:
-                    writer.writerow(task.to_dict())
+            self.export_csv(file_path, done=done)
             print("Задачи успешно экспортированы!")
         except Exception as e:
             print(f"Ошибка при экспорте: {e}")
 
+    def export_csv(self, path, done=None):
+        """
+        Экспортирует задачи в CSV; done=True/False оставляет только
+        выполненные или невыполненные задачи.
+        """
+        tasks = self.tasks
+        if done is not None:
+            if is_database(self.data_path):
+                tasks = tasks.select("done = ?", (done,))
+            else:
+                tasks = (task for task in tasks if task.done == done)
+        rows = map(row_getter(self.EXPORT_FIELDS), tasks)
+        return export_rows(path, self.EXPORT_FIELDS, rows)
+
     def menu(self):
         while True:
             print("\n--- Управление задачами ---")
@@ -196,7 +292,8 @@ class TasksManager:
             print("5. Удалить задачу")
             print("6. Импорт задач из CSV")
             print("7. Экспорт задач в CSV")
-            print("8. Назад в главное меню")
+            print("8. Сводка по задачам")
+            print("9. Назад в главное меню")
 
             choice = input("Выберите действие: ")
 
@@ -215,6 +312,8 @@ class TasksManager:
             elif choice == "7":
                 self.export_to_csv()
             elif choice == "8":
+                self.show_dashboard()
+            elif choice == "9":
                 break
             else:
                 print("Неверный ввод, попробуйте снова.")
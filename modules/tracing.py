@@ -0,0 +1,303 @@
+import cProfile
+import functools
+import io
+import json
+import math
+import pstats
+import threading
+import time
+from datetime import datetime
+
+# Переменная окружения, включающая трассировку при запуске app.py (1, true...)
+TRACE_ENV = "ASSISTANT_TRACE"
+
+
+def traced_methods():
+    """
+    Отслеживаемые методы: (класс, раздел, {метод: операция}). Импорт здесь,
+    чтобы модуль не тянул менеджеры, пока трассировка выключена.
+    """
+    from modules.contact import ContactManager
+    from modules.deadlines import DeadlineIndex
+    from modules.finance import FinanceManager
+    from modules.notes import NotesManager
+    from modules.rollups import TaskStats
+    from modules.sqlstore import SqliteTaskStore
+    from modules.tasks import TasksManager
+
+    common = {"import_csv": "import", "import_files": "import", "export_csv": "export"}
+    deadlines = {"upcoming": "filter", "overdue": "filter", "due_within": "filter"}
+    return [
+        (
+            NotesManager,
+            "notes",
+            dict(common, __init__="load", save_notes="save", search="search"),
+        ),
+        (
+            TasksManager,
+            "tasks",
+            dict(common, __init__="load", save_tasks="save"),
+        ),
+        (DeadlineIndex, "tasks", deadlines),
+        (TaskStats, "tasks", {"summary": "report"}),
+        (SqliteTaskStore, "tasks", dict(deadlines, summary="report")),
+        (
+            ContactManager,
+            "contacts",
+            dict(common, __init__="load", save_contacts="save", find="search"),
+        ),
+        (
+            FinanceManager,
+            "finance",
+            dict(
+                common,
+                __init__="load",
+                save_records="save",
+                records_by_category="search",
+                records_between="filter",
+                report="report",
+                category_totals="report",
+            ),
+        ),
+    ]
+
+
+def io_counters():
+    """
+    Байты, прочитанные и записанные процессом (rchar и wchar из
+    /proc/self/io), и размер самого прочитанного счётчика; None, если система
+    их не отдаёт.
+    """
+    try:
+        with open("/proc/self/io", "rb") as file:
+            data = file.read()
+    except OSError:
+        return None
+    read = written = 0
+    for line in data.splitlines():
+        if line.startswith(b"rchar:"):
+            read = int(line[6:])
+        elif line.startswith(b"wchar:"):
+            written = int(line[6:])
+    return read, written, len(data)
+
+
+class LatencyHistogram:
+    """
+    Гистограмма задержек с логарифмическими корзинами: STEPS корзин на
+    каждое удвоение, начиная с 1 мкс. Память не растёт с числом замеров, а
+    перцентиль оценивается верхней границей корзины (с точностью ~19%).
+    """
+
+    STEPS = 4
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        micros = seconds * 1e6
+        bucket = int(math.log2(micros) * self.STEPS) + 1 if micros > 1 else 0
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction):
+        rank = fraction * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(2 ** (bucket / self.STEPS) / 1e6, self.max)
+        return self.max
+
+
+class OperationStats:
+    def __init__(self):
+        self.errors = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.latency = LatencyHistogram()
+
+    def summary(self):
+        latency = self.latency
+        return {
+            "count": latency.count,
+            "errors": self.errors,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "total_ms": latency.total * 1000,
+            "p50_ms": latency.percentile(0.5) * 1000,
+            "p95_ms": latency.percentile(0.95) * 1000,
+            "p99_ms": latency.percentile(0.99) * 1000,
+            "max_ms": latency.max * 1000,
+        }
+
+
+class Tracer:
+    """
+    Трассировка операций менеджеров: число вызовов, ошибки, прочитанные и
+    записанные байты и гистограмма задержек по каждой операции вида
+    "раздел.операция" (см. traced_methods).
+
+    Пока трассировка выключена, методы не обёрнуты и ничего не стоят:
+    enable() подменяет их на классах, disable() возвращает исходные.
+    Учитываются только внешние вызовы - например, records_between внутри
+    category_totals в статистику не попадает. Байты берутся из счётчиков
+    процесса, поэтому в них входит и ввод-вывод фоновых потоков за время
+    операции.
+
+    profile_next() снимает профиль cProfile со следующей операции.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.started = None
+        self.operations = {}
+        self.last_profile = None
+        self._patched = []
+        self._profile = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def enable(self):
+        if self.enabled:
+            return
+        for cls, section, methods in traced_methods():
+            for method, op in methods.items():
+                original = cls.__dict__[method]
+                setattr(cls, method, self._wrap(original, f"{section}.{op}"))
+                self._patched.append((cls, method, original))
+        self.enabled = True
+        self.started = datetime.now().isoformat(timespec="seconds")
+
+    def disable(self):
+        for cls, method, original in reversed(self._patched):
+            setattr(cls, method, original)
+        self._patched = []
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.operations = {}
+            self.started = datetime.now().isoformat(timespec="seconds")
+
+    def _wrap(self, function, name):
+        tracer = self
+
+        @functools.wraps(function)
+        def traced(*args, **kwargs):
+            local = tracer._local
+            if getattr(local, "active", False):
+                return function(*args, **kwargs)
+            local.active = True
+            profile_path = tracer._take_profile(name)
+            profile = None if profile_path is None else cProfile.Profile()
+            before = io_counters()
+            start = time.perf_counter()
+            failed = True
+            try:
+                if profile is None:
+                    result = function(*args, **kwargs)
+                else:
+                    result = profile.runcall(function, *args, **kwargs)
+                failed = False
+                return result
+            finally:
+                elapsed = time.perf_counter() - start
+                after = io_counters()
+                local.active = False
+                tracer.record(name, elapsed, before, after, failed)
+                if profile is not None:
+                    tracer._save_profile(name, profile, profile_path)
+
+        return traced
+
+    def record(self, name, seconds, before=None, after=None, failed=False):
+        with self._lock:
+            stats = self.operations.get(name)
+            if stats is None:
+                stats = self.operations[name] = OperationStats()
+            stats.latency.record(seconds)
+            if failed:
+                stats.errors += 1
+            if before is not None and after is not None:
+                # Чтение счётчиков до операции попадает в следующий замер
+                stats.bytes_read += after[0] - before[0] - before[2]
+                stats.bytes_written += after[1] - before[1]
+
+    def profile_next(self, path, operation=None):
+        """
+        Снимает профиль cProfile со следующей операции (или со следующей
+        операции с именем operation) и сохраняет его в path для pstats.
+        """
+        self.enable()
+        with self._lock:
+            self._profile = (path, operation)
+
+    def _take_profile(self, name):
+        if self._profile is None:
+            return None
+        with self._lock:
+            if self._profile is None or self._profile[1] not in (None, name):
+                return None
+            path, self._profile = self._profile[0], None
+        return path
+
+    def _save_profile(self, name, profile, path):
+        profile.dump_stats(path)
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(15)
+        self.last_profile = (name, path, text.getvalue())
+
+    def summary(self):
+        with self._lock:
+            return {
+                name: stats.summary()
+                for name, stats in sorted(self.operations.items())
+            }
+
+    def format_report(self):
+        operations = self.summary()
+        if not operations:
+            return "Операций пока не было."
+        lines = [
+            f"{'операция':<18}{'вызовов':>8}{'ошибок':>8}{'p50, мс':>10}"
+            f"{'p95, мс':>10}{'p99, мс':>10}{'макс, мс':>10}"
+            f"{'прочитано':>12}{'записано':>12}"
+        ]
+        for name, stats in operations.items():
+            lines.append(
+                f"{name:<18}{stats['count']:>8}{stats['errors']:>8}"
+                f"{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}"
+                f"{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}"
+                f"{format_bytes(stats['bytes_read']):>12}"
+                f"{format_bytes(stats['bytes_written']):>12}"
+            )
+        return "\n".join(lines)
+
+    def dump(self, path):
+        """
+        Записывает отчёт в файл JSON.
+        """
+        report = {
+            "started": self.started,
+            "dumped": datetime.now().isoformat(timespec="seconds"),
+            "operations": self.summary(),
+        }
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+
+
+def format_bytes(count):
+    for unit in ("Б", "КБ", "МБ"):
+        if count < 1024:
+            return f"{count:.0f} {unit}"
+        count /= 1024
+    return f"{count:.1f} ГБ"
+
+
+tracer = Tracer()
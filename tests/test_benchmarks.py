@@ -0,0 +1,71 @@
+"""
+Генераторы синтетических данных и прогон сводного замера на малом размере.
+"""
+
+import json
+
+import pytest
+
+from benchmarks.generators import KINDS, generate, write_csv, write_snapshot
+from benchmarks.suite import compare, run_section
+from modules.commands import SECTIONS
+
+
+@pytest.mark.parametrize("kind", KINDS)
+def test_generate_is_seeded(kind):
+    first = list(generate(kind, 50, seed=7))
+    assert first == list(generate(kind, 50, seed=7))
+    assert first != list(generate(kind, 50, seed=8))
+    assert [data["id"] for data in generate(kind, 3, first_id=10)] == [10, 11, 12]
+
+
+def test_unknown_kind():
+    with pytest.raises(ValueError):
+        next(generate("mail", 1))
+
+
+@pytest.mark.parametrize("kind", KINDS)
+def test_files_load_into_managers(tmp_path, kind):
+    section = SECTIONS[kind]
+    snapshot = str(tmp_path / f"{kind}.json")
+    write_snapshot(snapshot, kind, 100, seed=3)
+    manager = section.factory(snapshot)
+    records = getattr(manager, section.store)
+    assert [record.to_dict() for record in records] == list(generate(kind, 100, 3))
+    manager.close()
+
+    # Колонки CSV совпадают с CSV_FIELDS: импорт проходит без отказов
+    csv_path = str(tmp_path / f"{kind}.csv")
+    write_csv(csv_path, kind, 100, seed=4)
+    target = section.factory(str(tmp_path / f"{kind}.import.json"))
+    result = target.import_csv(csv_path)
+    assert (result.imported, result.rejected) == (100, 0)
+    expected = list(generate(kind, 100, 4))
+    imported = [record.to_dict() for record in getattr(target, section.store)]
+    assert imported == expected
+    target.close()
+
+
+@pytest.mark.parametrize("sqlite", [False, True], ids=["json", "sqlite"])
+@pytest.mark.parametrize("kind", KINDS)
+def test_run_section(tmp_path, kind, sqlite):
+    results = run_section(kind, 200, 42, str(tmp_path), sqlite)
+    ops = [result["op"] for result in results]
+    assert ops[0] == "load" and ops[-1] == "import_csv"
+    assert ("load_cached" in ops) is not sqlite
+    assert ("report" in ops) is (kind in ("finance", "tasks"))
+    assert all(result["seconds"] >= 0 and result["ops"] > 0 for result in results)
+
+
+def test_compare(tmp_path, capsys):
+    def run(commit, seconds):
+        path = tmp_path / f"{commit}.json"
+        result = {"section": "notes", "size": 10, "op": "load", "peak_rss_mb": 20}
+        results = [dict(result, seconds=seconds)]
+        path.write_text(json.dumps({"commit": commit, "results": results}))
+        return str(path)
+
+    compare(run("old", 2.0), run("new", 0.5))
+    out = capsys.readouterr().out.splitlines()
+    assert out[0] == "old -> new"
+    assert out[2].split() == ["notes", "10", "load", "2.000", "0.500", "0.25", "20->20"]
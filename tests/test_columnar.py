@@ -0,0 +1,169 @@
+"""
+Колоночное хранилище финансов: фильтры и итоги по периодам совпадают с
+построчным хранилищем, с NumPy и без него.
+"""
+
+import pytest
+
+from modules import columnar
+from modules.dates import parse_date
+from modules.finance import FinanceManager, FinanceRecord
+from tests.test_finance import (
+    random_ranges,
+    random_records,
+    scan_categories,
+    scan_monthly,
+    scan_totals,
+)
+
+RECORDS = [
+    (100.0, "Зарплата", "05-01-2026", "январь"),
+    (-20.5, "Еда", "05-01-2026", "обед"),
+    (-7.25, "Транспорт", "31-01-2026", ""),
+    (250.0, "Зарплата", "05-02-2026", "февраль"),
+    (-12.0, "Еда", "14-02-2026", "ужин"),
+    (-3.5, "Еда", "", "без даты"),
+    (-40.0, "Транспорт", "01-03-2026", "такси"),
+]
+RANGES = [
+    (None, None),
+    ("01-02-2026", None),
+    (None, "31-01-2026"),
+    ("05-01-2026", "14-02-2026"),
+    ("01-04-2026", None),
+]
+
+
+@pytest.fixture(params=["array", "numpy"])
+def path_mode(request, monkeypatch):
+    if request.param == "numpy":
+        if columnar.numpy is None:
+            pytest.skip("нет NumPy")
+    else:
+        monkeypatch.setattr(columnar, "numpy", None)
+    return request.param
+
+
+def fill(manager):
+    manager.records.add_many(
+        FinanceRecord.from_row(amount, category, day, description)
+        for amount, category, day, description in RECORDS
+    )
+    return manager
+
+
+@pytest.fixture
+def managers(tmp_path, path_mode):
+    rows = fill(FinanceManager(str(tmp_path / "rows.json")))
+    columns = fill(FinanceManager(str(tmp_path / "columns.json"), columnar=True))
+    yield rows, columns
+    rows.close()
+    columns.close()
+
+
+def bounds(start, end):
+    return (
+        None if start is None else parse_date(start),
+        None if end is None else parse_date(end),
+    )
+
+
+def scan(start, end):
+    """
+    Записи периода простым проходом, как их отбирал исходный отчёт.
+    """
+    start, end = bounds(start, end)
+    selected = []
+    for amount, category, day, _ in RECORDS:
+        ordinal = parse_date(day)
+        if start is None and end is None:
+            selected.append((amount, category))
+        elif ordinal is not None:
+            if (start is None or ordinal >= start) and (end is None or ordinal <= end):
+                selected.append((amount, category))
+    return selected
+
+
+@pytest.mark.parametrize("start, end", RANGES)
+def test_store_totals_with_open_ranges(managers, start, end):
+    _, columns = managers
+    selected = scan(start, end)
+    income = sum(amount for amount, _ in selected if amount > 0)
+    expenses = sum(amount for amount, _ in selected if amount <= 0)
+    assert columns.records.totals(*bounds(start, end)) == (income, expenses)
+
+
+@pytest.mark.parametrize("start, end", RANGES)
+def test_store_category_totals_with_open_ranges(managers, start, end):
+    _, columns = managers
+    expected = {}
+    for amount, category in scan(start, end):
+        expected[category] = expected.get(category, 0) + amount
+    assert columns.records.category_totals(*bounds(start, end)) == expected
+
+
+@pytest.mark.parametrize("start, end", RANGES[1:])
+def test_between_matches_row_store(managers, start, end):
+    rows, columns = managers
+    start, end = bounds(start, end)
+    wide = (1 if start is None else start, 10**6 if end is None else end)
+    assert [record.id for record in columns.records.between(start, end)] == [
+        record.id for record in rows.records_between(*wide)
+    ]
+
+
+@pytest.mark.parametrize("start, end", RANGES)
+@pytest.mark.parametrize("category", [None, "еда"])
+def test_export_matches_row_store(managers, tmp_path, start, end, category):
+    rows, columns = managers
+    start, end = bounds(start, end)
+    rows.export_csv(str(tmp_path / "rows.csv"), start, end, category)
+    columns.export_csv(str(tmp_path / "columns.csv"), start, end, category)
+    assert (tmp_path / "rows.csv").read_text(encoding="utf-8") == (
+        tmp_path / "columns.csv"
+    ).read_text(encoding="utf-8")
+
+
+def test_category_search_and_edits(managers):
+    rows, columns = managers
+    assert [r.id for r in columns.records_by_category("ЕДА")] == [
+        r.id for r in rows.records_by_category("еда")
+    ]
+    record = columns.records.get(2)
+    record.amount = -30.0
+    record.date = "01-03-2026"
+    columns.records.update(record)
+    columns.records.delete(1)
+    assert columns.records.totals(parse_date("01-03-2026"), None) == (0, -70.0)
+    assert 1 not in columns.records and len(columns.records) == len(RECORDS) - 1
+
+
+def test_reload_keeps_records(tmp_path, path_mode):
+    path = str(tmp_path / "columns.json")
+    manager = fill(FinanceManager(path, columnar=True))
+    manager.records.delete(3)
+    expected = [record.to_dict() for record in manager.records]
+    manager.close()
+    reopened = FinanceManager(path, columnar=True)
+    assert [record.to_dict() for record in reopened.records] == expected
+    assert reopened.records.get(6).date == ""
+    reopened.close()
+
+
+def test_reports_from_column_scans_match_scan(tmp_path, path_mode):
+    records = random_records(5, 2000)
+    manager = FinanceManager(str(tmp_path / "columns.json"), columnar=True)
+    assert manager.rollups is None
+    manager.records.add_many(
+        FinanceRecord.from_row(r.amount, r.category, r.date, "") for r in records
+    )
+    for record_id in range(1, 2001, 7):
+        manager.records.delete(record_id)
+    alive = [record for record in records if record.id % 7 != 1]
+    for start, end in random_ranges(9, 20):
+        assert manager.report(start, end) == scan_totals(alive, start, end)
+        assert manager.category_totals(start, end) == scan_categories(
+            alive, start, end
+        )
+        assert manager.monthly(start, end) == scan_monthly(alive, start, end)
+    manager.close()
@@ -0,0 +1,176 @@
+"""
+Командный режим: проверка команд, групповая фиксация и точка входа.
+"""
+
+import json
+
+import pytest
+
+from modules.commands import CommandRunner, main
+from modules.csvimport import parse_bool
+from modules.session import managers
+from modules.tasks import TasksManager
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    managers.close()
+
+
+def run(commands, **options):
+    runner = CommandRunner(**options)
+    results = list(runner.run(commands))
+    return runner, results
+
+
+@pytest.mark.parametrize(
+    "command, error",
+    [
+        ("{", "Строка не является JSON"),
+        ([1], "Команда должна быть объектом JSON"),
+        ({"op": "drop", "section": "tasks"}, "Неизвестная операция: drop"),
+        ({"op": "add", "section": "mail", "data": {}}, "Неизвестный раздел: mail"),
+        ({"op": "add", "section": "tasks"}, "Не задано поле data"),
+        ({"op": "add", "section": "tasks", "data": []}, "должно быть объектом"),
+        ({"op": "add", "section": "tasks", "data": {}}, "Не задано поле title"),
+        (
+            {"op": "add", "section": "tasks", "data": {"title": "т", "owner": "я"}},
+            "Неизвестное поле: owner",
+        ),
+        (
+            {"op": "add", "section": "tasks", "data": {"title": "т", "done": "может"}},
+            "Некорректное значение поля done",
+        ),
+        (
+            {"op": "add", "section": "tasks", "data": {"title": 5}},
+            "Поле title должно быть строкой",
+        ),
+        (
+            {"op": "add", "section": "finance", "data": {"amount": "много"}},
+            "Некорректное значение поля amount",
+        ),
+        (
+            {"op": "add", "section": "finance", "data": {"amount": "inf"}},
+            "Некорректное значение поля amount",
+        ),
+        ({"op": "delete", "section": "notes", "id": 3}, "Запись 3 не найдена"),
+        ({"op": "report", "section": "finance", "start": "31-02"}, "Некорректная"),
+    ],
+    ids=[
+        "json",
+        "not-object",
+        "op",
+        "section",
+        "no-data",
+        "data-list",
+        "required",
+        "unknown-field",
+        "bool",
+        "not-string",
+        "amount",
+        "infinite",
+        "missing-id",
+        "date",
+    ],
+)
+def test_invalid_commands_rejected(workdir, command, error):
+    runner, (result,) = run([command])
+    assert not result["ok"]
+    assert error in result["error"]
+    assert runner.failed == 1
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [("true", True), (" True ", True), ("1", True), ("да", True), ("yes", True)]
+    + [("false", False), ("0", False), ("Нет", False), ("no", False), ("", False)],
+)
+def test_parse_bool_accepts_known_values(value, expected):
+    assert parse_bool(value) is expected
+
+
+@pytest.mark.parametrize("value", ["может", "2", "truth", "y"])
+def test_parse_bool_rejects_unknown_values(value):
+    with pytest.raises(ValueError):
+        parse_bool(value)
+
+
+def test_group_commit_assigns_ids_in_order(workdir):
+    commands = [
+        {"op": "add", "section": "tasks", "data": {"title": f"т{number}"}}
+        for number in range(10)
+    ]
+    commands.insert(4, {"op": "add", "section": "tasks", "data": {"done": "да"}})
+    commands.append({"op": "done", "id": 3})
+    commands.append({"op": "edit", "section": "tasks", "id": 5, "data": {"done": 1}})
+    commands.append({"op": "delete", "section": "tasks", "id": 10})
+    runner, results = run(commands, commit_every=4)
+    assert [result["n"] for result in results] == list(range(1, 15))
+    assert [result.get("id") for result in results[:4]] == [1, 2, 3, 4]
+    assert not results[4]["ok"]
+    assert [result["id"] for result in results[5:11]] == [5, 6, 7, 8, 9, 10]
+    assert all(result["ok"] for result in results[11:])
+    assert runner.commits == 4
+    assert runner.stats()["failed"] == 1
+
+    managers.close()
+    manager = TasksManager("data/tasks.json")
+    assert [task.id for task in manager.tasks] == list(range(1, 10))
+    assert {task.id for task in manager.tasks if task.done} == {3, 5}
+    manager.close()
+
+
+def test_reports_and_search(workdir):
+    commands = [
+        {"op": "add", "section": "finance", "data": {
+            "amount": amount, "category": category, "date": date
+        }}
+        for amount, category, date in [
+            ("100", "Зарплата", "01-01-2026"),
+            ("-30.5", "Еда", "15-01-2026"),
+            ("-20", "Еда", "03-02-2026"),
+        ]
+    ]
+    commands += [
+        {"op": "report", "section": "finance"},
+        {"op": "report", "section": "finance", "start": "01-02-2026"},
+        {"op": "search", "section": "finance", "query": "Еда", "limit": 1},
+    ]
+    _, results = run(commands)
+    total, february, found = results[3:]
+    assert (total["income"], total["expenses"], total["balance"]) == (
+        100.0,
+        -50.5,
+        49.5,
+    )
+    assert [row["month"] for row in total["monthly"]] == [1, 2]
+    assert (february["income"], february["expenses"]) == (0, -20.0)
+    assert len(found["found"]) == 1 and found["found"][0]["category"] == "Еда"
+
+
+def test_cli_and_batch(workdir, capsys, monkeypatch):
+    assert main(["add", "contacts", "name=Анна", "phone=+7 900 000-00-00"]) == 0
+    assert json.loads(capsys.readouterr().out) == {"n": 1, "ok": True, "id": 1}
+    assert main(["add", "contacts", "name"]) == 1
+    assert "имя=значение" in json.loads(capsys.readouterr().out)["error"]
+
+    batch = workdir / "commands.jsonl"
+    lines = [
+        {"op": "get", "section": "contacts", "id": 1},
+        {"op": "search", "section": "contacts", "query": "анна"},
+        {"op": "report", "section": "contacts"},
+    ]
+    batch.write_text(
+        "\n".join(json.dumps(line, ensure_ascii=False) for line in lines) + "\n\n",
+        encoding="utf-8",
+    )
+    assert main(["batch", str(batch)]) == 0
+    captured = capsys.readouterr()
+    got, found, report = [json.loads(line) for line in captured.out.splitlines()]
+    assert got["record"]["name"] == "Анна"
+    assert found["found"][0]["id"] == 1
+    assert report["count"] == 1
+    assert "Команд: 3, ошибок: 0" in captured.err
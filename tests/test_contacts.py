@@ -0,0 +1,150 @@
+"""
+Поиск контактов по триграммам и дереву телефонов против прямого перебора.
+"""
+
+import random
+
+import pytest
+
+from modules.contact import Contact, ContactManager
+from modules.ngram import NgramIndex, PhoneTrie, normalize_phone, normalize_text
+
+NAMES = ["Анна", "Иван", "Пётр", "Мария", "Олег", "Ёлка", "Anna", "JOHN"]
+SURNAMES = ["Иванова", "Петров", "Смирнов", "O'Neil", "Сидорова"]
+QUERIES = [
+    "ан",
+    "анна",
+    "ИВАН",
+    "ёл",
+    "ов",
+    "o'n",
+    "a",
+    "пётр петров",
+    "900",
+    "+7 (900)",
+    "12-3",
+    "7",
+    "ан*",
+    "иван*",
+    "7900*",
+    "+7 9*",
+    "8*",
+    "смирнов*",
+    "нет такого",
+    "*",
+]
+
+
+def random_contact(rng, contact_id=None):
+    phone = rng.choice(["+7 900 ", "8 (912) ", "+1 555-"]) + "-".join(
+        str(rng.randint(0, 999)) for _ in range(3)
+    )
+    name = f"{rng.choice(NAMES)} {rng.choice(SURNAMES)}"
+    return Contact(contact_id, name, phone)
+
+
+def scan_find(contacts, query):
+    query = normalize_text(query.strip())
+    prefix = query.endswith("*")
+    if prefix:
+        query = query[:-1]
+    if not query:
+        return []
+    digits = normalize_phone(query)
+    by_phone = digits and not any(char.isalpha() for char in query)
+    found = []
+    for contact in contacts:
+        name = normalize_text(contact.name)
+        phone = normalize_phone(contact.phone)
+        if prefix:
+            match = name.startswith(query) or by_phone and phone.startswith(digits)
+        else:
+            match = query in name or by_phone and digits in phone
+        if match:
+            found.append(contact.id)
+    return sorted(found)
+
+
+@pytest.fixture
+def manager(tmp_path):
+    manager = ContactManager(str(tmp_path / "contacts.json"))
+    yield manager
+    manager.close()
+
+
+def check(manager):
+    for query in QUERIES:
+        found = [contact.id for contact in manager.find(query)]
+        assert found == scan_find(manager.contacts, query), query
+
+
+def test_find_matches_scan(manager):
+    rng = random.Random(1)
+    manager.contacts.add_many(random_contact(rng) for _ in range(500))
+    check(manager)
+
+
+def test_find_after_edits_and_deletes(manager):
+    rng = random.Random(2)
+    manager.contacts.add_many(random_contact(rng) for _ in range(300))
+    for _ in range(600):
+        contact_id = rng.randint(1, 300)
+        if contact_id not in manager.contacts:
+            continue
+        if rng.random() < 0.3:
+            manager.contacts.delete(contact_id)
+        else:
+            manager.contacts.update(random_contact(rng, contact_id))
+    check(manager)
+
+
+def test_reloaded_indexes_match_scan(tmp_path):
+    path = str(tmp_path / "contacts.json")
+    rng = random.Random(3)
+    manager = ContactManager(path)
+    manager.contacts.add_many(random_contact(rng) for _ in range(200))
+    manager.close()
+    reopened = ContactManager(path)
+    check(reopened)
+    reopened.close()
+
+
+class Record:
+    def __init__(self, id, key):
+        self.id = id
+        self.phone = key
+        self.key = key
+
+
+def test_ngram_rebuild_drops_stale_postings():
+    index = NgramIndex(lambda record: record.key)
+    for record_id in range(1, 3001):
+        index.add(Record(record_id, f"ключ {record_id}"))
+    for record_id in range(1, 2001):
+        index.add(Record(record_id, f"новый {record_id}"))
+    assert index.stale == 2000
+    # Старые ключи ещё в списках, но отсекаются проверкой кандидатов
+    assert index.search("ключ 1", prefix=True) == []
+    assert index.search("ключ 20") == list(range(2001, 2100))
+    # Устаревших ссылок стало больше живых записей: списки перестроены
+    for record_id in range(2001, 2601):
+        index.discard(record_id)
+    assert index.stale < 600
+    for gram, posting in index.postings.items():
+        assert all(gram in index.keys.get(record_id, gram) for record_id in posting)
+    assert index.search("вый 199") == [199] + list(range(1990, 2000))
+    assert index.search("ключ 20", prefix=True) == []
+    assert index.search("люч") == list(range(2601, 3001))
+
+
+def test_phone_trie_deeper_than_depth():
+    trie = PhoneTrie(depth=2)
+    numbers = {1: "+7 900 123", 2: "+7 900 124", 3: "+7 901", 4: "7"}
+    for record_id, phone in numbers.items():
+        trie.add(Record(record_id, phone))
+    assert trie.search("7") == [1, 2, 3, 4]
+    assert trie.search("79001") == [1, 2]
+    assert trie.search("7900124") == [2]
+    assert trie.search("8") == []
+    trie.discard(2)
+    assert trie.search("79001") == [1]
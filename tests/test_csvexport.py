@@ -0,0 +1,129 @@
+"""
+Потоковая выгрузка CSV: пачки, gzip, фильтры и обратный импорт.
+"""
+
+import csv
+import gzip
+
+import pytest
+
+from benchmarks.generators import KINDS, write_snapshot
+from modules.commands import SECTIONS
+from modules.csvexport import export_rows, row_getter
+from modules.dates import parse_date
+from modules.finance import FinanceManager
+from modules.tasks import TasksManager
+from tests.test_finance import random_records
+
+
+def gunzip(path):
+    plain = path[: -len(".gz")]
+    with gzip.open(path, "rb") as source, open(plain, "wb") as target:
+        target.write(source.read())
+    return plain
+
+
+def read_csv(path):
+    opener = gzip.open if str(path).endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8", newline="") as file:
+        return list(csv.reader(file))
+
+
+@pytest.mark.parametrize("name", ["rows.csv", "rows.csv.gz"])
+def test_export_rows_in_chunks(tmp_path, name):
+    path = str(tmp_path / name)
+    consumed = []
+
+    def rows():
+        for number in range(10):
+            consumed.append(number)
+            yield (number, f"строка {number}")
+
+    assert export_rows(path, ["id", "text"], rows(), chunk_size=3) == 10
+    assert consumed == list(range(10))
+    assert read_csv(path) == [["id", "text"]] + [
+        [str(number), f"строка {number}"] for number in range(10)
+    ]
+    assert export_rows(path, ["id"], iter(())) == 0
+    assert read_csv(path) == [["id"]]
+
+
+def test_row_getter():
+    class Record:
+        id, title, done = 3, "т", False
+
+    assert row_getter(["id", "title", "done"])(Record) == (3, "т", False)
+
+
+@pytest.mark.parametrize("kind", KINDS)
+def test_export_then_import_round_trip(tmp_path, kind):
+    section = SECTIONS[kind]
+    write_snapshot(str(tmp_path / f"{kind}.json"), kind, 200, seed=9)
+    source = section.factory(str(tmp_path / f"{kind}.json"))
+    path = str(tmp_path / f"{kind}.csv.gz")
+    assert source.export_csv(path) == 200
+
+    target = section.factory(str(tmp_path / f"{kind}.copy.json"))
+    result = target.import_csv(gunzip(path))
+    assert (result.imported, result.rejected) == (200, 0)
+    exported = [record.to_dict() for record in getattr(source, section.store)]
+    imported = [record.to_dict() for record in getattr(target, section.store)]
+    assert imported == exported
+    source.close()
+    target.close()
+
+
+
+@pytest.mark.parametrize(
+    "name, options",
+    [("finance.json", {}), ("finance.json", {"columnar": True}), ("finance.db", {})],
+    ids=["rows", "columnar", "sqlite"],
+)
+def test_finance_export_filters(tmp_path, name, options):
+    records = random_records(8, 400)
+    manager = FinanceManager(str(tmp_path / name), **options)
+    manager.records.add_many(records)
+    start, end = parse_date("01-04-2025"), parse_date("30-09-2025")
+    cases = [
+        ({}, records),
+        ({"category": "еда"}, [r for r in records if r.category == "Еда"]),
+        (
+            {"start": start, "end": end, "category": "Дом"},
+            [
+                r
+                for r in sorted(records, key=lambda r: (r.ordinal or 0, r.id))
+                if r.category == "Дом" and r.ordinal and start <= r.ordinal <= end
+            ],
+        ),
+        (
+            {"start": start},
+            sorted(
+                (r for r in records if r.ordinal and r.ordinal >= start),
+                key=lambda r: (r.ordinal, r.id),
+            ),
+        ),
+    ]
+    for number, (filters, expected) in enumerate(cases):
+        path = str(tmp_path / f"export{number}.csv")
+        assert manager.export_csv(path, **filters) == len(expected)
+        rows = read_csv(path)
+        assert rows[0] == FinanceManager.EXPORT_FIELDS
+        assert [int(row[0]) for row in rows[1:]] == [r.id for r in expected]
+        assert [float(row[1]) for row in rows[1:]] == [r.amount for r in expected]
+    manager.close()
+
+
+@pytest.mark.parametrize("name", ["tasks.json", "tasks.db"], ids=["json", "sqlite"])
+def test_task_export_by_status(tmp_path, name):
+    write_snapshot(str(tmp_path / "tasks.json"), "tasks", 100, seed=2)
+    manager = TasksManager(str(tmp_path / "tasks.json"))
+    if name != "tasks.json":
+        source, manager = manager, TasksManager(str(tmp_path / name))
+        manager.migrate_from_json(source.data_path)
+        source.close()
+    done = [task.id for task in manager.tasks if task.done]
+    path = str(tmp_path / "done.csv")
+    assert manager.export_csv(path, done=True) == len(done)
+    assert [int(row[0]) for row in read_csv(path)[1:]] == done
+    assert manager.export_csv(path, done=False) == 100 - len(done)
+    manager.close()
@@ -0,0 +1,156 @@
+"""
+Потоковый импорт CSV: пачки, файл отказов и проверка заголовка.
+"""
+
+import csv
+
+import pytest
+
+from modules.csvimport import CsvImporter, ImportResult
+from modules.finance import FinanceManager
+from modules.tasks import Task, TasksManager
+
+
+def write_csv(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as file:
+        csv.writer(file).writerows(rows)
+    return str(path)
+
+
+def read_rejects(path):
+    with open(path, encoding="utf-8", newline="") as file:
+        return list(csv.reader(file))
+
+
+@pytest.fixture
+def tasks(tmp_path):
+    manager = TasksManager(str(tmp_path / "tasks.json"))
+    yield manager
+    manager.close()
+
+
+def test_import_in_batches_with_rejects(tmp_path, tasks):
+    rows = [["priority", "title", "done", "unused"]]
+    for number in range(10):
+        rows.append(["Высокий", f"задача {number}", "true" if number % 2 else "", "x"])
+    rows.insert(4, ["Низкий", "плохой флаг", "может", "x"])
+    rows.insert(8, ["Низкий"])
+    path = write_csv(tmp_path / "tasks.csv", rows)
+    progress = []
+    result = tasks.import_csv(
+        path, batch_size=4, progress=lambda result: progress.append(result.imported)
+    )
+
+    assert (result.imported, result.rejected) == (10, 2)
+    # Прогресс сообщается после каждой пачки и в конце
+    assert progress == [4, 8, 10]
+    assert result.reject_paths == [str(tmp_path / "tasks.rejects.csv")]
+    (bad_flag, short_row) = read_rejects(result.reject_paths[0])
+    assert bad_flag[0] == "5" and "может" in bad_flag[1]
+    assert bad_flag[2:] == ["Низкий", "плохой флаг", "может", "x"]
+    assert short_row[0] == "9" and short_row[2:] == ["Низкий"]
+
+    imported = list(tasks.tasks)
+    assert [task.id for task in imported] == list(range(1, 11))
+    assert [task.title for task in imported] == [f"задача {n}" for n in range(10)]
+    assert [task.done for task in imported] == [bool(n % 2) for n in range(10)]
+    assert {task.priority for task in imported} == {"Высокий"}
+    assert {task.description for task in imported} == {""}
+
+
+def test_import_persisted(tmp_path):
+    path = write_csv(
+        tmp_path / "finance.csv",
+        [["amount", "category", "date", "description"]]
+        + [[f"{n}.5", "Еда", "01-02-2026", ""] for n in range(25)]
+        + [["NaN", "Еда", "01-02-2026", ""], ["много", "Еда", "01-02-2026", ""]],
+    )
+    manager = FinanceManager(str(tmp_path / "finances.json"))
+    result = manager.import_csv(path, batch_size=10)
+    manager.close()
+    assert (result.imported, result.rejected) == (25, 2)
+
+    reopened = FinanceManager(str(tmp_path / "finances.json"))
+    assert len(reopened.records) == 25
+    assert reopened.report() == (sum(n + 0.5 for n in range(25)), 0)
+    reopened.close()
+
+
+def test_missing_required_column(tmp_path, tasks):
+    path = write_csv(tmp_path / "tasks.csv", [["description"], ["без заголовка"]])
+    with pytest.raises(ValueError, match="title"):
+        tasks.import_csv(path)
+    assert len(tasks.tasks) == 0
+
+
+def test_clean_and_empty_files_leave_no_rejects(tmp_path, tasks):
+    clean = write_csv(tmp_path / "clean.csv", [["title"], ["одна"]])
+    result = tasks.import_csv(clean)
+    assert (result.imported, result.rejected, result.reject_paths) == (1, 0, [])
+    assert not (tmp_path / "clean.rejects.csv").exists()
+
+    empty = tmp_path / "empty.csv"
+    empty.write_text("", encoding="utf-8")
+    assert tasks.import_csv(str(empty)).imported == 0
+
+
+def test_reader_streams_rows(tmp_path):
+    path = write_csv(tmp_path / "tasks.csv", [["title"]] + [[str(n)] for n in range(5)])
+    importer = CsvImporter(TasksManager.CSV_FIELDS, Task.from_row)
+    rows = importer.read(path, rejects=None)
+    # Генератор отдаёт записи по одной, не читая файл целиком заранее
+    assert next(rows).title == "0"
+    assert [task.title for task in rows] == ["1", "2", "3", "4"]
+    assert ImportResult().rate == 0.0
+
+
+def write_shards(tmp_path, count=4, rows=50):
+    shards = tmp_path / "shards"
+    shards.mkdir()
+    for shard in range(count):
+        lines = [["title", "done"]]
+        lines += [[f"{shard}-{number}", "false"] for number in range(rows)]
+        lines.append([f"{shard}-плохая", "может"])
+        write_csv(shards / f"part{shard}.csv", lines)
+    return shards
+
+
+def test_parallel_import_matches_sequential(tmp_path):
+    shards = write_shards(tmp_path)
+    parallel = TasksManager(str(tmp_path / "parallel.json"))
+    progress = []
+    result = parallel.import_files(
+        str(shards / "*.csv"),
+        workers=2,
+        progress=lambda result: progress.append(result.imported),
+    )
+    assert (result.imported, result.rejected) == (200, 4)
+    assert progress == [50, 100, 150, 200, 200]
+    assert sorted(result.reject_paths) == [
+        str(shards / f"part{shard}.rejects.csv") for shard in range(4)
+    ]
+
+    sequential = TasksManager(str(tmp_path / "sequential.json"))
+    for shard in range(4):
+        sequential.import_csv(str(shards / f"part{shard}.csv"))
+    assert [task.to_dict() for task in parallel.tasks] == [
+        task.to_dict() for task in sequential.tasks
+    ]
+    sequential.close()
+
+    # Повторный импорт по шаблону не подхватывает файлы отказов
+    again = parallel.import_files(str(shards / "*.csv"), workers=2)
+    assert (again.imported, again.rejected) == (200, 4)
+    assert [task.id for task in parallel.tasks] == list(range(1, 401))
+    parallel.close()
+
+
+def test_parallel_import_of_path_list(tmp_path):
+    shards = write_shards(tmp_path, count=2, rows=3)
+    manager = TasksManager(str(tmp_path / "tasks.json"))
+    paths = [str(shards / "part1.csv"), str(shards / "part0.csv")]
+    manager.import_files(paths, workers=1)
+    # ID выдаются в порядке путей, а не по завершению процессов
+    expected = ["1-0", "1-1", "1-2", "0-0", "0-1", "0-2"]
+    assert [task.title for task in manager.tasks] == expected
+    manager.close()
@@ -0,0 +1,158 @@
+"""
+Разбор, компиляция и пакетное вычисление выражений калькулятора.
+"""
+
+import io
+import math
+
+import pytest
+
+from modules.calculator import Calculator
+from modules.expressions import Expression, evaluate_stream, numpy
+
+
+def value(text, **values):
+    return Expression(text).evaluate(values)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("2^3^2", 512.0),
+        ("2**3**2", 512.0),
+        ("-2^2", -4.0),
+        ("(-2)^2", 4.0),
+        ("2^-1", 0.5),
+        ("--3", 3.0),
+        ("-+-3", 3.0),
+        ("2 * -3", -6.0),
+        ("1 - 2 - 3", -4.0),
+        ("8 / 2 / 2", 2.0),
+        ("7 % 3 * 2", 2.0),
+        ("1 + 2 * 3 ^ 2", 19.0),
+        ("max(1, 2) * min(3, 4)", 6.0),
+        ("abs(-2) + sqrt(16)", 6.0),
+    ],
+)
+def test_precedence(text, expected):
+    assert value(text) == expected
+
+
+def test_variables_in_order_of_appearance():
+    expression = Expression("b * a + b")
+    assert expression.variables == ("b", "a")
+    assert expression.evaluate(a=2, b=3) == 9.0
+    assert expression.evaluate({"a": 1}, b=1) == 2.0
+
+
+def test_long_sum():
+    assert value("+".join(["x"] * 300), x=1.0) == 300.0
+    assert value("-".join(["x"] * 5000), x=1.0) == -4998.0
+
+
+def test_long_unary_chain():
+    assert value("-" * 3000 + "1") == 1.0
+    assert value("-" * 3001 + "1") == -1.0
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "(" * 2000 + "1" + ")" * 2000,
+        "2^" * 3000 + "2",
+        "",
+        "1 +",
+        "2 3",
+        "foo(1)",
+        "1e999",
+    ],
+    ids=["parentheses", "power", "empty", "cut", "extra", "function", "overflow"],
+)
+def test_invalid_expressions_raise_value_error(text):
+    with pytest.raises(ValueError):
+        Expression(text)
+
+
+def test_missing_variable():
+    with pytest.raises(ValueError):
+        Expression("a + b").evaluate(a=1)
+
+
+def test_division_by_zero_in_batch():
+    expression = Expression("a / b")
+    result = expression.evaluate_columns(
+        {"a": [1.0, 1.0, -1.0, 0.0], "b": [2.0, 0.0, 0.0, 0.0]}, use_numpy=False
+    )
+    assert result[0] == 0.5
+    assert all(math.isnan(item) for item in result[1:])
+
+
+def test_evaluate_stream_marks_errors_with_nan():
+    source = io.StringIO("a,b\n1,2\n3,0\n-1,4\n")
+    target = io.StringIO()
+    assert evaluate_stream("sqrt(a) / b", source, target) == 3
+    lines = target.getvalue().splitlines()
+    assert float(lines[0]) == 0.5
+    assert math.isnan(float(lines[1]))
+    assert math.isnan(float(lines[2]))
+
+
+def test_constant_batch():
+    target = io.StringIO()
+    assert evaluate_stream("1 / 0", io.StringIO(""), target) == 1
+    assert math.isnan(float(target.getvalue()))
+
+
+def test_single_column_without_header():
+    target = io.StringIO()
+    assert evaluate_stream("x * 2", io.StringIO("1\n2\n"), target) == 2
+    assert target.getvalue().splitlines() == ["2.0", "4.0"]
+
+
+def test_stream_reports_bad_rows():
+    with pytest.raises(ValueError):
+        evaluate_stream("a + 1", io.StringIO("a\n1\nx\n"), io.StringIO())
+
+
+@pytest.mark.skipif(numpy is None, reason="нет NumPy")
+def test_numpy_matches_loop():
+    columns = {"a": [1.0, 2.0, -3.0, 0.0], "b": [2.0, 0.0, 1.0, 0.0]}
+    expression = Expression("a ^ 2 / b - log(a)")
+    loop = expression.evaluate_columns(columns, use_numpy=False)
+    arrays = expression.evaluate_columns(columns, use_numpy=True).tolist()
+    assert [repr(item) for item in loop] == [repr(item) for item in arrays]
+
+
+def run_calculator(monkeypatch, method, answers):
+    answers = iter(answers)
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(answers))
+    calculator = Calculator()
+    getattr(calculator, method)()
+    return calculator
+
+
+@pytest.mark.parametrize(
+    "text, printed",
+    [
+        ("+".join(["1"] * 300), "= 300.0"),
+        ("-" * 3000 + "1", "= 1.0"),
+        ("(" * 2000 + "1" + ")" * 2000, "Ошибка: Слишком глубокая вложенность"),
+    ],
+    ids=["sum", "unary", "parentheses"],
+)
+def test_calculator_survives_long_expressions(monkeypatch, capsys, text, printed):
+    run_calculator(monkeypatch, "evaluate_expression", [text])
+    assert printed in capsys.readouterr().out
+
+
+def test_calculator_batch_division_by_zero(monkeypatch, tmp_path, capsys):
+    source = tmp_path / "input.csv"
+    source.write_text("a,b\n1,0\n4,2\n", encoding="utf-8")
+    target = tmp_path / "output.txt"
+    calculator = run_calculator(
+        monkeypatch, "evaluate_batch", ["a / b", str(source), str(target)]
+    )
+    assert "Посчитано строк: 2" in capsys.readouterr().out
+    lines = target.read_text().splitlines()
+    assert math.isnan(float(lines[0])) and float(lines[1]) == 2.0
+    assert len(calculator.history) == 1
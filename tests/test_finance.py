@@ -0,0 +1,219 @@
+"""
+Индекс дат и агрегаты финансов сверяются с простым проходом по записям.
+"""
+
+import math
+import random
+from datetime import date
+
+import pytest
+
+from modules.dates import DateIndex, format_date, parse_date
+from modules.finance import FinanceManager, FinanceRecord
+from modules.rollups import FinanceRollups
+
+CATEGORIES = ["Еда", "Транспорт", "Зарплата", "Дом"]
+
+
+def random_records(seed, count):
+    rng = random.Random(seed)
+    records = []
+    for number in range(1, count + 1):
+        day = date(2025, 1, 1).toordinal() + rng.randrange(400)
+        records.append(
+            FinanceRecord(
+                number,
+                round(rng.uniform(-500, 500), rng.choice([0, 1, 2, 3])),
+                rng.choice(CATEGORIES),
+                format_date(day) if rng.random() > 0.05 else "",
+                "",
+            )
+        )
+    return records
+
+
+def in_range(record, start, end):
+    if start is None and end is None:
+        return True
+    if record.ordinal is None:
+        return False
+    return (start is None or record.ordinal >= start) and (
+        end is None or record.ordinal <= end
+    )
+
+
+def scan_totals(records, start=None, end=None):
+    amounts = [r.amount for r in records if in_range(r, start, end)]
+    return (
+        math.fsum(amount for amount in amounts if amount > 0),
+        math.fsum(amount for amount in amounts if amount <= 0),
+    )
+
+
+def scan_categories(records, start=None, end=None):
+    groups = {}
+    for record in records:
+        if in_range(record, start, end):
+            groups.setdefault(record.category, []).append(record.amount)
+    return {category: math.fsum(amounts) for category, amounts in groups.items()}
+
+
+def scan_monthly(records, start=None, end=None):
+    groups = {}
+    for record in records:
+        if record.ordinal is not None and in_range(record, start, end):
+            day = date.fromordinal(record.ordinal)
+            groups.setdefault((day.year, day.month), []).append(record.amount)
+    return [
+        (
+            year,
+            month,
+            math.fsum(amount for amount in amounts if amount > 0),
+            math.fsum(amount for amount in amounts if amount <= 0),
+            len(amounts),
+        )
+        for (year, month), amounts in sorted(groups.items())
+    ]
+
+
+def random_ranges(seed, count):
+    rng = random.Random(seed)
+    first = date(2024, 12, 1).toordinal()
+    ranges = [(None, None), (first + 100, None), (None, first + 200)]
+    for _ in range(count):
+        start = first + rng.randrange(450)
+        ranges.append((start, start + rng.randrange(120)))
+    return ranges
+
+
+def check_against_scan(rollups, records):
+    for start, end in random_ranges(len(records), 30):
+        assert rollups.totals(start, end) == scan_totals(records, start, end)
+        assert rollups.category_totals(start, end) == scan_categories(
+            records, start, end
+        )
+        assert rollups.monthly(start, end) == scan_monthly(records, start, end)
+
+
+def test_rollups_match_scan_after_edits_and_deletes():
+    records = random_records(1, 3000)
+    rollups = FinanceRollups()
+    for record in records:
+        rollups.add(record)
+    check_against_scan(rollups, records)
+
+    rng = random.Random(2)
+    alive = {record.id: record for record in records}
+    for record_id in rng.sample(sorted(alive), 1000):
+        rollups.discard(record_id)
+        del alive[record_id]
+    for record_id in rng.sample(sorted(alive), 500):
+        old = alive[record_id]
+        edited = FinanceRecord(
+            record_id, -old.amount / 3, rng.choice(CATEGORIES), old.date, ""
+        )
+        rollups.add(edited)
+        alive[record_id] = edited
+    check_against_scan(rollups, list(alive.values()))
+
+
+def test_small_amounts_do_not_drift():
+    rollups = FinanceRollups()
+    for number, (amount, day) in enumerate(
+        [(0.1, "28-02-2026"), (0.2, "01-03-2026"), (0.3, "02-03-2026")], 1
+    ):
+        rollups.add(FinanceRecord(number, amount, "Еда", day, ""))
+    march = parse_date("01-03-2026"), parse_date("02-03-2026")
+    assert rollups.totals(parse_date("02-03-2026"), parse_date("02-03-2026")) == (
+        0.3,
+        0,
+    )
+    assert rollups.totals(*march) == (0.5, 0)
+    assert rollups.category_totals(*march) == {"Еда": 0.5}
+    rollups.discard(2)
+    assert rollups.totals() == (0.4, 0)
+    rollups.discard(1)
+    rollups.discard(3)
+    assert rollups.totals() == (0, 0) and rollups.category_totals() == {}
+
+
+def test_manager_reports_match_scan(tmp_path):
+    records = random_records(3, 500)
+    manager = FinanceManager(str(tmp_path / "finance.json"))
+    manager.records.add_many(records)
+    manager.records.delete(10)
+    alive = [record for record in records if record.id != 10]
+    start, end = parse_date("01-03-2025"), parse_date("30-06-2025")
+    assert manager.report(start, end) == scan_totals(alive, start, end)
+    assert manager.category_totals(start, end) == scan_categories(alive, start, end)
+    assert manager.monthly() == scan_monthly(alive)
+    manager.close()
+
+    reopened = FinanceManager(str(tmp_path / "finance.json"))
+    assert reopened.report() == scan_totals(alive)
+    reopened.close()
+
+
+@pytest.mark.parametrize("text", ["inf", "-inf", "nan", "abc"])
+def test_non_finite_amounts_rejected(tmp_path, text):
+    manager = FinanceManager(str(tmp_path / "finance.json"))
+    source = tmp_path / "input.csv"
+    source.write_text(
+        f"amount,category,date,description\n{text},Еда,01-01-2026,\n"
+        "5,Еда,01-01-2026,\n",
+        encoding="utf-8",
+    )
+    result = manager.import_csv(str(source))
+    assert (result.imported, result.rejected) == (1, 1)
+    assert manager.report() == (5.0, 0)
+    manager.close()
+
+
+
+def scan_between(records, start, end):
+    found = [r for r in records if r.ordinal is not None and start <= r.ordinal <= end]
+    return [r.id for r in sorted(found, key=lambda r: (r.ordinal, r.id))]
+
+
+def test_date_index_matches_scan():
+    records = random_records(4, 2000)
+    index = DateIndex()
+    for record in records[:1500]:
+        index.add(record)
+    rng = random.Random(5)
+    alive = {record.id: record for record in records[:1500]}
+    for record_id in rng.sample(sorted(alive), 300):
+        index.discard(record_id)
+        del alive[record_id]
+    # Новые записи вливаются в список при первом запросе после удалений
+    for record in records[1500:]:
+        index.add(record)
+        alive[record.id] = record
+    assert len(index) == sum(1 for r in alive.values() if r.ordinal is not None)
+    for start, end in random_ranges(6, 40):
+        if start is None or end is None:
+            continue
+        expected = scan_between(alive.values(), start, end)
+        assert [r.id for r in index.between(start, end)] == expected
+        assert [r.id for r in index.iter_between(start, end)] == expected
+    day = records[0].ordinal or records[1].ordinal
+    assert [r.id for r in index.on(day)] == scan_between(alive.values(), day, day)
+    assert index.between(10, 20) == []
+
+
+def test_manager_filters_by_date(tmp_path):
+    records = random_records(7, 300)
+    manager = FinanceManager(str(tmp_path / "finance.json"))
+    manager.records.add_many(records)
+    moved = FinanceRecord(5, 1.0, "Еда", "01-01-2030", "")
+    manager.records.update(moved)
+    records[4] = moved
+    start, end = parse_date("01-06-2025"), parse_date("31-12-2030")
+    expected = scan_between(records, start, end)
+    assert [r.id for r in manager.records_between(start, end)] == expected
+    assert expected[-1] == 5
+    manager.close()
+
+    reopened = FinanceManager(str(tmp_path / "finance.json"))
+    assert [r.id for r in reopened.records_between(start, end)] == expected
+    reopened.close()
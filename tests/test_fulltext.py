@@ -0,0 +1,162 @@
+"""
+Полнотекстовый индекс заметок: ранжирование BM25 против прямого подсчёта,
+синтаксис запросов и сохранённый на диск индекс.
+"""
+
+import math
+import random
+
+import pytest
+
+from modules.fulltext import InvertedIndex, tokenize
+from modules.notes import Note, NotesManager
+
+FIELDS = NotesManager.SEARCH_FIELDS
+WORDS = ["кот", "кошка", "пёс", "дом", "сад", "река", "лес", "молоко", "хлеб"]
+
+
+def random_notes(count, seed=3):
+    rng = random.Random(seed)
+    return [
+        Note(
+            number,
+            " ".join(rng.choices(WORDS, k=rng.randint(1, 3))),
+            " ".join(rng.choices(WORDS, k=rng.randint(0, 12))),
+        )
+        for number in range(1, count + 1)
+    ]
+
+
+def scan_search(notes, terms, k1=1.2, b=0.75):
+    """
+    BM25 по определению: частоты слов с весами полей, все слова обязательны,
+    повторённое в запросе слово учитывается дважды.
+    """
+    counts = {}
+    for note in notes:
+        weights = {}
+        for field, weight in FIELDS.items():
+            for term in tokenize(getattr(note, field)):
+                weights[term] = weights.get(term, 0) + weight
+        counts[note.id] = weights
+    average = sum(sum(weights.values()) for weights in counts.values()) / len(notes)
+    scores = {}
+    for note_id, weights in counts.items():
+        if not all(term in weights for term in terms):
+            continue
+        length = sum(weights.values())
+        score = 0
+        for term in terms:
+            found = sum(1 for other in counts.values() if term in other)
+            idf = math.log(1 + (len(notes) - found + 0.5) / (found + 0.5))
+            frequency = weights[term]
+            norm = k1 * (1 - b + b * length / average)
+            score += idf * frequency * (k1 + 1) / (frequency + norm)
+        scores[note_id] = score
+    return scores
+
+
+def build(notes):
+    index = InvertedIndex(FIELDS)
+    for note in notes:
+        index.add(note)
+    return index
+
+
+@pytest.mark.parametrize("query", ["кот", "кот дом", "Молоко хлеб лес", "дом дом"])
+def test_bm25_matches_scan(query):
+    notes = random_notes(300)
+    expected = scan_search(notes, tokenize(query))
+    hits = build(notes).search(query, limit=len(notes))
+    assert {note_id for note_id, _ in hits} == set(expected)
+    for note_id, score in hits:
+        assert score == pytest.approx(expected[note_id])
+    assert [score for _, score in hits] == pytest.approx(
+        sorted(expected.values(), reverse=True)
+    )
+
+
+def test_query_syntax():
+    notes = [
+        Note(1, "Кот", "пьёт молоко"),
+        Note(2, "Котлеты", "на ужин"),
+        Note(3, "Пёс", "гуляет в саду"),
+    ]
+    index = build(notes)
+    assert {note_id for note_id, _ in index.search("кот*")} == {1, 2}
+    assert {note_id for note_id, _ in index.search("кот молоко")} == {1}
+    assert {note_id for note_id, _ in index.search("кот OR пёс")} == {1, 3}
+    assert {note_id for note_id, _ in index.search("ужин ИЛИ саду")} == {2, 3}
+    assert index.search("кот пёс") == []
+    assert index.search("жираф*") == []
+    assert len(index.search("кот* OR пёс", limit=2)) == 2
+    # Заголовок весит вдвое больше текста
+    weighted = build([Note(1, "сад", ""), Note(2, "", "сад"), Note(3, "лес", "")])
+    (first, _), (second, _) = weighted.search("сад")
+    assert (first, second) == (1, 2)
+
+
+def test_updates_match_rebuilt_index():
+    rng = random.Random(5)
+    notes = {note.id: note for note in random_notes(200)}
+    index = build(notes.values())
+    for step in range(300):
+        note_id = rng.randint(1, 260)
+        if note_id in notes and rng.random() < 0.4:
+            del notes[note_id]
+            index.discard(note_id)
+        else:
+            note = random_notes(1, seed=step)[0]
+            note.id = note_id
+            notes[note_id] = note
+            index.add(note)
+    rebuilt = build(notes.values())
+    assert index.postings == rebuilt.postings
+    assert index.vocabulary == sorted(rebuilt.postings)
+    for query in ["кот", "дом* OR река", "хлеб сад"]:
+        assert dict(index.search(query, 300)) == dict(rebuilt.search(query, 300))
+
+
+@pytest.fixture
+def notes_path(tmp_path):
+    return str(tmp_path / "notes.json")
+
+
+def test_index_persisted_between_runs(notes_path):
+    manager = NotesManager(notes_path)
+    manager.notes.add_many(random_notes(100))
+    expected = manager.search("кот дом", 20)
+    manager.close()
+
+    reopened = NotesManager(notes_path)
+    # Индекс прочитан из файла, а не перестроен по заметкам
+    assert reopened.search_index.doc_terms is None
+    assert [
+        (note.id, score) for note, score in reopened.search("кот дом", 20)
+    ] == [(note.id, score) for note, score in expected]
+    # Обратный список слов строится при первом удалении
+    reopened.notes.delete(expected[0][0].id)
+    assert expected[0][0].id not in {
+        note.id for note, _ in reopened.search("кот дом", 20)
+    }
+    reopened.close()
+
+
+def test_stale_index_rebuilt(notes_path):
+    manager = NotesManager(notes_path)
+    manager.notes.add_many(random_notes(20))
+    manager.close()
+    index_path = manager.index_path
+    assert InvertedIndex.load(index_path, FIELDS, manager.notes.stamp()) is not None
+    # Индекс для других полей не подходит
+    assert InvertedIndex.load(index_path, {"title": 1}, manager.notes.stamp()) is None
+
+    other = NotesManager(notes_path)
+    other.notes.add(Note(None, "Жираф", "в зоопарке"))
+    other.notes.close()
+
+    # Файлы изменились после сохранения индекса: он строится заново
+    reopened = NotesManager(notes_path)
+    assert reopened.search_index.doc_terms is not None
+    assert [note.title for note, _ in reopened.search("жираф")] == ["Жираф"]
+    reopened.close()
@@ -0,0 +1,98 @@
+"""
+История калькулятора: страницы, ограничение по размеру, восстановление
+после сбоя и кэш результатов.
+"""
+
+import pytest
+
+from modules.history import Operation, OperationHistory, OperationMemo, format_operation
+
+
+def operations(count, start=0):
+    return [Operation(number, "+", 1, number + 1) for number in range(start, count)]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "history.jsonl")
+
+
+def test_pages_newest_first():
+    history = OperationHistory(limit=100)
+    assert not history and history.pages() == 0 and history.page(0) == []
+    for operation in operations(45):
+        history.append(operation)
+    assert history.pages(20) == 3
+    assert [operation.a for operation in history.page(0, 20)] == list(range(44, 24, -1))
+    assert [operation.a for operation in history.page(2, 20)] == [4, 3, 2, 1, 0]
+    assert history.page(3, 20) == []
+
+
+def test_history_bounded_in_memory_and_on_disk(path):
+    history = OperationHistory(path, limit=10)
+    for operation in operations(35):
+        history.append(operation)
+        # Файл переписывается, когда вырастает вдвое против limit
+        assert history.file_lines < 20
+    assert len(history) == 10
+    history.close()
+    with open(path, encoding="utf-8") as file:
+        assert len(file.readlines()) == history.file_lines
+
+    reopened = OperationHistory(path, limit=10)
+    assert list(reopened.entries) == operations(35, start=25)
+    reopened.close()
+
+
+def test_torn_line_skipped(path):
+    history = OperationHistory(path)
+    for operation in operations(3):
+        history.append(operation)
+    history.close()
+    with open(path, "a", encoding="utf-8") as file:
+        file.write('[3, "+", 1')
+
+    reopened = OperationHistory(path)
+    assert len(reopened) == 3
+    reopened.append(Operation(7, "*", 6, 42))
+    reopened.close()
+    again = OperationHistory(path)
+    assert list(again.entries) == operations(3) + [Operation(7, "*", 6, 42)]
+    again.close()
+
+
+def test_search_and_format():
+    history = OperationHistory()
+    history.append(Operation(2, "*", 21, 42))
+    history.append(Operation("x ^ 2", "expr", {"x": 3}, 9))
+    history.append(Operation("data.txt", "batch", 12, None))
+    history.append(Operation(40, "+", 2, 42))
+    assert [format_operation(op) for op in history.search("42")] == [
+        "40 + 2 = 42",
+        "2 * 21 = 42",
+    ]
+    assert history.search("42", limit=1) == [Operation(40, "+", 2, 42)]
+    assert format_operation(history.search("X ^")[0]) == "x ^ 2 = 9"
+    assert format_operation(history.search("пакет")[0]) == "data.txt: пакет из 12 строк"
+
+
+def test_memo_lru():
+    calls = []
+
+    def divide(a, b):
+        calls.append((a, b))
+        return a / b if b else None
+
+    memo = OperationMemo(size=2)
+    assert memo.get("/", 1, 2, divide) == 0.5
+    assert memo.get("/", 1, 2, divide) == 0.5
+    memo.get("/", 3, 4, divide)
+    memo.get("/", 1, 2, divide)
+    # (3, 4) давно не запрашивали: он и вытесняется
+    memo.get("/", 5, 6, divide)
+    memo.get("/", 3, 4, divide)
+    # Ошибки (None) не кэшируются
+    memo.get("/", 1, 0, divide)
+    memo.get("/", 1, 0, divide)
+    assert calls == [(1, 2), (3, 4), (5, 6), (3, 4), (1, 0), (1, 0)]
+    assert memo.stats() == {"hits": 2, "misses": 6, "hit_rate": 0.25, "size": 2}
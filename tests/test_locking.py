@@ -0,0 +1,99 @@
+"""
+Межпроцессная блокировка FileLock и её поведение между потоками процесса.
+"""
+
+import fcntl
+import os
+import threading
+import time
+
+import pytest
+
+from modules.locking import FileLock
+
+
+@pytest.fixture
+def lock(tmp_path):
+    lock = FileLock(str(tmp_path / "items.lock"))
+    yield lock
+    lock.close()
+
+
+def other_process_can_lock(path, mode):
+    """
+    Пробует взять flock на отдельном описании файла, как другой процесс.
+    """
+    fd = os.open(path, os.O_RDWR)
+    try:
+        fcntl.flock(fd, mode | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return False
+    finally:
+        os.close(fd)
+    return True
+
+
+def test_exclusive_waits_for_shared_holders_in_other_threads(lock):
+    acquired = threading.Event()
+    lock.acquire(exclusive=False)
+
+    def writer():
+        with lock.exclusive():
+            acquired.set()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    # Пока общая блокировка у читателя, она не отпускается ради повышения
+    assert not acquired.wait(0.2)
+    assert not other_process_can_lock(lock.path, fcntl.LOCK_EX)
+    assert other_process_can_lock(lock.path, fcntl.LOCK_SH)
+    lock.release(exclusive=False)
+    thread.join(5)
+    assert acquired.is_set()
+    assert other_process_can_lock(lock.path, fcntl.LOCK_EX)
+
+
+def test_shared_reentrant_while_writer_waits(lock):
+    lock.acquire(exclusive=False)
+    thread = threading.Thread(target=lambda: lock.exclusive().__enter__())
+    thread.start()
+    while not lock._waiting:
+        time.sleep(0.01)
+    # Повторный общий захват того же потока не ждёт писателя
+    with lock.shared():
+        pass
+    lock.release(exclusive=False)
+    thread.join(5)
+    assert not other_process_can_lock(lock.path, fcntl.LOCK_SH)
+    lock.release()
+
+
+def test_upgrade_in_same_thread_rejected(lock):
+    with lock.shared():
+        with pytest.raises(RuntimeError):
+            lock.acquire()
+    with lock.exclusive():
+        # Общий захват под исключительным ничего не меняет
+        with lock.shared():
+            assert not other_process_can_lock(lock.path, fcntl.LOCK_SH)
+    assert other_process_can_lock(lock.path, fcntl.LOCK_EX)
+
+
+def test_exclusive_released_from_other_thread(lock):
+    lock.acquire()
+    with lock.exclusive():
+        pass
+    assert not other_process_can_lock(lock.path, fcntl.LOCK_SH)
+    thread = threading.Thread(target=lock.release)
+    thread.start()
+    thread.join(5)
+    assert other_process_can_lock(lock.path, fcntl.LOCK_EX)
+
+
+def test_counters_shared_between_descriptors(lock, tmp_path):
+    assert lock.counters() == (0, 0)
+    with lock.exclusive():
+        lock.set_counters(3, 42)
+    other = FileLock(lock.path)
+    assert other.counters() == (3, 42)
+    other.close()
@@ -0,0 +1,123 @@
+"""
+Снимок только для чтения с индексом смещений и команда get поверх него.
+"""
+
+import pytest
+
+from modules.commands import CommandRunner
+from modules.mapped import MappedRecordStore
+from modules.notes import Note, NotesManager
+from modules.records import RecordStore
+from modules.session import managers
+
+
+def open_mapped(path):
+    return MappedRecordStore(str(path), Note.from_dict).open()
+
+
+def as_dicts(records):
+    return {record.id: record.to_dict() for record in records}
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = RecordStore(str(tmp_path / "notes.json"), Note.from_dict).load()
+    store.add_many(Note(None, f"заметка {number}", "текст") for number in range(50))
+    store.save()
+    yield store
+    store.close()
+
+
+def test_lookup_matches_store(store, tmp_path):
+    mapped = open_mapped(tmp_path / "notes.json")
+    assert (tmp_path / "notes.offsets").exists()
+    assert len(mapped) == len(store)
+    assert as_dicts(mapped) == as_dicts(store)
+    assert mapped.get(7).to_dict() == store.get(7).to_dict()
+    assert mapped.get(1000) is None and 1000 not in mapped
+    mapped.close()
+
+
+def test_journal_overlay_after_writes(store, tmp_path):
+    store.update(Note(3, "изменена", "новый текст"))
+    store.delete(5)
+    store.add(Note(None, "после снимка", ""))
+    store.storage.flush()
+
+    mapped = open_mapped(tmp_path / "notes.json")
+    assert mapped.get(3).title == "изменена"
+    assert mapped.get(5) is None and 5 not in mapped
+    assert mapped.get(51).title == "после снимка"
+    assert len(mapped) == len(store)
+    assert as_dicts(mapped) == as_dicts(store)
+    mapped.close()
+
+
+def test_offsets_rebuilt_after_compaction(store, tmp_path):
+    mapped = open_mapped(tmp_path / "notes.json")
+    before = (tmp_path / "notes.offsets").read_bytes()
+    for record_id in range(1, 20):
+        store.delete(record_id)
+    store.add_many(Note(None, f"новая {number}", "") for number in range(30))
+    store.save()
+
+    assert mapped.is_stale()
+    mapped.open()
+    assert (tmp_path / "notes.offsets").read_bytes() != before
+    assert mapped.overlay == {}
+    assert as_dicts(mapped) == as_dicts(store)
+    for record in store:
+        assert mapped.get(record.id).to_dict() == record.to_dict()
+    mapped.close()
+
+
+def test_damaged_offsets_ignored(store, tmp_path):
+    (tmp_path / "notes.offsets").write_bytes(b"PAOFFS1\n" + b"\0" * 40)
+    mapped = open_mapped(tmp_path / "notes.json")
+    assert as_dicts(mapped) == as_dicts(store)
+    assert mapped.get(50).title == "заметка 49"
+    mapped.close()
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    managers.close()
+
+
+def test_get_reads_mapped_snapshot_when_section_not_loaded(workdir):
+    notes = NotesManager("data/notes.json")
+    notes.notes.add(Note(None, "первая", "текст"))
+    notes.save_notes()
+    notes.close()
+
+    runner = CommandRunner()
+    (result,) = runner.run([{"op": "get", "section": "notes", "id": 1}])
+    assert result["record"]["title"] == "первая"
+    assert "notes" in runner._mapped and not managers.managers
+    (result,) = runner.run([{"op": "get", "section": "notes", "id": 2}])
+    assert not result["ok"]
+
+
+def test_get_sees_unflushed_writes_of_loaded_section(workdir):
+    runner = CommandRunner()
+    results = list(
+        runner.run(
+            [
+                {"op": "add", "section": "tasks", "data": {"title": "задача"}},
+                {"op": "get", "section": "tasks", "id": 1},
+                {"op": "edit", "section": "tasks", "id": 1, "data": {"title": "иначе"}},
+                {"op": "get", "section": "tasks", "id": 1},
+            ]
+        )
+    )
+    assert results[1]["record"]["title"] == "задача"
+    assert results[3]["record"]["title"] == "иначе"
+    assert "tasks" not in runner._mapped
+
+    # Новый процесс без загруженного раздела читает то же с диска
+    managers.close()
+    (result,) = CommandRunner().run([{"op": "get", "section": "tasks", "id": 1}])
+    assert result["record"]["title"] == "иначе"
@@ -0,0 +1,138 @@
+"""
+Хранилище записей по ID, выдача ID и компактные классы записей.
+"""
+
+import pytest
+
+from benchmarks.generators import KINDS, generate
+from modules.commands import SECTIONS
+from modules.finance import FinanceRecord
+from modules.records import IdAllocator, RecordStore, intern_text
+from modules.tasks import Task
+from tests.test_storage import Item, contents, open_store
+
+
+def test_allocator():
+    ids = IdAllocator()
+    assert ids.allocate() == 1
+    assert ids.allocate(5) == 2
+    ids.observe(3)
+    assert ids.last_id == 6
+    ids.observe(40)
+    assert ids.allocate() == 41
+
+    reserved = []
+
+    def reserve(count, last_id):
+        reserved.append((count, last_id))
+        return 100
+
+    shared = IdAllocator(7, reserve)
+    assert shared.allocate(3) == 100
+    assert shared.last_id == 102
+    assert reserved == [(3, 7)]
+
+
+def test_store_order_and_lookup(tmp_path):
+    store = open_store(tmp_path / "items.json")
+    store.add_many([Item(None, "а"), Item(None, "б"), Item(None, "в")])
+    store.add(Item(10, "с ID"))
+    store.add(Item(None, "после"))
+    assert [item.id for item in store] == [1, 2, 3, 10, 11]
+    assert store.get(10).text == "с ID" and store.get(4) is None
+    assert 3 in store and 4 not in store and len(store) == 5
+
+    # Изменённая запись остаётся на своём месте
+    store.update(Item(2, "б2"))
+    assert [item.text for item in store] == ["а", "б2", "в", "с ID", "после"]
+    assert store.delete(1).text == "а"
+    assert store.delete(1) is None
+    store.close()
+
+    reopened = open_store(tmp_path / "items.json")
+    assert contents(reopened) == {2: "б2", 3: "в", 10: "с ID", 11: "после"}
+    reopened.close()
+
+
+def test_ids_not_reused_after_deleting_everything(tmp_path):
+    path = tmp_path / "items.json"
+    store = open_store(path)
+    store.add_many(Item(None, str(number)) for number in range(5))
+    for record_id in range(1, 6):
+        store.delete(record_id)
+    store.save()
+    store.close()
+
+    reopened = open_store(path)
+    assert len(reopened) == 0
+    item = Item(None, "новая")
+    reopened.add(item)
+    assert item.id == 6
+    assert reopened.next_id() == 7
+    reopened.close()
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def add(self, record):
+        self.calls.append(("add", record.id))
+
+    def discard(self, record_id):
+        self.calls.append(("discard", record_id))
+
+
+def test_indexes_notified(tmp_path):
+    store = RecordStore(str(tmp_path / "items.json"), Item.from_dict).load()
+    store.add(Item(None, "до"))
+    index = store.add_index(Recorder())
+    unbuilt = store.add_index(Recorder(), build=False)
+    store.add(Item(None, "после"))
+    store.update(Item(1, "изменена"))
+    store.delete(2)
+    store.delete(2)
+    expected = [("add", 2), ("discard", 1), ("add", 1), ("discard", 2)]
+    assert index.calls == [("add", 1)] + expected
+    assert unbuilt.calls == expected
+    store.close()
+
+
+
+@pytest.mark.parametrize("kind", KINDS)
+def test_records_have_slots_and_round_trip(kind):
+    section = SECTIONS[kind]
+    for data in generate(kind, 20, seed=1):
+        record = section.record.from_dict(data)
+        assert not hasattr(record, "__dict__")
+        assert record.to_dict() == data
+
+
+def test_repeated_fields_shared():
+    def copies(text):
+        # Отдельные объекты строк, как после json.loads
+        return "".join(list(text))
+
+    tasks = [
+        Task.from_dict(
+            {
+                "id": number,
+                "title": "т",
+                "description": "",
+                "done": False,
+                "priority": copies("Высокий"),
+                "due_date": copies("01-03-2026"),
+            }
+        )
+        for number in range(2)
+    ]
+    records = [
+        FinanceRecord(number, 1.0, copies("Еда"), copies("01-03-2026"), "")
+        for number in range(2)
+    ]
+    assert tasks[0].priority is tasks[1].priority
+    assert tasks[0].due_date is tasks[1].due_date is records[0].date
+    assert records[0].category is records[1].category
+    # Порядковые номера дат берутся из кэша разбора
+    assert records[0].ordinal is records[1].ordinal is tasks[0].due
+    assert intern_text(None) is None and intern_text(5) == 5
@@ -0,0 +1,140 @@
+"""
+Локальный сервер: пачки записей, чтения в обход записей и перезагрузка
+устаревших менеджеров.
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+
+from modules.server import AssistantServer
+from modules.session import managers
+from modules.tasks import TasksManager
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    (tmp_path / "data").mkdir()
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    managers.flush()
+    managers.close()
+
+
+class Client:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.rid = 0
+
+    async def send(self, **request):
+        self.rid += 1
+        request["rid"] = self.rid
+        self.writer.write((json.dumps(request, ensure_ascii=False) + "\n").encode())
+        await self.writer.drain()
+        return self.rid
+
+    async def receive(self):
+        return json.loads(await self.reader.readline())
+
+    async def call(self, **request):
+        await self.send(**request)
+        return await self.receive()
+
+
+def run_with_server(workdir, scenario, **options):
+    path = str(workdir / "server.sock")
+
+    async def main():
+        server = AssistantServer(**options)
+        listener = await server.start(socket_path=path)
+        client = Client(*await asyncio.open_unix_connection(path))
+        try:
+            return await scenario(server, client)
+        finally:
+            client.writer.close()
+            listener.close()
+            for writer in server.writers:
+                writer.cancel()
+
+    return asyncio.run(main())
+
+
+def test_writes_and_reads(workdir):
+    async def scenario(server, client):
+        for number in range(20):
+            await client.send(op="add", section="tasks", data={"title": f"т{number}"})
+        added = [await client.receive() for _ in range(20)]
+        assert all(response["ok"] for response in added)
+        assert sorted(response["id"] for response in added) == list(range(1, 21))
+        report = await client.call(op="report", section="tasks")
+        assert report["total"] == 20
+        found = await client.call(op="get", section="tasks", id=7)
+        assert found["record"]["title"] == "т6"
+        bad = await client.call(op="add", section="tasks", data={"done": "может"})
+        assert not bad["ok"]
+        assert (await client.call(op="ping"))["ok"]
+        return server.batches
+
+    assert run_with_server(workdir, scenario) < 20
+    reopened = TasksManager("data/tasks.json")
+    assert len(reopened.tasks) == 20
+    reopened.close()
+
+
+def test_writes_after_reload_reach_disk(workdir):
+    async def scenario(server, client):
+        first = await client.call(
+            op="add", section="notes", data={"title": "до", "content": ""}
+        )
+        assert first["ok"]
+        # Файлы меняют в обход блокировки: реестр перезагрузит менеджер
+        snapshot = [{"id": 50, "title": "вручную", "content": "", "timestamp": ""}]
+        (workdir / "data" / "notes.journal").unlink()
+        (workdir / "data" / "notes.json").write_text(
+            json.dumps(snapshot, ensure_ascii=False), encoding="utf-8"
+        )
+        second = await client.call(
+            op="add", section="notes", data={"title": "после", "content": ""}
+        )
+        assert second["ok"]
+        report = await client.call(op="report", section="notes")
+        assert report["count"] == 2
+        return managers.reloads
+
+    assert run_with_server(workdir, scenario) >= 1
+    managers.close()
+    lines = (workdir / "data" / "notes.journal").read_text(encoding="utf-8")
+    assert "после" in lines
+
+
+def test_reads_do_not_wait_for_flush(workdir, monkeypatch):
+    flush = managers.flush
+
+    def slow_flush():
+        time.sleep(0.5)
+        flush()
+
+    monkeypatch.setattr(managers, "flush", slow_flush)
+
+    async def scenario(server, client):
+        await client.call(op="add", section="finance", data={
+            "amount": "5", "category": "Еда", "date": "01-01-2026"
+        })
+        write = await client.send(
+            op="add",
+            section="finance",
+            data={"amount": "-2", "category": "Еда", "date": "02-01-2026"},
+        )
+        start = time.perf_counter()
+        read = await client.send(op="report", section="finance")
+        first = await client.receive()
+        elapsed = time.perf_counter() - start
+        second = await client.receive()
+        assert first["rid"] == read and second["rid"] == write
+        assert elapsed < 0.4
+        assert first["income"] == 5.0
+
+    run_with_server(workdir, scenario)
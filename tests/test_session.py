@@ -0,0 +1,93 @@
+"""
+Реестр загруженных менеджеров: повторное использование, подтягивание
+чужих операций и перезагрузка после правки файлов в обход блокировки.
+"""
+
+import json
+
+import pytest
+
+from modules.finance import FinanceManager
+from modules.notes import Note, NotesManager
+from modules.session import ManagerRegistry, env_flag
+
+
+@pytest.fixture
+def registry():
+    registry = ManagerRegistry()
+    yield registry
+    registry.close()
+
+
+def test_manager_reused(registry, tmp_path):
+    path = str(tmp_path / "notes.json")
+    assert registry.cached(NotesManager, path) is None
+    manager = registry.get(NotesManager, path)
+    assert registry.get(NotesManager, path) is manager
+    assert registry.cached(NotesManager, path) is manager
+    finance = str(tmp_path / "finances.json")
+    rows = registry.get(FinanceManager, finance)
+    columnar = registry.get(FinanceManager, finance, columnar=True)
+    assert rows is not columnar and columnar.columnar
+    stats = registry.stats()
+    assert (stats["hits"], stats["misses"], stats["reloads"]) == (1, 3, 0)
+
+
+def test_foreign_operations_merged_without_reload(registry, tmp_path):
+    path = str(tmp_path / "notes.json")
+    manager = registry.get(NotesManager, path)
+    manager.notes.add(Note(None, "своя", ""))
+    registry.flush()
+
+    other = NotesManager(path)
+    other.notes.add_many([Note(None, "чужая", ""), Note(None, "ещё", "")])
+    other.close()
+
+    assert registry.get(NotesManager, path) is manager
+    assert [note.title for note in manager.notes] == ["своя", "чужая", "ещё"]
+    # Поисковый индекс обновлён вместе с хранилищем
+    assert [note.title for note, _ in manager.search("чужая")] == ["чужая"]
+    stats = registry.stats()
+    assert (stats["merged"], stats["reloads"]) == (2, 0)
+
+
+def test_reload_after_bypassing_lock(registry, tmp_path):
+    path = tmp_path / "notes.json"
+    manager = registry.get(NotesManager, str(path))
+    manager.notes.add(Note(None, "старая", ""))
+    registry.flush()
+    (tmp_path / "notes.journal").unlink()
+    path.write_text(
+        json.dumps([{"id": 7, "title": "вручную", "content": "", "timestamp": ""}]),
+        encoding="utf-8",
+    )
+
+    reloaded = registry.get(NotesManager, str(path))
+    assert reloaded is not manager
+    assert manager.notes.storage._journal is None
+    assert [note.title for note in reloaded.notes] == ["вручную"]
+    assert registry.stats()["reloads"] == 1
+
+
+def test_open_migrates_into_database(registry, tmp_path):
+    json_path = str(tmp_path / "notes.json")
+    source = NotesManager(json_path)
+    source.notes.add(Note(None, "из JSON", ""))
+    source.close()
+    database = str(tmp_path / "all.db")
+    manager = registry.open(NotesManager, json_path, database)
+    assert registry.open(NotesManager, json_path, database) is manager
+    assert [note.title for note in manager.notes] == ["из JSON"]
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [("1", True), (" Yes ", True), ("да", True), ("on", True)]
+    + [("0", False), ("", False), ("нет", False), (None, False)],
+)
+def test_env_flag(monkeypatch, value, expected):
+    if value is None:
+        monkeypatch.delenv("ASSISTANT_FLAG", raising=False)
+    else:
+        monkeypatch.setenv("ASSISTANT_FLAG", value)
+    assert env_flag("ASSISTANT_FLAG") is expected
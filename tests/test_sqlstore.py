@@ -0,0 +1,131 @@
+"""
+Хранилище SQLite: те же ответы, что у JSON-хранилища, перенос данных из
+JSON и выдача ID нескольким соединениям.
+"""
+
+import random
+
+import pytest
+
+from modules.contact import ContactManager
+from modules.finance import FinanceManager
+from modules.notes import Note, NotesManager
+from modules.sqlstore import fts_query
+from tests.test_contacts import QUERIES, random_contact
+from tests.test_finance import random_ranges, random_records
+from tests.test_fulltext import random_notes
+
+
+def open_pair(tmp_path, factory, name):
+    return factory(str(tmp_path / f"{name}.json")), factory(str(tmp_path / "all.db"))
+
+
+def dicts(records):
+    return [record.to_dict() for record in records]
+
+
+def test_finance_reports_match_json(tmp_path):
+    managers = open_pair(tmp_path, FinanceManager, "finances")
+    for manager in managers:
+        manager.records.add_many(random_records(1, 800))
+        for record_id in range(1, 800, 7):
+            manager.records.delete(record_id)
+    json_manager, sql_manager = managers
+    assert dicts(sql_manager.records) == dicts(json_manager.records)
+    for start, end in random_ranges(2, 20):
+        assert sql_manager.report(start, end) == pytest.approx(
+            json_manager.report(start, end)
+        )
+        assert sql_manager.category_totals(start, end) == pytest.approx(
+            json_manager.category_totals(start, end)
+        )
+        sql_monthly = sql_manager.monthly(start, end)
+        json_monthly = json_manager.monthly(start, end)
+        assert [row[:2] + row[4:] for row in sql_monthly] == [
+            row[:2] + row[4:] for row in json_monthly
+        ]
+        assert [row[2:4] for row in sql_monthly] == [
+            pytest.approx(row[2:4]) for row in json_monthly
+        ]
+        if start is not None and end is not None:
+            assert dicts(sql_manager.records_between(start, end)) == dicts(
+                json_manager.records_between(start, end)
+            )
+    for manager in managers:
+        manager.close()
+
+
+def test_contact_search_matches_json(tmp_path):
+    managers = open_pair(tmp_path, ContactManager, "contacts")
+    for manager in managers:
+        rng = random.Random(4)
+        manager.contacts.add_many(random_contact(rng) for _ in range(300))
+    json_manager, sql_manager = managers
+    for query in QUERIES:
+        assert dicts(sql_manager.find(query)) == dicts(json_manager.find(query)), query
+    for manager in managers:
+        manager.close()
+
+
+@pytest.mark.parametrize("query", ["кот", "кот дом", "кот* OR река", "мол*", "жираф"])
+def test_note_search_finds_same_notes(tmp_path, query):
+    managers = open_pair(tmp_path, NotesManager, "notes")
+    for manager in managers:
+        manager.notes.add_many(random_notes(200))
+    json_found, sql_found = (
+        {note.id for note, _ in manager.search(query, 200)} for manager in managers
+    )
+    assert sql_found == json_found
+    for manager in managers:
+        manager.close()
+
+
+def test_note_search_weights_title(tmp_path):
+    manager = NotesManager(str(tmp_path / "all.db"))
+    manager.notes.add_many(
+        [Note(None, "", "сад"), Note(None, "сад", ""), Note(None, "лес", "")]
+    )
+    assert [note.id for note, _ in manager.search("сад")] == [2, 1]
+    manager.close()
+
+
+def test_migrate_from_json_once(tmp_path):
+    json_path = str(tmp_path / "notes.json")
+    source = NotesManager(json_path)
+    source.notes.add_many(random_notes(30))
+    source.notes.delete(30)
+    source.close()
+
+    target = NotesManager(str(tmp_path / "all.db"))
+    assert target.migrate_from_json(json_path) == 29
+    assert target.migrate_from_json(json_path) == 0
+    assert len(target.notes) == 29
+    # ID удалённой в JSON заметки не выдаётся повторно
+    note = Note(None, "новая", "")
+    target.notes.add(note)
+    assert note.id == 31
+    target.close()
+
+
+def test_ids_unique_across_connections(tmp_path):
+    path = str(tmp_path / "all.db")
+    first, second = NotesManager(path), NotesManager(path)
+    notes = []
+    for number in range(20):
+        manager = first if number % 2 else second
+        batch = [Note(None, f"заметка {number}", "") for _ in range(3)]
+        manager.notes.add_many(batch)
+        notes.extend(batch)
+    assert sorted(note.id for note in notes) == list(range(1, 61))
+    # Данные читаются из базы, поэтому второе соединение видит всё сразу
+    assert len(first.notes) == len(second.notes) == 60
+    assert not first.is_stale()
+    first.close()
+    second.close()
+
+
+def test_fts_query():
+    assert fts_query("кот дом") == '("кот" AND "дом")'
+    assert fts_query("Кот* ИЛИ пёс") == '("кот"*) OR ("пёс")'
+    assert fts_query('"; DROP TABLE notes; --') == '("drop" AND "table" AND "notes")'
+    assert fts_query("OR") == ""
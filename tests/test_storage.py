@@ -0,0 +1,470 @@
+"""
+Журнал операций, блокировка и слияние изменений между процессами.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from modules.records import RecordStore
+from modules.storage import JournalStorage, JournalWriter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Ошибка в фоновом потоке записи или сжатия должна валить тест
+pytestmark = pytest.mark.filterwarnings(
+    "error::pytest.PytestUnhandledThreadExceptionWarning"
+)
+
+# Дочерний процесс: добавляет записи в общее хранилище и печатает их ID
+WRITER = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from modules.records import RecordStore
+from tests.test_storage import Item
+
+store = RecordStore(sys.argv[2], Item.from_dict).load()
+ids = []
+for number in range(int(sys.argv[4])):
+    item = Item(None, f"{sys.argv[3]}-{number}")
+    store.add(item)
+    ids.append(item.id)
+store.close()
+print(" ".join(map(str, ids)))
+"""
+
+
+class Item:
+    def __init__(self, id, text):
+        self.id = id
+        self.text = text
+
+    def to_dict(self):
+        return {"id": self.id, "text": self.text}
+
+    @staticmethod
+    def from_dict(data):
+        return Item(data["id"], data["text"])
+
+
+def open_store(path):
+    return RecordStore(str(path), Item.from_dict).load()
+
+
+def contents(store):
+    return {item.id: item.text for item in store}
+
+
+def add(store, text):
+    item = Item(None, text)
+    store.add(item)
+    return item
+
+
+def test_journal_replayed_over_snapshot(tmp_path):
+    path = tmp_path / "items.json"
+    store = open_store(path)
+    first = add(store, "первая")
+    second = add(store, "вторая")
+    add(store, "третья")
+    store.update(Item(first.id, "изменённая"))
+    store.delete(second.id)
+    expected = contents(store)
+    store.close()
+
+    assert not path.exists()
+    reopened = open_store(path)
+    assert contents(reopened) == expected
+    assert [item.id for item in reopened] == sorted(expected)
+    assert reopened.storage.journal_entries == 5
+    reopened.close()
+
+
+def test_journal_replayed_after_compaction(tmp_path):
+    path = tmp_path / "items.json"
+    store = open_store(path)
+    for number in range(5):
+        add(store, f"запись {number}")
+    store.save()
+    store.delete(1)
+    added = add(store, "после сжатия")
+    expected = contents(store)
+    store.close()
+
+    reopened = open_store(path)
+    assert contents(reopened) == expected
+    # ID удалённой и последней записи не выдаются повторно
+    assert add(reopened, "новая").id == added.id + 1
+    reopened.close()
+
+
+def test_torn_journal_line_truncated(tmp_path):
+    path = tmp_path / "items.json"
+    store = open_store(path)
+    add(store, "целая")
+    store.close()
+    journal = tmp_path / "items.journal"
+    size = journal.stat().st_size
+    with open(journal, "ab") as file:
+        file.write(b'{"op": "add", "id": 2, "data": {"id": 2, "te')
+
+    store = open_store(path)
+    assert contents(store) == {1: "целая"}
+    assert journal.stat().st_size == size
+    add(store, "после сбоя")
+    store.close()
+
+    reopened = open_store(path)
+    assert contents(reopened) == {1: "целая", 2: "после сбоя"}
+    reopened.close()
+
+
+def test_duplicate_ids_migrated(tmp_path):
+    path = tmp_path / "items.json"
+    records = [
+        {"id": 1, "text": "а"},
+        {"id": 2, "text": "б"},
+        {"id": 2, "text": "в"},
+    ]
+    path.write_text(json.dumps(records, ensure_ascii=False), encoding="utf-8")
+
+    store = open_store(path)
+    assert contents(store) == {1: "а", 2: "б", 3: "в"}
+    assert add(store, "г").id == 4
+    store.close()
+
+    # Новые ID записаны в снимок, повторная загрузка их не меняет
+    saved = json.loads(path.read_text(encoding="utf-8"))
+    assert [data["id"] for data in saved] == [1, 2, 3]
+    reopened = open_store(path)
+    assert contents(reopened) == {1: "а", 2: "б", 3: "в", 4: "г"}
+    reopened.close()
+
+
+def test_background_compaction_keeps_concurrent_appends(tmp_path):
+    path = tmp_path / "items.json"
+    store = open_store(path)
+    for number in range(200):
+        add(store, f"до {number}")
+    stop = threading.Event()
+
+    def compact_repeatedly():
+        while not stop.is_set():
+            store.storage.compact()
+
+    compactor = threading.Thread(target=compact_repeatedly)
+    compactor.start()
+    try:
+        for number in range(500):
+            item = add(store, f"во время {number}")
+            if number % 3 == 0:
+                store.update(Item(item.id - 100, f"правка {number}"))
+            if number % 7 == 0:
+                store.delete(item.id - 50)
+    finally:
+        stop.set()
+        compactor.join()
+    expected = contents(store)
+    store.close()
+
+    reopened = open_store(path)
+    assert contents(reopened) == expected
+    reopened.close()
+
+
+def test_other_process_appends_merged(tmp_path):
+    path = tmp_path / "items.json"
+    ours = open_store(path)
+    theirs = open_store(path)
+    first = add(ours, "наша")
+    ours.storage.flush()
+    add(theirs, "чужая")
+    theirs.update(Item(first.id, "изменена там"))
+    theirs.storage.flush()
+
+    assert ours.refresh() == 2
+    assert contents(ours) == contents(theirs)
+    assert ours.storage.merged == {1, 2}
+    # После слияния ID не повторяются
+    assert add(ours, "ещё").id == 3
+    ours.close()
+    theirs.close()
+
+
+def test_conflicting_edit_resolved_by_journal_order(tmp_path):
+    path = tmp_path / "items.json"
+    ours = open_store(path)
+    item = add(ours, "исходная")
+    ours.storage.flush()
+    theirs = open_store(path)
+
+    # Оба процесса правят запись, не видя правки друг друга
+    ours.update(Item(item.id, "здесь"))
+    theirs.update(Item(item.id, "там"))
+    theirs.storage.flush()
+    ours.refresh()
+
+    assert ours.get(item.id).text == "здесь"
+    assert ours.storage.conflicts == 1
+    ours.close()
+    theirs.close()
+
+    reopened = open_store(path)
+    assert reopened.get(item.id).text == "здесь"
+    reopened.close()
+
+
+def test_resync_after_other_process_compacts(tmp_path):
+    path = tmp_path / "items.json"
+    ours = open_store(path)
+    for number in range(3):
+        add(ours, f"запись {number}")
+    ours.storage.flush()
+    theirs = open_store(path)
+    theirs.delete(1)
+    theirs.update(Item(2, "изменена там"))
+    add(theirs, "чужая")
+    theirs.save()
+
+    assert ours.refresh() == 3
+    assert contents(ours) == contents(theirs)
+    add(ours, "после сверки")
+    ours.close()
+    theirs.close()
+
+    reopened = open_store(path)
+    assert contents(reopened) == {
+        2: "изменена там",
+        3: "запись 2",
+        4: "чужая",
+        5: "после сверки",
+    }
+    reopened.close()
+
+
+def test_stale_only_for_unlocked_changes(tmp_path):
+    path = tmp_path / "items.json"
+    ours = open_store(path)
+    add(ours, "наша")
+    ours.storage.flush()
+    theirs = open_store(path)
+    add(theirs, "чужая")
+    theirs.storage.flush()
+    theirs.close()
+
+    # Запись под блокировкой двигает версию и разбирается слиянием
+    assert not ours.is_stale()
+    ours.refresh()
+    assert not ours.is_stale()
+
+    path.write_text('[{"id": 7, "text": "вручную"}]\n', encoding="utf-8")
+    assert ours.is_stale()
+    ours.close()
+
+
+def test_processes_allocate_unique_ids(tmp_path):
+    path = tmp_path / "items.json"
+    processes = [
+        subprocess.Popen(
+            [sys.executable, "-c", WRITER, ROOT, str(path), name, "100"],
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        for name in ("a", "b", "c")
+    ]
+    ids = []
+    for process in processes:
+        output, _ = process.communicate(timeout=120)
+        assert process.returncode == 0
+        ids.extend(map(int, output.split()))
+
+    assert len(ids) == len(set(ids)) == 300
+    store = open_store(path)
+    assert sorted(contents(store)) == sorted(ids)
+    assert sorted(contents(store).values()) == sorted(
+        f"{name}-{number}" for name in "abc" for number in range(100)
+    )
+    store.close()
+
+
+def test_storage_without_merge_ignores_foreign_writes(tmp_path):
+    path = str(tmp_path / "items.json")
+    storage = JournalStorage(path, list)
+    storage.load()
+    assert storage.sync() == 0
+    storage.close()
+
+
+def test_import_compacts_logarithmically(tmp_path):
+    path = tmp_path / "items.json"
+    store = open_store(path)
+    storage = store.storage
+    storage.compact_min_entries = 10**9
+    storage.compact_min_bytes = 16 * 1024
+    snapshots = []
+    write_snapshot = storage._write_snapshot
+
+    def counted(records):
+        snapshots.append(len(records))
+        write_snapshot(records)
+
+    storage._write_snapshot = counted
+    for batch in range(100):
+        store.add_many(Item(None, f"запись {batch}-{number}") for number in range(200))
+        storage._wait_compaction()
+    # Порог растёт вместе со снимком: снимки растут в геометрической
+    # прогрессии, а не переписываются на каждые 16 КБ журнала (~55 раз)
+    assert len(snapshots) <= 15
+    growth = [later / earlier for earlier, later in zip(snapshots, snapshots[1:])]
+    assert min(growth) >= 1.25
+    assert storage.snapshot_size == os.path.getsize(path)
+    store.close()
+
+    assert len(open_store(path)) == 20000
+
+
+def opened_paths(monkeypatch):
+    import modules.storage
+
+    paths = []
+
+    def tracking_open(path, *args, **kwargs):
+        paths.append(os.path.basename(path))
+        return open(path, *args, **kwargs)
+
+    monkeypatch.setattr(modules.storage, "open", tracking_open, raising=False)
+    return paths
+
+
+def test_snapshot_read_from_binary_cache(tmp_path, monkeypatch):
+    path = tmp_path / "items.json"
+    store = open_store(path)
+    for number in range(20):
+        add(store, f"запись {number}")
+    store.save()
+    expected = contents(store)
+    store.close()
+    assert (tmp_path / "items.cache").exists()
+
+    paths = opened_paths(monkeypatch)
+    reopened = open_store(path)
+    assert contents(reopened) == expected
+    assert "items.cache" in paths and "items.json" not in paths
+    reopened.close()
+
+
+def test_cache_ignored_when_snapshot_changes(tmp_path, monkeypatch):
+    path = tmp_path / "items.json"
+    store = open_store(path)
+    add(store, "в кэше")
+    store.save()
+    store.close()
+    # Снимок заменили в обход хранилища: кэш построен для другого файла
+    path.write_text(json.dumps([{"id": 1, "text": "в файле"}]), encoding="utf-8")
+    (tmp_path / "items.journal").unlink()
+
+    paths = opened_paths(monkeypatch)
+    reopened = open_store(path)
+    assert contents(reopened) == {1: "в файле"}
+    assert "items.json" in paths
+    reopened.close()
+    # Кэш пересоздан для нового снимка
+    assert reopened.storage._read_cache() == [{"id": 1, "text": "в файле"}]
+
+
+@pytest.mark.parametrize(
+    "content",
+    [b"", b"garbage", b"garbage" * 100],
+    ids=["empty", "corrupt", "corrupt-long"],
+)
+def test_damaged_cache_falls_back_to_json(tmp_path, content):
+    path = tmp_path / "items.json"
+    store = open_store(path)
+    add(store, "запись")
+    store.save()
+    store.close()
+    cache = tmp_path / "items.cache"
+    cache.write_bytes(cache.read_bytes()[:12] + content if content else b"")
+
+    reopened = open_store(path)
+    assert contents(reopened) == {1: "запись"}
+    reopened.close()
+
+
+def journal_lines(path):
+    try:
+        with open(path, encoding="utf-8") as file:
+            return [json.loads(line) for line in file]
+    except FileNotFoundError:
+        return []
+
+
+def open_storage(path, writer):
+    storage = JournalStorage(str(path), lambda: [], writer=writer)
+    storage.load()
+    return storage
+
+
+def test_writer_coalesces_quick_appends(tmp_path, monkeypatch):
+    import modules.storage
+
+    synced = []
+    fsync = modules.storage.os.fsync
+    monkeypatch.setattr(
+        modules.storage.os, "fsync", lambda fd: synced.append(fd) or fsync(fd)
+    )
+    writer = JournalWriter(delay=0.2)
+    storage = open_storage(tmp_path / "items.json", writer)
+    for number in range(50):
+        storage.append("add", number + 1, {"id": number + 1, "text": str(number)})
+    assert journal_lines(storage.journal_path) == []
+
+    deadline = time.monotonic() + 5
+    while writer.writes == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(journal_lines(storage.journal_path)) == 50
+    assert writer.stats()["writes"] == 1 and len(synced) == 1
+    assert writer.coalesced == 49
+    storage.close()
+
+
+def test_writer_flushes_one_storage(tmp_path):
+    writer = JournalWriter(delay=60)
+    first = open_storage(tmp_path / "first.json", writer)
+    second = open_storage(tmp_path / "second.json", writer)
+    first.append("add", 1, {"id": 1, "text": "а"})
+    second.append("add", 1, {"id": 1, "text": "б"})
+    writer.flush(first)
+    assert len(journal_lines(first.journal_path)) == 1
+    assert journal_lines(second.journal_path) == []
+    writer.flush()
+    assert len(journal_lines(second.journal_path)) == 1
+    # Повторный сброс без новых операций ничего не пишет
+    writer.flush()
+    assert writer.writes == 2
+    first.close()
+    second.close()
+
+
+def test_leftover_temp_files_ignored(tmp_path):
+    path = tmp_path / "items.json"
+    store = open_store(path)
+    add(store, "сохранена")
+    store.save()
+    add(store, "в журнале")
+    store.close()
+    # Сбой посреди сжатия оставляет недописанные временные файлы
+    (tmp_path / "items.json.tmp").write_text('[{"id": 9', encoding="utf-8")
+    (tmp_path / "items.journal.tmp").write_text("{", encoding="utf-8")
+
+    reopened = open_store(path)
+    assert contents(reopened) == {1: "сохранена", 2: "в журнале"}
+    reopened.save()
+    reopened.close()
+    assert not (tmp_path / "items.json.tmp").exists()
+    assert not (tmp_path / "items.journal.tmp").exists()
@@ -0,0 +1,176 @@
+"""
+Индекс сроков задач против прямого перебора, в JSON и в SQLite.
+"""
+
+import random
+from datetime import date
+
+import pytest
+
+from modules.dates import format_date
+from modules.deadlines import NO_DUE, priority_rank
+from modules.tasks import Task, TasksManager
+
+TODAY = date(2026, 3, 15).toordinal()
+PRIORITIES = ["Высокий", "Средний", "Низкий", "низкий ", "", "Срочно"]
+
+
+def random_task(rng, task_id=None):
+    due = rng.choice([None, "31-02-2026", *range(TODAY - 40, TODAY + 40)])
+    if isinstance(due, int):
+        due = format_date(due)
+    return Task(
+        task_id,
+        f"задача {rng.randint(1, 10**6)}",
+        priority=rng.choice(PRIORITIES),
+        done=rng.random() < 0.3,
+        due_date=due,
+    )
+
+
+def scan_open(tasks):
+    """
+    Невыполненные задачи в порядке индекса: срок, приоритет, ID.
+    """
+    return sorted(
+        (task for task in tasks if not task.done),
+        key=lambda task: (
+            task.due if task.due is not None else NO_DUE,
+            priority_rank(task.priority),
+            task.id,
+        ),
+    )
+
+
+@pytest.fixture(params=["tasks.json", "tasks.db"], ids=["json", "sqlite"])
+def manager(request, tmp_path):
+    manager = TasksManager(str(tmp_path / request.param))
+    yield manager
+    manager.close()
+
+
+def fill(manager, seed, count=400, changes=300):
+    rng = random.Random(seed)
+    manager.tasks.add_many(random_task(rng) for _ in range(count))
+    for _ in range(changes):
+        task = manager.tasks.get(rng.randint(1, count))
+        if task is None:
+            continue
+        action = rng.random()
+        if action < 0.2:
+            manager.tasks.delete(task.id)
+        elif action < 0.6:
+            task.mark_done()
+            manager.tasks.update(task)
+        else:
+            manager.tasks.update(random_task(rng, task.id))
+    return rng
+
+
+def ids(tasks):
+    return [task.id for task in tasks]
+
+
+def check_deadlines(manager):
+    ordered = scan_open(manager.tasks)
+    deadlines = manager.deadlines
+    assert ids(deadlines.upcoming(25)) == ids(ordered[:25])
+    assert ids(deadlines.upcoming(10**6)) == ids(ordered)
+    assert ids(deadlines.overdue(TODAY)) == [
+        task.id for task in ordered if task.due is not None and task.due < TODAY
+    ]
+    for days in (0, 1, 7, 100):
+        assert ids(deadlines.due_within(days, TODAY)) == [
+            task.id
+            for task in ordered
+            if task.due is not None and TODAY <= task.due <= TODAY + days
+        ]
+
+
+def test_deadlines_match_scan(manager):
+    fill(manager, seed=1, changes=0)
+    check_deadlines(manager)
+
+
+def test_deadlines_after_changes(manager):
+    rng = fill(manager, seed=2)
+    check_deadlines(manager)
+    # Крупная пачка вливается в индекс одной сортировкой
+    manager.tasks.add_many(random_task(rng) for _ in range(500))
+    check_deadlines(manager)
+
+
+def test_deadlines_after_reload(tmp_path):
+    path = str(tmp_path / "tasks.json")
+    manager = TasksManager(path)
+    fill(manager, seed=3)
+    manager.close()
+    reopened = TasksManager(path)
+    check_deadlines(reopened)
+    reopened.close()
+
+
+def test_default_today(manager):
+    yesterday = format_date(date.today().toordinal() - 1)
+    tomorrow = format_date(date.today().toordinal() + 1)
+    manager.tasks.add_many(
+        [
+            Task(None, "вчера", due_date=yesterday),
+            Task(None, "завтра", due_date=tomorrow),
+        ]
+    )
+    assert [task.title for task in manager.deadlines.overdue()] == ["вчера"]
+    assert [task.title for task in manager.deadlines.due_within(1)] == ["завтра"]
+
+
+def scan_summary(tasks, today):
+    """
+    Сводка TaskStats, посчитанная обходом задач.
+    """
+    names = ["Высокий", "Средний", "Низкий"]
+    by_priority = {}
+    by_month = {}
+    overdue = 0
+    for task in tasks:
+        counts = by_priority.setdefault(names[priority_rank(task.priority)], [0, 0])
+        counts[task.done] += 1
+        if task.due is not None:
+            day = date.fromordinal(task.due)
+            by_month.setdefault((day.year, day.month), [0, 0])[task.done] += 1
+            if not task.done and task.due < today:
+                overdue += 1
+    done = sum(1 for task in tasks if task.done)
+    return {
+        "total": len(tasks),
+        "done": done,
+        "open": len(tasks) - done,
+        "overdue": overdue,
+        "by_priority": {
+            name: tuple(by_priority[name]) for name in names if name in by_priority
+        },
+        "by_month": [(*month, *counts) for month, counts in sorted(by_month.items())],
+    }
+
+
+def check_summary(manager):
+    tasks = list(manager.tasks)
+    for today in (TODAY - 100, TODAY, TODAY + 13, TODAY + 100):
+        summary = manager.stats.summary(today)
+        expected = scan_summary(tasks, today)
+        assert summary == expected
+        # Приоритеты идут от важного к неважному
+        assert list(summary["by_priority"]) == list(expected["by_priority"])
+
+
+def test_stats_match_scan(manager):
+    fill(manager, seed=4, changes=0)
+    check_summary(manager)
+
+
+def test_stats_after_changes(manager):
+    fill(manager, seed=5, changes=600)
+    check_summary(manager)
+    for task in list(manager.tasks):
+        manager.tasks.delete(task.id)
+    summary = manager.stats.summary(TODAY)
+    assert summary == scan_summary([], TODAY)
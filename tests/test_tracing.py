@@ -0,0 +1,131 @@
+"""
+Трассировка операций: гистограмма задержек, обёртки методов, ошибки,
+профиль следующей операции и отчёт командного режима.
+"""
+
+import json
+import pstats
+import random
+
+import pytest
+
+from modules.commands import main
+from modules.finance import FinanceManager
+from modules.session import managers
+from modules.tracing import LatencyHistogram, Tracer, format_bytes
+from tests.test_finance import random_records
+
+
+@pytest.fixture
+def tracer():
+    tracer = Tracer()
+    yield tracer
+    tracer.disable()
+
+
+def test_histogram_percentiles_within_bucket():
+    rng = random.Random(1)
+    samples = [10 ** rng.uniform(-6.5, 0) for _ in range(20000)]
+    histogram = LatencyHistogram()
+    for seconds in samples:
+        histogram.record(seconds)
+    samples.sort()
+    for fraction in (0.5, 0.9, 0.95, 0.99):
+        exact = samples[int(fraction * len(samples)) - 1]
+        estimate = histogram.percentile(fraction)
+        assert exact <= estimate * 1.0001 and estimate <= exact * 2**0.25
+    assert histogram.percentile(1.0) == histogram.max == samples[-1]
+    # Корзин столько, сколько четвертей удвоения в диапазоне замеров
+    assert len(histogram.buckets) <= 4 * 20 + 1
+    assert histogram.count == 20000
+    assert histogram.total == pytest.approx(sum(samples))
+
+
+def test_enable_wraps_and_disable_restores(tracer, tmp_path):
+    original = FinanceManager.__dict__["report"]
+    tracer.enable()
+    assert FinanceManager.__dict__["report"] is not original
+    tracer.enable()
+    assert len(tracer._patched) == len({entry[:2] for entry in tracer._patched})
+
+    manager = FinanceManager(str(tmp_path / "finances.json"))
+    manager.records.add_many(random_records(1, 200))
+    for _ in range(5):
+        manager.report()
+    # records_between внутри category_totals не учитывается отдельно
+    manager.category_totals(730000, 740000)
+    manager.close()
+    summary = tracer.summary()
+    assert summary["finance.load"]["count"] == 1
+    assert summary["finance.report"]["count"] == 6
+    assert "finance.filter" not in summary
+    assert summary["finance.report"]["p50_ms"] <= summary["finance.report"]["max_ms"]
+
+    tracer.disable()
+    assert FinanceManager.__dict__["report"] is original
+    assert not tracer.enabled
+
+
+def test_errors_counted(tracer, tmp_path):
+    tracer.enable()
+    manager = FinanceManager(str(tmp_path / "finances.json"))
+    manager.records.add_many(random_records(3, 10))
+    with pytest.raises(TypeError):
+        manager.report("не дата", None)
+    manager.close()
+    assert tracer.summary()["finance.report"]["errors"] == 1
+    tracer.reset()
+    assert tracer.summary() == {}
+
+
+def test_profile_next_operation(tracer, tmp_path):
+    manager = FinanceManager(str(tmp_path / "finances.json"))
+    manager.records.add_many(random_records(2, 100))
+    path = str(tmp_path / "report.prof")
+    tracer.profile_next(path, "finance.report")
+    manager.records_between(730000, 740000)
+    assert tracer.last_profile is None
+    manager.report()
+    name, saved, text = tracer.last_profile
+    assert (name, saved) == ("finance.report", path)
+    assert "totals" in text
+    assert pstats.Stats(path).total_calls > 0
+    # Профиль снимается только один раз
+    manager.report()
+    assert tracer._profile is None
+    manager.close()
+
+
+def test_format_report_and_bytes(tracer):
+    assert tracer.format_report() == "Операций пока не было."
+    tracer.record("notes.search", 0.002)
+    tracer.record("notes.search", 0.004, (0, 0, 100), (1124, 2048, 100), failed=True)
+    stats = tracer.summary()["notes.search"]
+    assert (stats["count"], stats["errors"]) == (2, 1)
+    assert (stats["bytes_read"], stats["bytes_written"]) == (1024, 2048)
+    lines = tracer.format_report().splitlines()
+    assert lines[1].split()[:3] == ["notes.search", "2", "1"]
+    assert lines[1].endswith("1 КБ        2 КБ")
+    assert [format_bytes(count) for count in (5, 3 * 1024**2, 5 * 1024**3)] == [
+        "5 Б",
+        "3 МБ",
+        "5.0 ГБ",
+    ]
+
+
+def test_cli_trace_report(tmp_path, monkeypatch, capsys):
+    (tmp_path / "data").mkdir()
+    monkeypatch.chdir(tmp_path)
+    from modules.tracing import tracer
+
+    try:
+        code = main(["--trace", "trace.json", "report", "tasks"])
+    finally:
+        tracer.disable()
+        tracer.reset()
+        managers.close()
+    assert code == 0
+    capsys.readouterr()
+    report = json.loads((tmp_path / "trace.json").read_text(encoding="utf-8"))
+    assert report["operations"]["tasks.load"]["count"] == 1
+    assert report["operations"]["tasks.report"]["count"] == 1